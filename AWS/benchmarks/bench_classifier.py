@@ -0,0 +1,105 @@
+"""Local classifier against the Bedrock path: latency and agreement, by confidence threshold.
+
+Trains pineapple_pipeline.classifier on part of the receipt_corpus.py
+corpus, as AWS/local/train_classifier.py does on stored receipts, and
+classifies the rest. Each held-out receipt's "LLM answer" is
+parse_category of its corpus generation, which is what the Bedrock path
+would have saved; the truth is the category the user files it under.
+
+For each threshold the table shows how many receipts the classifier would
+answer, how often those answers agree with the LLM and with the truth, and
+the accuracy and latency of the combined path (classifier when confident,
+Bedrock otherwise) next to Bedrock alone. Bedrock's latency is drawn from
+--model-latency (a replay.py spec) rather than slept, and our own work on
+each path is timed.
+
+--split vendor holds out whole merchants, so every test receipt comes from a
+vendor the classifier never saw and it has only the line items and amount
+to go on. The synthetic vendors and items are cleanly separated by
+category, so both splits flatter the classifier next to real receipts.
+
+    python AWS/benchmarks/bench_classifier.py --receipts 6000 --split vendor
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import benchutil
+import receipt_corpus
+
+from pineapple_pipeline import build_prompt, classifier, parse_category
+
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "local"))
+import replay
+
+THRESHOLDS = (0.0, 0.5, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+
+def split(cases, how, rng):
+    """(training cases, test cases), a fifth held out."""
+    if how == "vendor":
+        vendors = sorted({case["extract"]["VENDOR_NAME"] for case in cases})
+        held_out = set(rng.sample(vendors, len(vendors) // 5))
+        return ([case for case in cases if case["extract"]["VENDOR_NAME"] not in held_out],
+                [case for case in cases if case["extract"]["VENDOR_NAME"] in held_out])
+    cases = cases[:]
+    rng.shuffle(cases)
+    return cases[len(cases) // 5:], cases[:len(cases) // 5]
+
+
+def timed(fn, value):
+    started = time.perf_counter()
+    result = fn(value)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=25)
+    parser.add_argument("--split", choices=["random", "vendor"], default="random")
+    parser.add_argument("--model-latency", default="lognormal:900:2500", help="Bedrock latency, as in replay.py")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    train, test = split(receipt_corpus.generate(args.receipts, args.seed), args.split, rng)
+    started = time.perf_counter()
+    model = classifier.Classifier.from_bytes(classifier.train(
+        [case["extract"] for case in train], [case["truth"]["category"] for case in train]).to_bytes())
+    print(f"trained on {len(train)} receipts in {time.perf_counter() - started:.1f} s "
+          f"({len(model.to_bytes()):,} byte index), testing on {len(test)}, {args.split} split\n")
+
+    model_ms = replay.latency_model(args.model_latency, rng)
+    rows = []
+    for case in test:
+        (category, confidence), seconds = timed(model.classify, case["extract"])
+        # The Bedrock path's own work: the prompt and the parse around the call.
+        _, prompt_seconds = timed(build_prompt, case["extract"])
+        llm, parse_seconds = timed(parse_category, case["generation"])
+        rows.append({"category": category, "confidence": confidence, "seconds": seconds, "llm": llm,
+                     "llm_seconds": prompt_seconds + parse_seconds + model_ms(None) / 1000,
+                     "truth": case["truth"]["category"]})
+
+    benchutil.print_table({"classify": benchutil.summarize([row["seconds"] for row in rows]),
+                           "Bedrock path": benchutil.summarize([row["llm_seconds"] for row in rows])})
+    llm_accuracy = sum(row["llm"] == row["truth"] for row in rows) / len(rows)
+    print(f"\nBedrock path alone: {llm_accuracy:.1%} correct\n")
+
+    print(f"{'threshold':>10}{'answered':>10}{'agree LLM':>11}{'correct':>10}{'combined':>10}"
+          f"{'mean ms':>10}{'p95 ms':>10}")
+    for threshold in THRESHOLDS:
+        answered = [row for row in rows if row["confidence"] >= threshold]
+        combined = [(row["category"], row["seconds"]) if row["confidence"] >= threshold
+                    else (row["llm"], row["seconds"] + row["llm_seconds"]) for row in rows]
+        latency = benchutil.summarize([seconds for _, seconds in combined])
+        cells = [sum(row["category"] == row["llm"] for row in answered) / len(answered),
+                 sum(row["category"] == row["truth"] for row in answered) / len(answered)] if answered else [0, 0]
+        correct = sum(category == row["truth"] for (category, _), row in zip(combined, rows)) / len(rows)
+        print(f"{threshold:>10g}{len(answered) / len(rows):>10.1%}{cells[0]:>11.1%}{cells[1]:>10.1%}"
+              f"{correct:>10.1%}{latency['mean']:>10.1f}{latency['p95']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Cold-start cost of every Lambda handler.
+
+Each AWS/src/*/lambda_function.py is imported in a fresh interpreter, the
+closest local stand-in for a new Lambda container, and the script records:
+
+    import_ms   time spent importing lambda_function (what the init phase runs)
+    init_ms     wall time from process start until the handler is loaded
+    heavy       modules from the budget's heavy_modules list loaded during init
+
+    python AWS/benchmarks/bench_cold_start.py --runs 5
+    python AWS/benchmarks/bench_cold_start.py --check         # enforce the budget
+    python AWS/benchmarks/bench_cold_start.py --importtime    # top imports per handler
+
+The budget lives in cold_start_budget.json. A handler fails the check when it
+loads a heavy module it isn't allowed to at init, or its median import time
+goes over max_import_ms.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import benchutil
+
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cold_start_budget.json")
+
+PROBE = """
+import importlib, json, sys, time
+sys.path[:0] = [sys.argv[1], sys.argv[2]]
+start = time.perf_counter()
+importlib.import_module("lambda_function")
+import_ms = (time.perf_counter() - start) * 1000
+heavy = sorted(m for m in json.loads(sys.argv[3]) if m in sys.modules)
+print(json.dumps({"import_ms": import_ms, "ready": time.time(), "heavy": heavy}))
+"""
+
+
+def handler_names():
+    paths = glob.glob(os.path.join(benchutil.SRC_DIR, "*", "lambda_function.py"))
+    return sorted(os.path.basename(os.path.dirname(p)) for p in paths)
+
+
+def probe(name, importtime=False):
+    """Import one handler in a new interpreter and return its measurements."""
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    heavy_modules = load_budget()["heavy_modules"]
+    command += ["-c", PROBE, os.path.join(benchutil.SRC_DIR, name), benchutil.LAYER_DIR, json.dumps(heavy_modules)]
+
+    started = time.time()
+    result = subprocess.run(command, capture_output=True, text=True, env=env, check=True)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    measured["init_ms"] = (measured.pop("ready") - started) * 1000
+    if importtime:
+        measured["top_imports"] = top_imports(result.stderr)
+    return measured
+
+
+def top_imports(stderr, count=5):
+    """Largest top-level packages from `python -X importtime` output."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit() or module.startswith("  "):
+            continue
+        name = module.strip()
+        totals[name] = max(totals.get(name, 0), int(cumulative) / 1000)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def measure(names, runs, importtime=False):
+    results = {}
+    for name in names:
+        samples = [probe(name) for _ in range(runs)]
+        results[name] = {
+            "import_ms": statistics.median(s["import_ms"] for s in samples),
+            "init_ms": statistics.median(s["init_ms"] for s in samples),
+            "heavy": samples[0]["heavy"]
+        }
+        if importtime:
+            results[name]["top_imports"] = probe(name, importtime=True)["top_imports"]
+    return results
+
+
+def load_budget():
+    with open(BUDGET_PATH) as f:
+        return json.load(f)
+
+
+def budget_violations(results, budget):
+    violations = []
+    for name, result in results.items():
+        limits = budget["handlers"].get(name)
+        if limits is None:
+            violations.append(f"{name}: no entry in cold_start_budget.json")
+            continue
+        extra = sorted(set(result["heavy"]) - set(limits["allowed_heavy_modules"]))
+        if extra:
+            violations.append(f"{name}: imports {', '.join(extra)} during init")
+        if "import_ms" in result and result["import_ms"] > limits["max_import_ms"]:
+            violations.append(f"{name}: import took {result['import_ms']:.1f} ms, budget is {limits['max_import_ms']} ms")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="exit non-zero on budget violations")
+    parser.add_argument("--importtime", action="store_true", help="show the slowest imports per handler")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    parser.add_argument("handlers", nargs="*", help="handler directories to measure (default: all)")
+    args = parser.parse_args()
+
+    results = measure(args.handlers or handler_names(), args.runs, args.importtime)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'handler':<40}{'import_ms':>10}{'init_ms':>10}  heavy modules at init")
+        for name, r in results.items():
+            print(f"{name:<40}{r['import_ms']:>10.1f}{r['init_ms']:>10.1f}  {', '.join(r['heavy']) or '-'}")
+            for module, ms in r.get("top_imports", []):
+                print(f"{'':<44}{module:<30}{ms:>8.1f} ms")
+
+    if args.check:
+        violations = budget_violations(results, load_budget())
+        for v in violations:
+            print("BUDGET:", v)
+        sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Condensing a large AnalyzeExpense response: the old loop against pineapple_pipeline.condense.
+
+The receipt is synthetic: a multi-page grocery receipt with --pages
+ExpenseDocuments, --items line items on each and --fields summary fields.
+The old ParseTextractOutput loop rebuilt "items" once per summary field and
+only looked at the first line item of the first document. The second
+baseline is that same loop covering every line item, which is what it would
+have cost to fix in place: fields x items. condense walks everything once.
+
+    python AWS/benchmarks/bench_condense.py --pages 3 --items 200
+"""
+import argparse
+import json
+import random
+
+import benchutil
+
+from pineapple_pipeline import build_prompt, condense
+
+PRODUCE = ["BANANAS", "GALA APPLES", "RED ONION", "ROMAINE", "AVOCADO", "LIMES", "CARROTS 2LB", "BROCCOLI"]
+PANTRY = ["OAT MILK", "PASTA 1LB", "BLACK BEANS", "RICE 5LB", "OLIVE OIL", "PEANUT BUTTER", "COFFEE", "EGGS DZ"]
+
+
+def expense_field(kind, text, rng):
+    return {"Type": {"Text": kind, "Confidence": round(rng.uniform(90, 100), 2)},
+            "ValueDetection": {"Text": text, "Confidence": round(rng.uniform(60, 100), 2),
+                               "Geometry": {"BoundingBox": {"Width": 0.2, "Height": 0.01,
+                                                            "Left": 0.1, "Top": rng.random()}}},
+            "PageNumber": 1}
+
+
+def grocery_receipt(pages, items, fields, seed=19):
+    rng = random.Random(seed)
+    documents = []
+    for page in range(pages):
+        summary = [expense_field("VENDOR_NAME", "FRESH MART #0412", rng),
+                   expense_field("INVOICE_RECEIPT_DATE", "03/16/2024", rng)]
+        summary += [expense_field("OTHER", f"MEMBER SAVINGS {n} 0.{n % 90 + 10}", rng) for n in range(fields - 4)]
+        summary += [expense_field("SUBTOTAL", f"{rng.uniform(100, 400):.2f}", rng),
+                    expense_field("TOTAL", f"{rng.uniform(100, 400):.2f}", rng)]
+        line_items = []
+        for n in range(items):
+            name = rng.choice(PRODUCE + PANTRY)
+            price = f"{rng.uniform(0.5, 15):.2f}"
+            line_items.append({"LineItemExpenseFields": [
+                expense_field("ITEM", name, rng), expense_field("QUANTITY", str(rng.randint(1, 4)), rng),
+                expense_field("PRICE", price, rng), expense_field("EXPENSE_ROW", f"{name} {price} F", rng)]})
+        documents.append({"ExpenseIndex": page + 1, "SummaryFields": summary,
+                          "LineItemGroups": [{"LineItemGroupIndex": 1, "LineItems": line_items}]})
+    return {"DocumentMetadata": {"Pages": pages}, "ExpenseDocuments": documents}
+
+
+def legacy_condense(textract):
+    """The loop ParseTextractOutput ran before pineapple_pipeline."""
+    condensed_extract = {}
+    for i in range(len(textract['ExpenseDocuments'][0]['SummaryFields'])):
+        key = textract['ExpenseDocuments'][0]['SummaryFields'][i]['Type']['Text']
+        value = textract['ExpenseDocuments'][0]['SummaryFields'][i]['ValueDetection']['Text']
+        if key not in condensed_extract.keys():
+            condensed_extract[key] = value
+        else:
+            condensed_extract[key] += " " + value
+        if len(textract['ExpenseDocuments'][0]['LineItemGroups'][0]['LineItems']) > 0:
+            condensed_extract['items'] = {}
+            for j in range(len(textract['ExpenseDocuments'][0]['LineItemGroups'][0]['LineItems'][0]['LineItemExpenseFields'])):
+                value = textract['ExpenseDocuments'][0]['LineItemGroups'][0]['LineItems'][0]['LineItemExpenseFields'][j]['ValueDetection']['Text']
+                condensed_extract['items']['item' + str(j)] = value
+    return condensed_extract
+
+
+def legacy_condense_every_item(textract):
+    """The old loop, rebuilding items from every line item of every document."""
+    condensed_extract = {}
+    for document in textract['ExpenseDocuments']:
+        for field in document['SummaryFields']:
+            key, value = field['Type']['Text'], field['ValueDetection']['Text']
+            if key not in condensed_extract:
+                condensed_extract[key] = value
+            else:
+                condensed_extract[key] += " " + value
+            condensed_extract['items'] = {}
+            for every in textract['ExpenseDocuments']:
+                for group in every['LineItemGroups']:
+                    for line_item in group['LineItems']:
+                        row = " ".join(f['ValueDetection']['Text'] for f in line_item['LineItemExpenseFields'])
+                        condensed_extract['items']['item' + str(len(condensed_extract['items']))] = row
+    return condensed_extract
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    response = grocery_receipt(args.pages, args.items, args.fields)
+    condensed = condense(response)
+    print(f"{args.pages} pages, {args.pages * args.items} line items, {args.pages * args.fields} summary fields; "
+          f"response {len(json.dumps(response)) / 1024:.0f} KiB")
+    print(f"line items seen: before 1, after {len(condensed.items)}; "
+          f"extract {len(json.dumps(condensed.as_extract())) / 1024:.1f} KiB, "
+          f"prompt {len(build_prompt(condensed.as_extract()))} chars\n")
+
+    results = {
+        "ParseTextractOutput loop (before)": benchutil.summarize(benchutil.time_calls(
+            lambda: legacy_condense(response), args.iterations)),
+        "old loop over every item": benchutil.summarize(benchutil.time_calls(
+            lambda: legacy_condense_every_item(response), max(1, args.iterations // 30))),
+        "condense": benchutil.summarize(benchutil.time_calls(lambda: condense(response), args.iterations)),
+        "condense + as_extract": benchutil.summarize(benchutil.time_calls(
+            lambda: condense(response).as_extract(), args.iterations)),
+    }
+    benchutil.print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Home-screen load: five list endpoints one after another against /user/Dashboard.
+
+Runs the handlers in-process against a seeded scratch schema, so the numbers
+are handler plus database time only. --rtt-ms adds a fixed client-to-API round
+trip per call to approximate what the app pays for each request on a phone.
+
+    PINEAPPLE_DB_DSN=postgresql://localhost/pineapple \\
+        python AWS/benchmarks/bench_dashboard.py --rtt-ms 80
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+import benchutil
+
+import psycopg2
+from pineapple_db import close_connection
+
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "migrations"))
+import migrate
+
+SEPARATE_ENDPOINTS = [
+    "RetreiveCurrentReport",
+    "RetrieveReturnedReports-User",
+    "RetrieveApprovedReports-User",
+    "RetrieveReceiptsWithNoReport",
+    "RetrieveAllUnsubmittedReport",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("PINEAPPLE_DB_DSN"))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set PINEAPPLE_DB_DSN or pass --dsn")
+
+    schema = "bench_" + uuid.uuid4().hex[:8]
+    admin = psycopg2.connect(args.dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    connection = psycopg2.connect(args.dsn, options=f"-c search_path={schema}")
+    try:
+        migrate.migrate(connection, log=lambda message: None)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+            INSERT INTO report_data (report_number, user_id, current, submitted, approved, returned)
+            SELECT 'report-' || u || '-' || r, 'user-' || u, r = 0, r > 1, r > 2, r = 1
+            FROM generate_series(1, 1000) u, generate_series(0, 9) r
+            """)
+            cursor.execute("""
+            INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount)
+            SELECT 'receipt-' || u || '-' || n, 'user-' || u,
+                   CASE WHEN n % 5 = 0 THEN NULL ELSE 'report-' || u || '-' || (n % 10) END, n
+            FROM generate_series(1, 1000) u, generate_series(1, 100) n
+            """)
+            cursor.execute("ANALYZE")
+        connection.commit()
+
+        separator = "&" if "?" in args.dsn else "?"
+        os.environ["PINEAPPLE_DB_DSN"] = f"{args.dsn}{separator}options={quote(f'-c search_path={schema}')}"
+        handlers = {name: benchutil.load_handler(name).lambda_handler
+                    for name in SEPARATE_ENDPOINTS + ["RetrieveDashboard-User"]}
+        event = {"requestContext": {"authorizer": {"jwt": {"claims": {"sub": "user-42"}}}}}
+
+        def call(name):
+            time.sleep(args.rtt_ms / 1000)
+            handlers[name](event, None)
+
+        def five_calls():
+            for name in SEPARATE_ENDPOINTS:
+                call(name)
+
+        def dashboard():
+            call("RetrieveDashboard-User")
+
+        dashboard()
+        results = {
+            "five separate calls": benchutil.summarize(benchutil.time_calls(five_calls, args.iterations)),
+            "/user/Dashboard": benchutil.summarize(benchutil.time_calls(dashboard, args.iterations))
+        }
+        benchutil.print_table(results)
+    finally:
+        close_connection()
+        connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
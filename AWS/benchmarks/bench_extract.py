@@ -0,0 +1,166 @@
+"""Per-receipt date and amount extraction: the strptime version against pineapple_pipeline.extract.
+
+The extracts are synthetic, covering every date shape the patterns know
+(and some they reject), with and without INVOICE_RECEIPT_DATE. Every
+result, including the ValueError for a date that isn't one, is checked
+against the old code before anything is timed.
+
+    python AWS/benchmarks/bench_extract.py --receipts 2000
+"""
+import argparse
+import json
+import random
+import re
+from datetime import datetime
+
+import benchutil
+
+from pineapple_pipeline import amount_and_date
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+               "November", "December"]
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+VENDORS = ["Blue Bottle", "FRESH MART #0412", "Shell 0571", "Hilton Garden Inn", "Café Luna", "Home Depot"]
+
+
+# The strptime version, as it was before the engine ---------------------------
+
+LEGACY_AMOUNT_PATTERN = re.compile(r'\d+\.\d{2}?')
+LEGACY_INVOICE_DATE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\b\d{1,2}[A-Za-z]{3}\d{2}\b', r'\b\d{1,2}[- ][A-Za-z]{3}[- ]\d{4}\b', r'\b[A-Za-z]+\s+\d{1,2}\s+\d{4}\b',
+    r'\b[A-Za-z]{3}\s+\d{1,2},?\s+\d{4}\b', r'\b[A-Za-z]{3}\s+\d{1,2}\b', r'\b\d{4}-\d{1,2}-\d{1,2}\b',
+    r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b', r'\b\d{1,2}-\d{1,2}\b', r'\b\d{1,2}/\d{1,2}\b',
+)]
+LEGACY_FULL_TEXT_DATE_PATTERN = re.compile(r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2}\d{2}?\b')
+LEGACY_DATE_FORMATS = ["%m/%d/%y", "%m/%d/%Y", "%m/%-d/%y", "%m/%-d/%Y", "%-m/%d/%y", "%-m/%d/%Y", "%B %d %Y",
+                       '%m-%d-%y', '%m-%d-%Y', "%b %d %Y", '%a %b %d', '%d%b%y', '%d-%b-%Y', '%m/%d', "%Y-%m-%d",
+                       "%m-%d", '%m/%d/%y', '%b %d', '%d %b %Y']
+
+
+def legacy_amount_and_date(condensed):
+    if 'INVOICE_RECEIPT_DATE' in condensed:
+        predicted_date = legacy_reformat_date(legacy_invoice_date(
+            condensed['INVOICE_RECEIPT_DATE'].replace(',', ' ').replace('.', ' ').strip()))
+    else:
+        matches = LEGACY_FULL_TEXT_DATE_PATTERN.findall(json.dumps(condensed))
+        date = matches[-1].strip() if matches else ""
+        predicted_date = legacy_reformat_date(date) if date != "" else {
+            "full_date": "01/01/1899", "month": "01", "year": "1899", "day": "01"}
+
+    total = legacy_amount(condensed['TOTAL']) if 'TOTAL' in condensed else "0.00"
+    if total != "0.00":
+        predicted_amount = total
+    elif 'AMOUNT_PAID' in condensed:
+        predicted_amount = legacy_amount(condensed['AMOUNT_PAID'])
+    elif 'SUBTOTAL' in condensed:
+        subtotal = float(legacy_amount(condensed['SUBTOTAL']))
+        tax = float(legacy_amount(condensed.get('TAX', '')))
+        predicted_amount = f"{subtotal + tax:.2f}"
+    else:
+        predicted_amount = "0.00"
+    return predicted_date, predicted_amount
+
+
+def legacy_amount(s):
+    amounts = [float(a) for a in LEGACY_AMOUNT_PATTERN.findall(s)]
+    return f"{max(amounts) if amounts else 0:.2f}"
+
+
+def legacy_invoice_date(s):
+    for pattern in LEGACY_INVOICE_DATE_PATTERNS:
+        matches = pattern.findall(s)
+        if matches:
+            return matches[-1].strip()
+    return ""
+
+
+def legacy_reformat_date(date_string):
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            date_object = datetime.strptime(date_string, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Date format not recognized: {date_string}")
+    if date_object.year == 1900:
+        date_object = date_object.replace(year=2024)
+    return {"full_date": date_object.strftime("%m/%d/%Y"), "month": date_object.strftime("%m"),
+            "year": date_object.strftime("%Y"), "day": date_object.strftime("%d")}
+
+
+# Corpus ----------------------------------------------------------------------
+
+def date_text(rng):
+    """An INVOICE_RECEIPT_DATE as Textract reads them, mostly valid, sometimes not."""
+    month, day = rng.randint(0, 13), rng.randint(0, 32)
+    year = rng.choice([rng.randint(1998, 2026), 1900, 2000, 999])
+    name = MONTH_NAMES[(month - 1) % 12]
+    shapes = [
+        f"{month:02d}/{day:02d}/{year}", f"{month}/{day}/{year % 100:02d}", f"{month}-{day}-{year}",
+        f"{month}/{day}-{year % 100:02d}", f"{month:02d}/{day:02d}", f"{month}-{day}", f"{year}-{month}-{day}",
+        f"{name} {day}, {year}", f"{name[:3]} {day}, {year}", f"{name[:3].upper()}. {day} {year}",
+        f"{name[:4]} {day} {year}", f"{name[:3]} {day}", f"{rng.choice(WEEKDAYS)} {name[:3]} {day}",
+        f"{day}{name[:3]}{year % 100:02d}", f"{day}-{name[:3]}-{year}", f"{day} {name[:3]} {year}",
+        f"{day}-{name[:3]} {year}", f"{month}/{day}/{year % 1000:03d}",
+        f"Date: {month:02d}/{day:02d}/{year % 100:02d} {rng.randint(0, 23)}:{rng.randint(0, 59):02d} PM",
+        f"{month}/{day} {name[:3]} {day} {year}", f"Sep 14-Dec-{year}", "2/29", "02/29/2024", "N/A",
+    ]
+    return rng.choice(shapes)
+
+
+def receipt_extracts(count, seed=21):
+    """Condensed extracts like ParseTextractOutput produces."""
+    rng = random.Random(seed)
+    extracts = []
+    for _ in range(count):
+        items = {f"item{n}": f"ITEM {n} {rng.uniform(0.5, 30):.2f}" for n in range(rng.randint(0, 30))}
+        total = rng.uniform(1, 400)
+        extract = {"VENDOR_NAME": rng.choice(VENDORS), "ADDRESS": "1 Main St\nOakland CA"}
+        if rng.random() < 0.75:
+            extract["INVOICE_RECEIPT_DATE"] = date_text(rng)
+        else:
+            extract["OTHER"] = rng.choice(["", "thank you", f"paid {date_text(rng)} visa",
+                                           f"€{rng.randint(1, 12)}/{rng.randint(1, 28)}/2024", f"\t{date_text(rng)}"])
+        amount_fields = rng.choice([["TOTAL"], ["AMOUNT_PAID"], ["SUBTOTAL", "TAX"], ["TOTAL", "SUBTOTAL"], []])
+        for field in amount_fields:
+            extract[field] = rng.choice([f"${total:.2f}", f"{total:.2f} USD", "0.00", "$12", f"{total:.2f} {total / 9:.2f}"])
+        if items:
+            extract["items"] = items
+        extracts.append(extract)
+    return extracts
+
+
+def outcome(fn, extract):
+    """fn's result, or the ValueError it raised, as something comparable."""
+    try:
+        return fn(extract)
+    except ValueError as e:
+        return ("ValueError", str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    extracts = receipt_extracts(args.receipts, args.seed)
+    mismatched = [e for e in extracts if outcome(amount_and_date, e) != outcome(legacy_amount_and_date, e)]
+    if mismatched:
+        raise SystemExit(f"{len(mismatched)} extracts differ, first: {mismatched[0]}")
+    rejected = sum(isinstance(outcome(amount_and_date, e)[0], str) for e in extracts)
+    print(f"{len(extracts)} extracts, identical results; {rejected} rejected dates\n")
+
+    def per_receipt(fn):
+        def run():
+            for extract in extracts:
+                outcome(fn, extract)
+        return [seconds / len(extracts) for seconds in benchutil.time_calls(run, 20)]
+
+    benchutil.print_table({"strptime (before)": benchutil.summarize(per_receipt(legacy_amount_and_date)),
+                           "amount_and_date": benchutil.summarize(per_receipt(amount_and_date))})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Batch extraction: amount_and_date one receipt at a time against extract_many.
+
+Receipts come from receipt_corpus.py, the way a backfill sees them: a few
+thousand distinct dates and a long tail of totals. Results of the two paths
+are compared before anything is timed.
+
+    python AWS/benchmarks/bench_extract_many.py --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+import benchutil
+import receipt_corpus
+
+from pineapple_pipeline import amount_and_date, extract_many
+
+
+def one_at_a_time(extracts):
+    results = []
+    for extract in extracts:
+        try:
+            results.append(amount_and_date(extract))
+        except ValueError as e:
+            results.append(e)
+    return results
+
+
+def comparable(results):
+    return [("ValueError", str(r)) if isinstance(r, ValueError) else r for r in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=23)
+    args = parser.parse_args()
+
+    corpus = [case["extract"] for case in receipt_corpus.generate(max(args.sizes), args.seed)]
+    print(f"{'receipts':>10}{'one at a time':>16}{'extract_many':>16}{'speedup':>10}   receipts/s (median of {args.repeats})")
+    for size in args.sizes:
+        extracts = corpus[:size]
+        if comparable(extract_many(extracts)) != comparable(one_at_a_time(extracts)):
+            raise SystemExit(f"extract_many differs from amount_and_date at {size} receipts")
+        single = benchutil.summarize(benchutil.time_calls(lambda: one_at_a_time(extracts), args.repeats))["p50"]
+        batch = benchutil.summarize(benchutil.time_calls(lambda: extract_many(extracts), args.repeats))["p50"]
+        print(f"{size:>10,}{size / single * 1000:>16,.0f}{size / batch * 1000:>16,.0f}{single / batch:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
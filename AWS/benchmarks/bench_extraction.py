@@ -0,0 +1,159 @@
+"""Throughput and accuracy of the extraction functions, measured together.
+
+Runs the parsing behind GetAmountAndDate and ParseBedrockOutput over the
+synthetic corpus in receipt_corpus.py and reports, per function, how many
+receipts a second it handles and how often it gets the answer right:
+
+    amount_and_date          date and amount of each condensed extract
+    extract_amt_from_string  the field that holds the amount paid
+    parse_category           the category out of each Llama generation
+
+A date that raises ValueError counts as wrong for both date and amount,
+since the step fails. --by breaks accuracy down by how the receipts were
+written, e.g. --by date to see which date formats are missed.
+
+    python AWS/benchmarks/bench_extraction.py
+    python AWS/benchmarks/bench_extraction.py --by amount --by currency
+    python AWS/benchmarks/bench_extraction.py --check        # enforce extraction_floors.json
+    python AWS/benchmarks/bench_extraction.py --write corpus.jsonl
+
+The floors in extraction_floors.json are for the corpus it names. A change
+that makes parsing faster by getting receipts wrong fails --check; when a
+change makes parsing more accurate, raise the floors with it.
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+import sys
+import time
+
+import benchutil
+import receipt_corpus
+
+from pineapple_pipeline import DEFAULT_DATE, amount_and_date, parse_category
+from pineapple_pipeline.extract import extract_amt_from_string
+
+FLOORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_floors.json")
+
+
+def load_floors():
+    with open(FLOORS_PATH) as f:
+        return json.load(f)
+
+
+def _amount_and_date(case):
+    try:
+        return amount_and_date(case["extract"])
+    except ValueError:
+        return None
+
+
+def score(cases):
+    """{case id: {"date", "amount", "raised", "amount_field", "category"}}; None where a check doesn't apply."""
+    scores = {}
+    for case in cases:
+        truth = case["truth"]
+        result = _amount_and_date(case)
+        expected_date = truth["date"] or DEFAULT_DATE["full_date"]
+        field = truth["amount_field"]
+        scores[case["id"]] = {
+            "date": result is not None and result[0]["full_date"] == expected_date,
+            "amount": result is not None and result[1] == truth["amount"],
+            "raised": result is None,
+            "amount_field": extract_amt_from_string(case["extract"][field]) == truth["amount"] if field else None,
+            "category": parse_category(case["generation"]) == truth["category"],
+        }
+    return scores
+
+
+def accuracy(scores, check, ids=None):
+    marks = [s[check] for case_id, s in scores.items() if s[check] is not None and (ids is None or case_id in ids)]
+    return sum(marks) / len(marks) if marks else None
+
+
+def throughput(fn, inputs, repeats):
+    """Inputs per second, from the median of `repeats` passes over all of them."""
+    def run():
+        for value in inputs:
+            fn(value)
+    return len(inputs) / statistics.median(benchutil.time_calls(run, repeats))
+
+
+def measure(cases, repeats=5):
+    """{function: {"per_second", "accuracy": {check: fraction}}} over `cases`."""
+    scores = score(cases)
+    amount_texts = [case["extract"][case["truth"]["amount_field"]] for case in cases if case["truth"]["amount_field"]]
+    generations = [case["generation"] for case in cases]
+    return {
+        "amount_and_date": {"per_second": throughput(_amount_and_date, cases, repeats),
+                            "accuracy": {"date": accuracy(scores, "date"), "amount": accuracy(scores, "amount"),
+                                         "raised": accuracy(scores, "raised")}},
+        "extract_amt_from_string": {"per_second": throughput(extract_amt_from_string, amount_texts, repeats),
+                                    "accuracy": {"amount_field": accuracy(scores, "amount_field")}},
+        "parse_category": {"per_second": throughput(parse_category, generations, repeats),
+                           "accuracy": {"category": accuracy(scores, "category")}},
+    }, scores
+
+
+def floor_violations(results, floors):
+    violations = []
+    for function, limits in floors["functions"].items():
+        result = results[function]
+        for check, floor in limits.get("min_accuracy", {}).items():
+            if result["accuracy"][check] < floor:
+                violations.append(f"{function}: {check} accuracy {result['accuracy'][check]:.2%}, floor is {floor:.2%}")
+        if "min_per_second" in limits and result["per_second"] < limits["min_per_second"]:
+            violations.append(f"{function}: {result['per_second']:,.0f}/s, floor is {limits['min_per_second']:,}/s")
+    return violations
+
+
+def print_breakdown(cases, scores, tag):
+    groups = collections.defaultdict(set)
+    for case in cases:
+        groups[case["tags"][tag]].add(case["id"])
+    checks = [check for check in ("date", "amount", "amount_field", "category") if accuracy(scores, check) is not None]
+    print(f"\n{tag:<24}{'n':>6}" + "".join(f"{check:>14}" for check in checks))
+    for value, ids in sorted(groups.items(), key=lambda item: -len(item[1])):
+        cells = [accuracy(scores, check, ids) for check in checks]
+        print(f"{value:<24}{len(ids):>6}" + "".join(f"{'-' if c is None else f'{c:.1%}':>14}" for c in cells))
+
+
+def main():
+    floors = load_floors()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=floors["corpus"]["receipts"])
+    parser.add_argument("--seed", type=int, default=floors["corpus"]["seed"])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--by", action="append", default=[], choices=["date", "amount", "currency", "generation"],
+                        help="break accuracy down by how the receipts were written")
+    parser.add_argument("--check", action="store_true", help="exit non-zero when under extraction_floors.json")
+    parser.add_argument("--write", metavar="PATH", help="also write the corpus as JSON lines")
+    args = parser.parse_args()
+
+    cases = receipt_corpus.generate(args.receipts, args.seed)
+    if args.write:
+        receipt_corpus.write(cases, args.write)
+    started = time.perf_counter()
+    results, scores = measure(cases, args.repeats)
+
+    print(f"{len(cases)} receipts, seed {args.seed} ({time.perf_counter() - started:.1f} s)\n")
+    print(f"{'function':<28}{'per second':>14}  accuracy")
+    for function, result in results.items():
+        marks = ", ".join(f"{check} {value:.1%}" for check, value in result["accuracy"].items())
+        print(f"{function:<28}{result['per_second']:>14,.0f}  {marks}")
+    for tag in args.by:
+        print_breakdown(cases, scores, tag)
+
+    if args.check:
+        if (args.receipts, args.seed) != (floors["corpus"]["receipts"], floors["corpus"]["seed"]):
+            parser.error("the floors are for the corpus in extraction_floors.json")
+        violations = floor_violations(results, floors)
+        for v in violations:
+            print("FLOOR:", v)
+        sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
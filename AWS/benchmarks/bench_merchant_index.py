@@ -0,0 +1,161 @@
+"""Merchant fast path: hit rate and model latency saved over a stream of receipts.
+
+Receipts from receipt_corpus.py go through PredictReceipt with
+MERCHANT_FAST_PATH=on and are stored by PutReceiptToRDS against a scratch
+schema. The user then files each receipt under its true category, and the
+index is rebuilt every --refresh-every receipts, as RefreshMerchantIndex
+does on its schedule. Textract is stubbed with each receipt's own fields
+and Bedrock sleeps --model-ms before replying with the receipt's generation.
+
+--one-off gives that share of receipts a merchant seen only once, the long
+tail the index never learns. Receipts whose date fails the step are left
+out, as they never reach the model.
+
+    PINEAPPLE_DB_DSN=postgresql://localhost/pineapple \\
+        python AWS/benchmarks/bench_merchant_index.py --receipts 5000 --model-ms 900
+"""
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+import benchutil
+import receipt_corpus
+
+import psycopg2
+import pineapple_aws
+from pineapple_db import close_connection
+from pineapple_pipeline import extract_many
+
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "migrations"))
+import migrate
+
+
+class StubBedrock:
+    """Sleeps `delay`, then replies with the generation of the receipt being predicted."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.generation = None
+
+    def invoke_model(self, modelId, body, contentType, accept):
+        time.sleep(self.delay)
+        return {"body": io.BytesIO(json.dumps({"generation": self.generation}).encode())}
+
+
+def textract_response(extract):
+    """An AnalyzeExpense response that condenses back to `extract`."""
+    def field(kind, text):
+        return {"Type": {"Text": kind}, "ValueDetection": {"Text": text}}
+
+    items = [{"LineItemExpenseFields": [field("EXPENSE_ROW", text)]} for text in extract.get("items", {}).values()]
+    return {"ExpenseDocuments": [{
+        "SummaryFields": [field(kind, text) for kind, text in extract.items() if kind != "items"],
+        "LineItemGroups": [{"LineItems": items}] if items else []
+    }]}
+
+
+def one_off_vendor(rng):
+    return " ".join("".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(6)) for _ in range(2))
+
+
+def stream(cases, predict, store, refresh, refresh_every, bedrock):
+    """Predict, store and correct each case in turn; {source: [(seconds, correct)]}."""
+    results = collections.defaultdict(list)
+    for n, case in enumerate(cases):
+        if n and n % refresh_every == 0:
+            refresh()
+        bedrock.generation = case["generation"]
+        event = {"key": f"{case['id']}.jpg", "user_id": "user-1", "name": "bench",
+                 "textract_response": textract_response(case["extract"])}
+        started = time.perf_counter()
+        prediction = predict(event, None)
+        seconds = time.perf_counter() - started
+        category = case["truth"]["category"]
+        results[prediction["category_source"]].append((seconds, prediction["predicted_category"] == category))
+        store(prediction, category)
+    return results
+
+
+def report(results, model_ms):
+    receipts = sum(len(samples) for samples in results.values())
+    hits = results.get("merchant", [])
+    benchutil.print_table({f"PredictReceipt ({source})": benchutil.summarize([s for s, _ in samples])
+                           for source, samples in results.items()})
+    print(f"\nfast path hit rate: {len(hits) / receipts:.1%} of {receipts} receipts")
+    for source, samples in results.items():
+        print(f"category accuracy ({source}): {sum(ok for _, ok in samples) / len(samples):.1%}")
+    if hits and results.get("model"):
+        saved = (sum(s for s, _ in results["model"]) / len(results["model"])
+                 - sum(s for s, _ in hits) / len(hits)) * 1000
+        print(f"latency saved: {saved:.1f} ms per hit, {saved * len(hits) / 1000:.1f} s in total "
+              f"({len(hits)} Bedrock calls at --model-ms {model_ms:g})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("PINEAPPLE_DB_DSN"))
+    parser.add_argument("--receipts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=24)
+    parser.add_argument("--one-off", type=float, default=0.3, help="share of receipts from a merchant seen once")
+    parser.add_argument("--refresh-every", type=int, default=250)
+    parser.add_argument("--model-ms", type=float, default=900.0)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set PINEAPPLE_DB_DSN or pass --dsn")
+
+    rng = random.Random(args.seed)
+    cases = receipt_corpus.generate(args.receipts, args.seed)
+    parsed = extract_many([case["extract"] for case in cases])
+    cases = [case for case, result in zip(cases, parsed) if not isinstance(result, ValueError)]
+    for case in cases:
+        if rng.random() < args.one_off:
+            case["extract"]["VENDOR_NAME"] = one_off_vendor(rng)
+
+    schema = "bench_" + uuid.uuid4().hex[:8]
+    admin = psycopg2.connect(args.dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    connection = psycopg2.connect(args.dsn, options=f"-c search_path={schema}")
+    try:
+        migrate.migrate(connection, log=lambda message: None)
+        connection.commit()
+        separator = "&" if "?" in args.dsn else "?"
+        os.environ["PINEAPPLE_DB_DSN"] = f"{args.dsn}{separator}options={quote(f'-c search_path={schema}')}"
+        os.environ["MERCHANT_FAST_PATH"] = "on"
+        bedrock = StubBedrock(args.model_ms / 1000)
+        pineapple_aws._clients[("bedrock-runtime", ())] = bedrock
+        put = benchutil.load_handler("PutReceiptToRDS").lambda_handler
+        refresh = benchutil.load_handler("RefreshMerchantIndex").lambda_handler
+
+        def store(prediction, category):
+            put(prediction, None)
+            # The user files the receipt where it belongs.
+            with connection.cursor() as cursor:
+                cursor.execute("UPDATE receipt_data SET act_category = %s WHERE receipt_id = %s",
+                               (category, prediction["key"]))
+            connection.commit()
+
+        # Handlers log their events and metrics; that still runs, but goes nowhere.
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = stream(cases, benchutil.load_handler("PredictReceipt").lambda_handler, store,
+                             lambda: refresh({}, None), args.refresh_every, bedrock)
+        print(f"{len(cases)} receipts, {args.one_off:.0%} one-off merchants, index refreshed every "
+              f"{args.refresh_every}\n")
+        report(results, args.model_ms)
+    finally:
+        close_connection()
+        connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Cost of a list page by depth: keyset pagination against LIMIT/OFFSET.
+
+Seeds a scratch schema with one heavy user's unassigned receipts, then times
+the RetrieveReceiptsWithNoReport page query at the start, middle and end of
+the list, next to the OFFSET query the same page would need without keyset.
+The handler itself is run on the deepest page as an end-to-end check.
+
+    PINEAPPLE_DB_DSN=postgresql://localhost/pineapple \\
+        python AWS/benchmarks/bench_pagination.py --receipts 200000
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from urllib.parse import quote
+
+import benchutil
+
+import psycopg2
+from pineapple_db import close_connection, pagination
+
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "migrations"))
+import migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("PINEAPPLE_DB_DSN"))
+    parser.add_argument("--receipts", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set PINEAPPLE_DB_DSN or pass --dsn")
+
+    schema = "bench_" + uuid.uuid4().hex[:8]
+    admin = psycopg2.connect(args.dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    connection = psycopg2.connect(args.dsn, options=f"-c search_path={schema}")
+    try:
+        migrate.migrate(connection, log=lambda message: None)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+            INSERT INTO receipt_data (receipt_id, user_id, act_amount)
+            SELECT 'receipt-' || lpad(n::text, 9, '0'), 'heavy-user', n %% 500
+            FROM generate_series(1, %s) n
+            """, (args.receipts,))
+            cursor.execute("ANALYZE receipt_data")
+        connection.commit()
+
+        separator = "&" if "?" in args.dsn else "?"
+        os.environ["PINEAPPLE_DB_DSN"] = f"{args.dsn}{separator}options={quote(f'-c search_path={schema}')}"
+        handler = benchutil.load_handler("RetrieveReceiptsWithNoReport").lambda_handler
+
+        results = {}
+        for label, depth in [("first page", 0), ("middle", args.receipts // 2), ("last page", args.receipts - args.limit)]:
+            query = {"limit": str(args.limit)}
+            if depth:
+                query["next_token"] = pagination.encode_token(
+                    "receipts-with-no-report", [f"receipt-{depth:09d}"])
+            event = {
+                "requestContext": {"authorizer": {"jwt": {"claims": {"sub": "heavy-user"}}}},
+                "queryStringParameters": query
+            }
+
+            def keyset_page():
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                    SELECT * FROM receipt_data
+                    WHERE user_id = %s AND report_number IS NULL AND receipt_id > %s
+                    ORDER BY receipt_id LIMIT %s
+                    """, ("heavy-user", f"receipt-{depth:09d}", args.limit + 1))
+                    cursor.fetchall()
+                connection.commit()
+
+            def handler_page():
+                response = handler(event, None)
+                assert len(json.loads(response["body"])["receipts"]) == args.limit
+
+            def offset_page():
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                    SELECT * FROM receipt_data
+                    WHERE user_id = %s AND report_number IS NULL
+                    ORDER BY receipt_id LIMIT %s OFFSET %s
+                    """, ("heavy-user", args.limit, depth))
+                    cursor.fetchall()
+                connection.commit()
+
+            handler_page()
+            results[f"keyset {label}"] = benchutil.summarize(benchutil.time_calls(keyset_page, args.iterations))
+            results[f"offset {label}"] = benchutil.summarize(benchutil.time_calls(offset_page, args.iterations))
+
+        results["handler last page"] = benchutil.summarize(benchutil.time_calls(handler_page, args.iterations))
+        benchutil.print_table(results)
+    finally:
+        close_connection()
+        connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Prediction steps as separate Lambdas against the fused PredictReceipt.
+
+Runs the handlers in-process on a canned AnalyzeExpense response, with
+Bedrock replaced by a stub that sleeps --model-ms. The per-step path does
+what the state machine did between Textract and PutReceiptToRDS: five states
+(ParseTextractOutput, GetAmountAndDate, AttachPrompt, the Bedrock task and
+ParseBedrockOutput), each one serialising its input and output as JSON. The
+fused path is a single state. --hop-ms adds a fixed cost per state for the
+transition and Lambda dispatch, which is the latency the fusion removes.
+
+    python AWS/benchmarks/bench_pipeline.py --hop-ms 25 --model-ms 400
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+import benchutil
+
+import pineapple_aws
+
+
+def field(kind, text):
+    return {"Type": {"Text": kind}, "ValueDetection": {"Text": text}}
+
+
+TEXTRACT_RESPONSE = {"ExpenseDocuments": [{
+    "SummaryFields": [field("VENDOR_NAME", "Corner Hardware"), field("ADDRESS", "12 Elm St"),
+                      field("ADDRESS", "Springfield IL 62701"), field("INVOICE_RECEIPT_DATE", "09/14/2024"),
+                      field("SUBTOTAL", "$41.20"), field("TAX", "$3.40"), field("TOTAL", "$44.60")]
+                     + [field("OTHER", f"line {n} SKU-{n:05d} 1 x 2.00") for n in range(30)],
+    "LineItemGroups": [{"LineItems": [{"LineItemExpenseFields": [
+        field("ITEM", "Safety gloves L"), field("QUANTITY", "2"), field("PRICE", "18.40")]}]}]
+}]}
+
+
+class StubBedrock:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def invoke_model(self, modelId, body, contentType, accept):
+        time.sleep(self.delay)
+        return {"body": io.BytesIO(b'{"generation": " Category: Safety"}')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--hop-ms", type=float, default=0.0)
+    parser.add_argument("--model-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    model = StubBedrock(args.model_ms / 1000)
+    pineapple_aws._clients[("bedrock-runtime", ())] = model
+    handlers = {name: benchutil.load_handler(name).lambda_handler
+                for name in ("ParseTextractOutput", "GetAmountAndDate", "AttachPrompt", "ParseBedrockOutput",
+                             "PredictReceipt")}
+    event = {"key": "r1.jpg", "user_id": "user-1", "name": "bench", "bucket": "receipts",
+             "content_hash": "md5:0cc175b9c0f1b6a831c399e269772661", "textract_response": TEXTRACT_RESPONSE}
+
+    def state(function, payload):
+        time.sleep(args.hop_ms / 1000)
+        return json.loads(json.dumps(function(json.loads(json.dumps(payload)), None)))
+
+    def bedrock_task(payload):
+        response = model.invoke_model(None, json.dumps({"prompt": payload["prompt"]}), None, None)
+        return {**payload, "bedrock_response": {"Body": json.loads(response["body"].read())}}
+
+    def per_step():
+        payload = state(handlers["ParseTextractOutput"], event)
+        payload = state(handlers["GetAmountAndDate"], payload)
+        payload = state(handlers["AttachPrompt"], payload)
+        payload = state(lambda p, context: bedrock_task(p), payload)
+        return state(handlers["ParseBedrockOutput"], payload)
+
+    def fused():
+        return state(handlers["PredictReceipt"], event)
+
+    # The handlers' event logging still runs (it is part of each step's cost) but goes nowhere.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        assert per_step() == fused()
+        results = {
+            "per-step (5 states)": benchutil.summarize(benchutil.time_calls(per_step, args.iterations)),
+            "PredictReceipt (1 state)": benchutil.summarize(benchutil.time_calls(fused, args.iterations))
+        }
+    benchutil.print_table(results)
+    saved = results["per-step (5 states)"]["mean"] - results["PredictReceipt (1 state)"]["mean"]
+    print(f"\nmean saved per receipt: {saved:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""End-to-end /predictions latency, and the wait the polling loop adds to it.
+
+Live mode times POST /predictions against a deployed stage; run it before and
+after deploying to compare. The receipt must already be in the bucket;
+repeat runs on it add no rows since the writer ignores conflicts.
+
+    PINEAPPLE_AUTH_TOKEN=... python AWS/benchmarks/bench_predictions.py \\
+        --url https://t6oydoeb76.execute-api.us-east-1.amazonaws.com/dev/predictions \\
+        --receipt-id TestImage1.jpg --iterations 20
+
+--simulate needs no AWS: for executions lasting --min-s to --max-s it works out
+how long after completion each way of waiting returns, given --poll-rtt-ms per
+DescribeExecution call.
+"""
+import argparse
+import os
+import random
+import time
+
+import benchutil
+
+from pineapple_aws import stepfunctions
+
+
+def fixed_schedule(interval):
+    while True:
+        yield interval
+
+
+def backoff_schedule():
+    delay = stepfunctions.POLL_INITIAL_SECONDS
+    while True:
+        yield delay
+        delay = min(delay * stepfunctions.POLL_BACKOFF, stepfunctions.POLL_MAX_SECONDS)
+
+
+def polled_return(duration, schedule, poll_rtt):
+    """Seconds after start at which a poll first sees the execution finished."""
+    now = 0.0
+    for delay in schedule:
+        now += poll_rtt
+        if now >= duration:
+            return now
+        now += delay
+
+
+def simulate(args):
+    rng = random.Random(7)
+    durations = [rng.uniform(args.min_s, args.max_s) for _ in range(args.iterations)]
+    rtt = args.poll_rtt_ms / 1000
+    cases = {
+        "poll every 2 s (before)": lambda d: polled_return(d, fixed_schedule(2.0), rtt),
+        "backoff polling": lambda d: polled_return(d, backoff_schedule(), rtt),
+        "StartSyncExecution": lambda d: d + rtt,
+    }
+    # summarize() takes seconds and reports milliseconds of added wait.
+    results = {label: benchutil.summarize([returned(d) - d for d in durations])
+               for label, returned in cases.items()}
+    benchutil.print_table(results)
+
+
+def live(args):
+    import requests
+
+    if not args.token:
+        raise SystemExit("set PINEAPPLE_AUTH_TOKEN or pass --token")
+    headers = {"Authorization": f"Bearer {args.token}", "Content-Type": "application/json"}
+    payload = {"receipt_id": args.receipt_id, "name": "bench_predictions"}
+
+    def predict():
+        response = requests.post(args.url, headers=headers, json=payload, timeout=60)
+        response.raise_for_status()
+
+    samples = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        predict()
+        samples.append(time.perf_counter() - start)
+    benchutil.print_table({"POST /predictions": benchutil.summarize(samples)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--simulate", action="store_true")
+    parser.add_argument("--url")
+    parser.add_argument("--token", default=os.environ.get("PINEAPPLE_AUTH_TOKEN"))
+    parser.add_argument("--receipt-id")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--min-s", type=float, default=2.0)
+    parser.add_argument("--max-s", type=float, default=8.0)
+    parser.add_argument("--poll-rtt-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(args)
+    elif args.url and args.receipt_id:
+        live(args)
+    else:
+        parser.error("pass --simulate, or --url and --receipt-id")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Per-receipt write: the two PutToRDS writers against PutReceiptToRDS.
+
+Runs the handlers in-process against a scratch schema. The state machine ran
+the two old writers as parallel branches, so each receipt cost two Lambda
+invocations, two connections and two commits; --cold closes the connection
+before every invocation to show what a fresh container pays for each of them,
+and --invoke-ms adds a fixed per-invocation overhead (Step Functions task
+dispatch) on top.
+
+    PINEAPPLE_DB_DSN=postgresql://localhost/pineapple \\
+        python AWS/benchmarks/bench_receipt_write.py --cold --invoke-ms 25
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+import benchutil
+
+import psycopg2
+from pineapple_db import close_connection
+
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "migrations"))
+import migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("PINEAPPLE_DB_DSN"))
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--cold", action="store_true", help="open a new connection for every invocation")
+    parser.add_argument("--invoke-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set PINEAPPLE_DB_DSN or pass --dsn")
+
+    schema = "bench_" + uuid.uuid4().hex[:8]
+    admin = psycopg2.connect(args.dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    connection = psycopg2.connect(args.dsn, options=f"-c search_path={schema}")
+    try:
+        migrate.migrate(connection, log=lambda message: None)
+        connection.commit()
+
+        separator = "&" if "?" in args.dsn else "?"
+        os.environ["PINEAPPLE_DB_DSN"] = f"{args.dsn}{separator}options={quote(f'-c search_path={schema}')}"
+        handlers = {name: benchutil.load_handler(name).lambda_handler
+                    for name in ("PutToRDS", "PutToRDS-receipt_data", "PutReceiptToRDS")}
+        counter = itertools.count()
+
+        def invoke(*names):
+            event = {"key": f"receipt-{next(counter)}", "user_id": "user-1", "name": "r.jpg",
+                     "predicted_amount": "12.50", "predicted_date": {"full_date": "03/04/2024"},
+                     "predicted_category": "Meals"}
+            for name in names:
+                if args.cold:
+                    close_connection()
+                time.sleep(args.invoke_ms / 1000)
+                handlers[name](event, None)
+
+        invoke("PutReceiptToRDS")
+        results = {
+            "PutToRDS + PutToRDS-receipt_data": benchutil.summarize(benchutil.time_calls(
+                lambda: invoke("PutToRDS", "PutToRDS-receipt_data"), args.iterations)),
+            "PutReceiptToRDS": benchutil.summarize(benchutil.time_calls(
+                lambda: invoke("PutReceiptToRDS"), args.iterations))
+        }
+        benchutil.print_table(results)
+        speedup = results["PutToRDS + PutToRDS-receipt_data"]["mean"] / results["PutReceiptToRDS"]["mean"]
+        print(f"\nmean speedup: {speedup:.1f}x (invocations and connections per receipt: 2 -> 1)")
+    finally:
+        close_connection()
+        connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
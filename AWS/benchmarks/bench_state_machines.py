@@ -0,0 +1,141 @@
+"""Per-state and end-to-end latency of the workflows, run by the local interpreter.
+
+Runs MyStateMachine and DeleteReceipt with AWS/local/asl.py against a
+scratch schema. S3 and Textract are stubbed and Bedrock sleeps --model-ms,
+so the numbers are our handlers plus the database. --transition-ms adds a
+fixed cost per state for what the real service spends between states.
+
+--replay serves Textract and Bedrock from record/replay fixtures instead
+(AWS/local/replay.py), with their latency distributions and throttling or
+error rates, to see what the tail and the failure rate look like:
+
+    PINEAPPLE_DB_DSN=postgresql://localhost/pineapple \\
+        python AWS/benchmarks/bench_state_machines.py --iterations 200 --transition-ms 20
+
+    PINEAPPLE_DB_DSN=postgresql://localhost/pineapple \\
+        python AWS/benchmarks/bench_state_machines.py --replay AWS/tests/fixtures/replay/synthetic \\
+        --textract-latency lognormal:1800:5000 --bedrock-latency recorded --throttle 0.02
+"""
+import argparse
+import collections
+import contextlib
+import io
+import os
+import random
+import sys
+import uuid
+from urllib.parse import quote
+
+import benchutil
+from bench_pipeline import TEXTRACT_RESPONSE, StubBedrock
+
+import psycopg2
+import pineapple_aws
+from pineapple_db import close_connection
+
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "migrations"))
+sys.path.insert(0, os.path.join(benchutil.AWS_DIR, "local"))
+import asl
+import migrate
+import replay
+
+
+class StubS3:
+    def head_object(self, Bucket, Key):
+        # Unique per key, so every prediction misses the cache.
+        return {"ETag": '"' + uuid.uuid5(uuid.NAMESPACE_URL, Key).hex + '"'}
+
+    def delete_object(self, Bucket, Key):
+        return {}
+
+
+class StubTextract:
+    def analyze_expense(self, Document):
+        return TEXTRACT_RESPONSE
+
+
+def run_machine(machine, events):
+    """Run every event; return (end-to-end samples, {state: samples}, {error: count}, {state: max bytes})."""
+    totals, per_state, failures = [], collections.defaultdict(list), collections.Counter()
+    payloads = collections.Counter()
+    for event in events:
+        execution = machine.run(event)
+        if execution.status != "SUCCEEDED":
+            failures[execution.error] += 1
+        totals.append(execution.seconds)
+        for state in execution.states:
+            per_state[state.name].append(state.seconds)
+            payloads[state.name] = max(payloads[state.name], state.output_bytes or 0)
+    return totals, per_state, failures, payloads
+
+
+def report(title, totals, per_state, failures, payloads):
+    print(f"\n{title}")
+    benchutil.print_table({**{name: benchutil.summarize(samples) for name, samples in per_state.items()},
+                           "end to end": benchutil.summarize(totals)})
+    print(f"throughput: {len(totals) / sum(totals):.1f} executions/s")
+    for error, count in failures.most_common():
+        print(f"failed: {count} ({count / len(totals):.1%}) {error}")
+    largest = max(payloads, key=payloads.get, default=None)
+    if largest:
+        print(f"largest state output: {payloads[largest]} bytes ({largest})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("PINEAPPLE_DB_DSN"))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--transition-ms", type=float, default=0.0)
+    parser.add_argument("--model-ms", type=float, default=0.0)
+    parser.add_argument("--replay", metavar="DIR", help="serve Textract and Bedrock from these fixtures")
+    parser.add_argument("--textract-latency", default="recorded")
+    parser.add_argument("--bedrock-latency", default="recorded")
+    parser.add_argument("--throttle", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=18)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set PINEAPPLE_DB_DSN or pass --dsn")
+
+    schema = "bench_" + uuid.uuid4().hex[:8]
+    admin = psycopg2.connect(args.dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    connection = psycopg2.connect(args.dsn, options=f"-c search_path={schema}")
+    try:
+        migrate.migrate(connection, log=lambda message: None)
+        connection.commit()
+        separator = "&" if "?" in args.dsn else "?"
+        os.environ["PINEAPPLE_DB_DSN"] = f"{args.dsn}{separator}options={quote(f'-c search_path={schema}')}"
+        os.environ.setdefault("BUCKET", "receipts")
+        pineapple_aws._clients.update({("s3", ()): StubS3(), ("textract", ()): StubTextract(),
+                                       ("bedrock-runtime", ()): StubBedrock(args.model_ms / 1000)})
+        if args.replay:
+            replay.install(args.replay, throttle=args.throttle, error_rate=args.error_rate,
+                           rng=random.Random(args.seed),
+                           overrides={"textract": {"latency": args.textract_latency},
+                                      "bedrock-runtime": {"latency": args.bedrock_latency}})
+
+        machines = {name: asl.StateMachine.from_file(os.path.join(benchutil.AWS_DIR, filename),
+                                                     transition_ms=args.transition_ms)
+                    for name, filename in (("predict", "MyStateMachine-sj5krp1uk-definition.asl.json"),
+                                           ("delete", "DeleteReceipt-definition.asl.json"))}
+        keys = [f"receipt-{n}.jpg" for n in range(args.iterations)]
+        # Handlers log their events; that still runs, but goes nowhere.
+        with contextlib.redirect_stdout(io.StringIO()):
+            machines["predict"].run({"key": "warm-up.jpg", "user_id": "user-1", "name": "bench"})
+            predicted = run_machine(machines["predict"], [{"key": key, "user_id": "user-1", "name": "bench"}
+                                                          for key in keys])
+            deleted = run_machine(machines["delete"], [{"bucket": "receipts", "key": key, "user_id": "user-1"}
+                                                       for key in keys])
+        report("MyStateMachine", *predicted)
+        report("DeleteReceipt", *deleted)
+    finally:
+        close_connection()
+        connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Small helpers shared by the benchmark scripts in this folder."""
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(AWS_DIR, "layers", "pineapple_common", "python")
+SRC_DIR = os.path.join(AWS_DIR, "src")
+
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+
+
+def load_handler(function_name):
+    """Import AWS/src/<function_name>/lambda_function.py as its own module."""
+    path = os.path.join(SRC_DIR, function_name, "lambda_function.py")
+    spec = importlib.util.spec_from_file_location("lambda_" + function_name.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Millisecond summary of a list of durations in seconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "mean": statistics.fmean(ms),
+        "p50": percentile(ms, 50),
+        "p95": percentile(ms, 95),
+        "p99": percentile(ms, 99),
+        "max": max(ms)
+    }
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def print_table(rows):
+    """Print {label: summary} as an aligned table."""
+    width = max([32] + [len(label) + 2 for label in rows])
+    print(f"{'case':<{width}}{'n':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for label, s in rows.items():
+        print(f"{label:<{width}}{s['n']:>7}{s['mean']:>10.3f}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}{s['max']:>10.3f}")
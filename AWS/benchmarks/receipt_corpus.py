@@ -0,0 +1,203 @@
+"""Synthetic receipts with known answers, for bench_extraction.py.
+
+Each case is a condensed extract shaped like ParseTextractOutput's output,
+a Llama generation for it, and the truth:
+
+    date      mm/dd/yyyy printed on the receipt, None when there is none
+    amount    what was paid, "x.xx"
+    category  what the receipt is
+
+Vendors, addresses, card numbers and line items are made up, so the corpus
+carries nothing from a real receipt and can be regenerated anywhere from
+its seed. `tags` records how each case was written (date format, amount
+layout, currency, generation style) so accuracy can be broken down by it.
+Some shapes are known to defeat the current parsing (European dates,
+thousands separators, lowercase generations); they are there so the
+numbers show it.
+"""
+import json
+import random
+from datetime import date, timedelta
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+               "November", "December"]
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# category: (vendors, items)
+CATALOGUE = {
+    "Meals": (["Blue Bottle Coffee", "Taqueria El Sol", "Pho 88", "Corner Deli", "Golden Wok"],
+              ["LATTE", "BREAKFAST BURRITO", "PHO TAI", "TURKEY CLUB", "ICED TEA", "FRIED RICE", "ESPRESSO"]),
+    "Supplies": (["Office Depot #2231", "Staples", "Best Buy 0419", "Paper Source"],
+                 ["PRINTER INK XL", "COPY PAPER 10RM", "USB-C CABLE", "STAPLER", "BINDER 2IN", "LABEL TAPE"]),
+    "Safety": (["Grainger", "Safety Supply Co", "Northern Tool 112"],
+               ["NITRILE GLOVES L", "HARD HAT WHT", "SAFETY GLASSES", "HI-VIS VEST", "FIRE EXTINGUISHER 5LB"]),
+    "Travel": (["Shell 0571", "Chevron 20418", "Yellow Cab", "Hertz", "Amtrak"],
+               ["UNLEADED 12.4 GAL", "FARE", "DAILY RATE", "COACH SEAT", "TOLLS", "AIRPORT FEE"]),
+    "Lodging": (["Hilton Garden Inn", "Motel 6 #4410", "Hampton Inn", "Airbnb"],
+                ["ROOM CHARGE", "OCCUPANCY TAX", "RESORT FEE", "PARKING", "CLEANING FEE"]),
+    "Other": (["USPS 0512", "City of Oakland", "FedEx Office", "Notary Plus"],
+              ["PRIORITY MAIL", "PERMIT FEE", "SHIPPING", "NOTARY STAMP", "KEY COPY"]),
+}
+
+# Words the model sometimes answers with instead of the category name.
+SYNONYMS = {"Meals": "Food", "Supplies": "Office Supplies", "Safety": "Safety Equipment",
+            "Travel": "Transportation", "Lodging": "Hotel", "Other": "Miscellaneous"}
+
+
+# Dates -----------------------------------------------------------------------
+
+DATE_FORMATS = {
+    "mm/dd/yyyy": lambda d, rng: f"{d.month:02d}/{d.day:02d}/{d.year}",
+    "m/d/yy": lambda d, rng: f"{d.month}/{d.day}/{d.year % 100:02d}",
+    "mm-dd-yyyy": lambda d, rng: f"{d.month:02d}-{d.day:02d}-{d.year}",
+    "yyyy-mm-dd": lambda d, rng: f"{d.year}-{d.month:02d}-{d.day:02d}",
+    "Month d, yyyy": lambda d, rng: f"{MONTH_NAMES[d.month - 1]} {d.day}, {d.year}",
+    "Mon d, yyyy": lambda d, rng: f"{MONTH_NAMES[d.month - 1][:3]} {d.day}, {d.year}",
+    "MON. d yyyy": lambda d, rng: f"{MONTH_NAMES[d.month - 1][:3].upper()}. {d.day} {d.year}",
+    "Ddd, Mon d, yyyy": lambda d, rng: f"{WEEKDAYS[d.weekday()]}, {MONTH_NAMES[d.month - 1][:3]} {d.day}, {d.year}",
+    "dd-Mon-yyyy": lambda d, rng: f"{d.day:02d}-{MONTH_NAMES[d.month - 1][:3]}-{d.year}",
+    "dd Mon yyyy": lambda d, rng: f"{d.day:02d} {MONTH_NAMES[d.month - 1][:3]} {d.year}",
+    "ddMonyy": lambda d, rng: f"{d.day:02d}{MONTH_NAMES[d.month - 1][:3].upper()}{d.year % 100:02d}",
+    "with time": lambda d, rng: f"{d.month:02d}/{d.day:02d}/{d.year} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+    "dd/mm/yyyy": lambda d, rng: f"{d.day:02d}/{d.month:02d}/{d.year}",
+    "Sept d, yyyy": lambda d, rng: f"{MONTH_NAMES[d.month - 1][:4]} {d.day}, {d.year}",
+    "Mon d (no year)": lambda d, rng: f"{MONTH_NAMES[d.month - 1][:3]} {d.day}",
+}
+DATE_WEIGHTS = {"mm/dd/yyyy": 20, "m/d/yy": 10, "mm-dd-yyyy": 5, "yyyy-mm-dd": 5, "Month d, yyyy": 6,
+                "Mon d, yyyy": 10, "MON. d yyyy": 4, "Ddd, Mon d, yyyy": 4, "dd-Mon-yyyy": 4, "dd Mon yyyy": 3,
+                "ddMonyy": 3, "with time": 10, "dd/mm/yyyy": 4, "Sept d, yyyy": 2, "Mon d (no year)": 4}
+
+FIRST_DAY, DAYS = date(2023, 1, 1), 3 * 365
+
+
+def _choice(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+# Amounts ---------------------------------------------------------------------
+
+CURRENCIES = {"USD": 70, "USD text": 10, "CAD": 5, "EUR": 10, "GBP": 5}
+AMOUNT_LAYOUTS = {"total": 45, "total and subtotal": 15, "amount paid": 8, "subtotal and tax": 10,
+                  "zero total": 4, "total with change": 8, "cash tendered": 4, "thousands": 6}
+
+
+def money(cents, currency, rng):
+    """Cents written the way a receipt in `currency` writes them."""
+    plain = f"{cents // 100}.{cents % 100:02d}"
+    if currency == "USD":
+        return "$" + plain
+    if currency == "USD text":
+        return plain + " USD"
+    if currency == "CAD":
+        return "CA$" + plain
+    if currency == "GBP":
+        return "£" + plain
+    # Half the euro receipts use a decimal comma.
+    return (f"{cents // 100},{cents % 100:02d} €" if rng.random() < 0.5 else "€" + plain)
+
+
+def with_thousands(cents, currency):
+    prefix = {"USD": "$", "CAD": "CA$", "GBP": "£", "EUR": "€"}.get(currency, "")
+    return f"{prefix}{cents // 100:,}.{cents % 100:02d}"
+
+
+def amount_fields(layout, cents, currency, rng):
+    """(fields, name of the field holding the paid amount or None)."""
+    if layout == "subtotal and tax":
+        rate = rng.choice([0.0475, 0.0725, 0.0875, 0.1025])
+        tax = round(cents * rate / (1 + rate))
+        return {"SUBTOTAL": money(cents - tax, currency, rng), "TAX": money(tax, currency, rng)}, None
+    if layout == "total and subtotal":
+        tax = round(cents * 0.08)
+        return {"SUBTOTAL": money(cents - tax, currency, rng), "TAX": money(tax, currency, rng),
+                "TOTAL": money(cents, currency, rng)}, "TOTAL"
+    if layout == "amount paid":
+        return {"AMOUNT_PAID": money(cents, currency, rng)}, "AMOUNT_PAID"
+    if layout == "zero total":
+        return {"TOTAL": money(0, currency, rng), "AMOUNT_PAID": money(cents, currency, rng)}, "AMOUNT_PAID"
+    if layout == "total with change":
+        change = rng.randint(1, max(1, cents - 1))
+        return {"TOTAL": f"{money(cents, currency, rng)} CHANGE {money(change, currency, rng)}"}, "TOTAL"
+    if layout == "cash tendered":
+        tendered = (cents // 2000 + 1) * 2000
+        return {"TOTAL": f"{money(cents, currency, rng)} CASH {money(tendered, currency, rng)}"}, "TOTAL"
+    if layout == "thousands":
+        return {"TOTAL": with_thousands(cents, currency)}, "TOTAL"
+    return {"TOTAL": money(cents, currency, rng)}, "TOTAL"
+
+
+# Generations -----------------------------------------------------------------
+
+GENERATION_STYLES = {"clean": 50, "spaced": 15, "explained": 10, "bare": 8, "lowercase": 5, "synonym": 6,
+                     "hedged": 4, "denial first": 2}
+
+
+def generation(style, category, rng):
+    other = rng.choice([name for name in CATALOGUE if name != category])
+    if style == "spaced":
+        return f" Category: {category}"
+    if style == "explained":
+        return f"Category: {category}\n\nThe receipt lists {rng.choice(CATALOGUE[category][1]).lower()}."
+    if style == "bare":
+        return category
+    if style == "lowercase":
+        return f"category: {category.lower()}"
+    if style == "synonym":
+        return f"Category: {SYNONYMS[category]}"
+    if style == "hedged":
+        return f"Category: {category} (possibly {other})"
+    if style == "denial first":
+        return f"This is not {other}. Category: {category}"
+    return f"Category:{category}"
+
+
+# Receipts --------------------------------------------------------------------
+
+def receipt(number, rng):
+    category = rng.choice(list(CATALOGUE))
+    vendors, items = CATALOGUE[category]
+    currency = _choice(rng, CURRENCIES)
+    layout = _choice(rng, AMOUNT_LAYOUTS)
+    cents = rng.randint(100_000, 900_000) if layout == "thousands" else rng.randint(150, 60_000)
+    printed = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+    date_format = _choice(rng, DATE_WEIGHTS)
+    placement = rng.choices(["invoice field", "other text", "none"], [85, 8, 7])[0]
+
+    extract = {"VENDOR_NAME": rng.choice(vendors),
+               "ADDRESS": f"{rng.randint(1, 9999)} {rng.choice(['Main St', 'Broadway', 'Oak Ave', '5th St'])}"
+                          f"\n{rng.choice(['Oakland CA', 'Austin TX', 'Denver CO', 'Portland OR'])}",
+               "VENDOR_PHONE": f"({rng.randint(200, 989)}) 555-{rng.randint(0, 9999):04d}"}
+    written = DATE_FORMATS[date_format](printed, rng)
+    if placement == "invoice field":
+        extract["INVOICE_RECEIPT_DATE"] = written
+    elif placement == "other text":
+        extract["OTHER"] = f"VISA ****{rng.randint(0, 9999):04d} {written} APPROVED"
+    fields, amount_field = amount_fields(layout, cents, currency, rng)
+    extract.update(fields)
+    count = rng.randint(1, 12)
+    extract["items"] = {f"item{n}": f"{rng.choice(items)} {rng.randint(1, 3)} {rng.randint(99, 4999) / 100:.2f}"
+                        for n in range(count)}
+
+    style = _choice(rng, GENERATION_STYLES)
+    return {
+        "id": f"r{number:05d}",
+        "extract": extract,
+        "generation": generation(style, category, rng),
+        "truth": {"date": printed.strftime("%m/%d/%Y") if placement != "none" else None,
+                  "amount": f"{cents // 100}.{cents % 100:02d}", "amount_field": amount_field,
+                  "category": category},
+        "tags": {"date": date_format if placement == "invoice field" else placement, "amount": layout,
+                 "currency": currency, "generation": style},
+    }
+
+
+def generate(count, seed=22):
+    rng = random.Random(seed)
+    return [receipt(number, rng) for number in range(count)]
+
+
+def write(cases, path):
+    """One case per line, for looking through or feeding to other tools."""
+    with open(path, "w") as f:
+        for case in cases:
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
@@ -0,0 +1,16 @@
+"""AWS helpers shared by the Pineapple Expense lambdas.
+
+boto3 takes a few hundred milliseconds to import, so clients are created the
+first time a request actually needs one and then reused for the life of the
+container.
+"""
+_clients = {}
+
+
+def get_client(service_name, **kwargs):
+    key = (service_name, tuple(sorted(kwargs.items())))
+    client = _clients.get(key)
+    if client is None:
+        import boto3
+        client = _clients[key] = boto3.client(service_name, **kwargs)
+    return client
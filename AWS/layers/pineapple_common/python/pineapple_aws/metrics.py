@@ -0,0 +1,32 @@
+"""CloudWatch metrics as Embedded Metric Format log lines.
+
+CloudWatch Logs turns each line into metric data points, so recording a
+metric costs a print instead of a PutMetricData call.
+"""
+import json
+import time
+
+NAMESPACE = "PineappleExpense"
+
+
+def payload_size(state, payload):
+    """Record the JSON size of a state's output as StatePayloadBytes; returns the payload."""
+    emit({"StatePayloadBytes": len(json.dumps(payload))}, {"State": state}, unit="Bytes")
+    return payload
+
+
+def emit(metrics, dimensions=None, unit="Count", namespace=NAMESPACE):
+    """Record {name: value} under `dimensions` ({name: value}) in one line."""
+    dimensions = dimensions or {}
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace,
+                "Dimensions": [sorted(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name in metrics]
+            }]
+        },
+        **dimensions,
+        **metrics
+    }))
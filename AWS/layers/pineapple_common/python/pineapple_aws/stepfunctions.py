@@ -0,0 +1,115 @@
+"""Run a Step Functions workflow and wait for its output.
+
+Express state machines run through StartSyncExecution, which returns the
+output in the same call. Standard ones are started and then polled, starting
+at POLL_INITIAL_SECONDS and backing off to POLL_MAX_SECONDS, so a short
+execution isn't rounded up to the next multiple of a fixed sleep.
+"""
+import hashlib
+import json
+import os
+import time
+
+from pineapple_aws import get_client
+
+POLL_INITIAL_SECONDS = float(os.environ.get("STEP_FUNCTION_POLL_INITIAL_SECONDS", "0.1"))
+POLL_MAX_SECONDS = float(os.environ.get("STEP_FUNCTION_POLL_MAX_SECONDS", "0.5"))
+POLL_BACKOFF = 1.5
+FAILED_STATUSES = ("FAILED", "TIMED_OUT", "ABORTED")
+UPLOAD_ID_METADATA = "upload-id"
+
+
+class ExecutionFailed(Exception):
+    def __init__(self, status, error=None, cause=None):
+        super().__init__(f"Step Function execution failed with status: {status}")
+        self.status = status
+        self.error = error
+        self.cause = cause
+
+
+def is_express(state_machine_type=None):
+    if state_machine_type is None:
+        state_machine_type = os.environ.get("STEP_FUNCTION_TYPE", "STANDARD")
+    return state_machine_type.upper() == "EXPRESS"
+
+
+def run_execution(state_machine_arn, payload, express=None, timeout=None):
+    """Start an execution with `payload` as input and return its parsed output.
+
+    `express` defaults to the STEP_FUNCTION_TYPE environment variable. Raises
+    ExecutionFailed if the execution doesn't succeed and TimeoutError if a
+    polled execution is still running after `timeout` seconds.
+    """
+    if express is None:
+        express = is_express()
+    client = get_client("stepfunctions")
+    if express:
+        return _output(client.start_sync_execution(stateMachineArn=state_machine_arn, input=json.dumps(payload)))
+
+    response = client.start_execution(stateMachineArn=state_machine_arn, input=json.dumps(payload))
+    return wait_for_execution(response["executionArn"], timeout=timeout)
+
+
+def start_execution(state_machine_arn, payload, name=None):
+    """Start an execution without waiting for it and return its ARN."""
+    kwargs = {"name": name} if name else {}
+    response = get_client("stepfunctions").start_execution(
+        stateMachineArn=state_machine_arn, input=json.dumps(payload), **kwargs)
+    return response["executionArn"]
+
+
+def upload_execution_name(user_id, key, etag, metadata):
+    """Name of the prediction started for one upload of `key`.
+
+    The ETag alone repeats when the same photo is uploaded again under the
+    same name (after deleting the receipt, say), and Step Functions keeps
+    names for 90 days, so the upload-id nonce ReturnPreSignedURL signs into
+    each upload is part of the name. Objects uploaded before it was added
+    don't have one.
+    """
+    upload_id = metadata.get(UPLOAD_ID_METADATA)
+    return execution_name(user_id, key, etag, upload_id) if upload_id else execution_name(user_id, key, etag)
+
+
+def execution_name(*parts):
+    """Execution name derived from `parts`.
+
+    Starting a standard state machine twice under the same name fails with
+    ExecutionAlreadyExists, so this makes a start idempotent and lets anyone
+    who knows the parts find the execution again.
+    """
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:64]
+
+
+def execution_arn(state_machine_arn, name):
+    """ARN of the execution called `name` of a standard state machine."""
+    return state_machine_arn.replace(":stateMachine:", ":execution:", 1) + ":" + name
+
+
+def describe_execution(execution_arn):
+    """DescribeExecution, or None if there is no such execution."""
+    client = get_client("stepfunctions")
+    try:
+        return client.describe_execution(executionArn=execution_arn)
+    except client.exceptions.ExecutionDoesNotExist:
+        return None
+
+
+def wait_for_execution(execution_arn, timeout=None, sleep=time.sleep, clock=time.monotonic):
+    client = get_client("stepfunctions")
+    deadline = None if timeout is None else clock() + timeout
+    delay = POLL_INITIAL_SECONDS
+    while True:
+        response = client.describe_execution(executionArn=execution_arn)
+        if response["status"] == "SUCCEEDED" or response["status"] in FAILED_STATUSES:
+            return _output(response)
+        if deadline is not None and clock() + delay > deadline:
+            raise TimeoutError(f"Step Function execution still running after {timeout} s: {execution_arn}")
+        sleep(delay)
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_SECONDS)
+
+
+def _output(response):
+    if response["status"] == "SUCCEEDED":
+        return json.loads(response["output"])
+    raise ExecutionFailed(response["status"], response.get("error"), response.get("cause"))
@@ -0,0 +1,22 @@
+"""Shared Postgres access for the Pineapple Expense lambdas.
+
+psycopg2 and boto3 are only imported the first time a handler talks to the
+database, so requests rejected before that (bad input, wrong role) don't pay
+for them during a cold start.
+"""
+from pineapple_db.credentials import get_credentials, refresh_credentials
+
+
+def get_connection():
+    from pineapple_db import connection
+    return connection.get_connection()
+
+
+def close_connection():
+    from pineapple_db import connection
+    return connection.close_connection()
+
+
+def db_cursor(dict_rows=False):
+    from pineapple_db import connection
+    return connection.db_cursor(dict_rows)
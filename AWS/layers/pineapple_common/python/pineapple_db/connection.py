@@ -0,0 +1,128 @@
+"""Warm-container Postgres connection shared by every DB handler.
+
+The connection lives at module scope, so it survives between invocations of
+the same Lambda container. Each checkout does a cheap local health check and
+only goes to the server when the connection has been idle for a while.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+from pineapple_db.credentials import get_credentials, refresh_credentials
+
+# Ping the server on checkout if the connection has been idle this long.
+PING_AFTER_SECONDS = float(os.environ.get("DB_PING_AFTER_SECONDS", "10"))
+CONNECT_TIMEOUT_SECONDS = int(os.environ.get("DB_CONNECT_TIMEOUT_SECONDS", "5"))
+
+_connection = None
+_last_used = 0.0
+
+
+def _open(credentials):
+    return psycopg2.connect(
+        host=credentials["DB_HOST"],
+        port=credentials["DB_PORT"],
+        user=credentials["DB_USER"],
+        password=credentials["DB_PASSWORD"],
+        dbname=credentials["DB_NAME"],
+        connect_timeout=CONNECT_TIMEOUT_SECONDS,
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3
+    )
+
+
+def _is_auth_failure(error):
+    return "authentication failed" in str(error)
+
+
+def _connect():
+    # Local runs and benchmarks can point straight at a database.
+    dsn = os.environ.get("PINEAPPLE_DB_DSN")
+    if dsn:
+        return psycopg2.connect(dsn, connect_timeout=CONNECT_TIMEOUT_SECONDS)
+
+    try:
+        return _open(get_credentials())
+    except psycopg2.OperationalError as e:
+        if not _is_auth_failure(e):
+            raise
+    # The password was probably rotated; retry once with fresh credentials.
+    return _open(refresh_credentials())
+
+
+def _is_usable(connection):
+    if connection.closed:
+        return False
+
+    status = connection.get_transaction_status()
+    if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+
+    try:
+        # A previous invocation may have died mid-transaction.
+        if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+
+        if time.monotonic() - _last_used > PING_AFTER_SECONDS:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+    return True
+
+
+def close_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+    _connection = None
+
+
+def get_connection():
+    """Return the container's connection, reconnecting if it has gone stale."""
+    global _connection, _last_used
+    if _connection is None or not _is_usable(_connection):
+        close_connection()
+        _connection = _connect()
+    _last_used = time.monotonic()
+    return _connection
+
+
+@contextmanager
+def db_cursor(dict_rows=False):
+    """Yield a cursor inside a transaction on the shared connection.
+
+    Commits when the block exits cleanly and rolls back otherwise. A
+    connection-level failure drops the connection so the next call reconnects.
+    """
+    global _last_used
+    connection = get_connection()
+    cursor_factory = None
+    if dict_rows:
+        from psycopg2.extras import RealDictCursor
+        cursor_factory = RealDictCursor
+    try:
+        with connection.cursor(cursor_factory=cursor_factory) as cursor:
+            yield cursor
+        connection.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        close_connection()
+        raise
+    except Exception:
+        try:
+            connection.rollback()
+        except psycopg2.Error:
+            close_connection()
+        raise
+    finally:
+        _last_used = time.monotonic()
@@ -0,0 +1,146 @@
+"""DB credentials from SSM Parameter Store, cached per container.
+
+Values are fresh for DB_CREDENTIALS_TTL_SECONDS. After that they may still be
+served for DB_CREDENTIALS_STALE_SECONDS while one background refresh picks up
+a rotated password. Concurrent callers share a single SSM request.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+from pineapple_aws import get_client
+
+PARAMETER_STORE = "/pineapple_expense/db/credentials"
+CREDENTIALS_TTL_SECONDS = float(os.environ.get("DB_CREDENTIALS_TTL_SECONDS", "300"))
+CREDENTIALS_STALE_SECONDS = float(os.environ.get("DB_CREDENTIALS_STALE_SECONDS", "900"))
+
+_ssm = None
+
+
+def _ssm_client():
+    global _ssm
+    if _ssm is None:
+        from botocore.config import Config
+        # Standard retry mode backs off with jitter on ThrottlingException, which
+        # is what a burst of cold starts across every function runs into.
+        _ssm = get_client("ssm", config=Config(retries={"mode": "standard", "max_attempts": 5}))
+    return _ssm
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CredentialsCache:
+    def __init__(self, fetch, ttl=CREDENTIALS_TTL_SECONDS, stale_ttl=CREDENTIALS_STALE_SECONDS,
+                 clock=time.monotonic, jitter=0.1):
+        self._fetch = fetch
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._clock = clock
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._flight = None
+        self._value = None
+        self._fresh_until = 0.0
+        self._stale_until = 0.0
+        self.stats = {"fetches": 0, "fetch_errors": 0, "hits": 0, "stale_hits": 0, "fetch_seconds": 0.0}
+
+    def get(self):
+        now = self._clock()
+        with self._lock:
+            if self._value is not None and now < self._fresh_until:
+                self.stats["hits"] += 1
+                return self._value
+            if self._value is not None and now < self._stale_until:
+                self.stats["stale_hits"] += 1
+                value = self._value
+                stale = True
+            else:
+                stale = False
+
+        if stale:
+            self._refresh(wait=False)
+            return value
+        return self._refresh(wait=True)
+
+    def refresh(self):
+        """Fetch new credentials now, e.g. after the database rejected the cached ones."""
+        return self._refresh(wait=True)
+
+    def _refresh(self, wait):
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+
+        if leader:
+            if wait:
+                self._run(flight)
+            else:
+                threading.Thread(target=self._run, args=(flight,), daemon=True).start()
+
+        if not wait:
+            return None
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _run(self, flight):
+        start = self._clock()
+        try:
+            value = self._fetch()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.stats["fetch_errors"] += 1
+        else:
+            flight.value = value
+            now = self._clock()
+            # Spread expiry so containers started together don't refresh together.
+            ttl = self._ttl * (1 + random.uniform(-self._jitter, self._jitter))
+            with self._lock:
+                self._value = value
+                self._fresh_until = now + ttl
+                self._stale_until = now + ttl + self._stale_ttl
+        finally:
+            with self._lock:
+                self.stats["fetches"] += 1
+                self.stats["fetch_seconds"] += self._clock() - start
+                self._flight = None
+            flight.done.set()
+
+
+def fetch_parameter(parameter_store=PARAMETER_STORE):
+    response = _ssm_client().get_parameters(
+        Names=[parameter_store],
+        WithDecryption=True
+    )
+    return json.loads(response["Parameters"][0]["Value"])
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def credentials_cache(parameter_store=PARAMETER_STORE):
+    with _caches_lock:
+        cache = _caches.get(parameter_store)
+        if cache is None:
+            cache = _caches[parameter_store] = CredentialsCache(lambda: fetch_parameter(parameter_store))
+        return cache
+
+
+def get_credentials(parameter_store=PARAMETER_STORE):
+    return credentials_cache(parameter_store).get()
+
+
+def refresh_credentials(parameter_store=PARAMETER_STORE):
+    return credentials_cache(parameter_store).refresh()
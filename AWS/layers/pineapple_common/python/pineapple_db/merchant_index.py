@@ -0,0 +1,73 @@
+"""Categories by merchant, learned from the categories users keep.
+
+For each merchant key (pineapple_pipeline.merchant) the index holds the most
+common act_category of its receipts, how many receipts it has seen and how
+many of them agree. A lookup only answers for a merchant with at least
+MERCHANT_INDEX_MIN_RECEIPTS receipts of which MERCHANT_INDEX_MIN_SHARE agree;
+anything less goes to the model. Corrections users make lower the share, so a
+merchant that stops being predictable drops out at the next refresh.
+
+Only model answers and categories users changed are counted: a category the
+index or the classifier supplied and the user left alone says nothing new,
+and counting it would let the index keep confirming itself.
+"""
+import os
+
+MIN_RECEIPTS = int(os.environ.get("MERCHANT_INDEX_MIN_RECEIPTS", "5"))
+MIN_SHARE = float(os.environ.get("MERCHANT_INDEX_MIN_SHARE", "0.9"))
+
+# Looking a merchant up also counts the hit, in the same statement.
+LOOKUP_QUERY = """
+UPDATE merchant_index
+SET hit_count = hit_count + 1, last_hit_at = now()
+WHERE merchant = %s
+AND receipts >= %s
+AND agreeing >= %s * receipts
+RETURNING category
+"""
+
+# now() is the transaction's start time, so every row this refresh writes has
+# the same refreshed_at and merchants without receipts any more are the older
+# rows. hit_count is kept across refreshes.
+REFRESH_QUERY = """
+WITH votes AS (
+    SELECT p.merchant, d.act_category AS category, count(*) AS agreeing
+    FROM receipt_pred p
+    JOIN receipt_data d ON d.receipt_id = p.receipt_id AND d.user_id = p.user_id
+    WHERE p.merchant IS NOT NULL AND d.act_category IS NOT NULL
+    AND (coalesce(p.category_source, 'model') = 'model' OR d.act_category IS DISTINCT FROM p.pred_category)
+    GROUP BY p.merchant, d.act_category
+), ranked AS (
+    SELECT merchant, category, agreeing,
+           sum(agreeing) OVER (PARTITION BY merchant) AS receipts,
+           row_number() OVER (PARTITION BY merchant ORDER BY agreeing DESC, category) AS rank
+    FROM votes
+)
+INSERT INTO merchant_index (merchant, category, receipts, agreeing, refreshed_at)
+SELECT merchant, category, receipts, agreeing, now()
+FROM ranked
+WHERE rank = 1
+ON CONFLICT (merchant) DO UPDATE
+SET category = EXCLUDED.category, receipts = EXCLUDED.receipts, agreeing = EXCLUDED.agreeing,
+    refreshed_at = EXCLUDED.refreshed_at
+"""
+
+DELETE_STALE_QUERY = """
+DELETE FROM merchant_index
+WHERE refreshed_at < now()
+"""
+
+
+def lookup(cursor, merchant, min_receipts=MIN_RECEIPTS, min_share=MIN_SHARE):
+    """The category for this merchant key if the index is confident of it, else None (plain cursor)."""
+    cursor.execute(LOOKUP_QUERY, (merchant, min_receipts, min_share))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def refresh(cursor):
+    """Rebuild the index from receipt_pred and receipt_data; returns (merchants, removed)."""
+    cursor.execute(REFRESH_QUERY)
+    merchants = cursor.rowcount
+    cursor.execute(DELETE_STALE_QUERY)
+    return merchants, cursor.rowcount
@@ -0,0 +1,95 @@
+"""Keyset pagination for the list endpoints.
+
+A page is read with `WHERE (key columns) > (last key seen) ORDER BY key
+columns LIMIT n`, which walks an index from where the previous page stopped,
+so page 1000 costs the same as page 1. The last key goes back to the client
+as an opaque token; clients pass it back as `next_token` with an optional
+`limit`, either in the query string or in the JSON body.
+
+Paging is opt-in: a request with neither `limit` nor `next_token` gets every
+row, as these endpoints returned before they paged, because the Android app
+doesn't follow tokens yet.
+"""
+import base64
+import binascii
+import json
+import os
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "500"))
+NEXT_TOKEN_HEADER = "X-Next-Token"
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def encode_token(scope, key):
+    payload = json.dumps({"s": scope, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_token(scope, token):
+    """Return the key stored in `token`, checking it was issued for `scope`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        token_scope, key = payload["s"], payload["k"]
+    except (ValueError, TypeError, KeyError, binascii.Error, UnicodeError):
+        raise InvalidPageRequest("Invalid next_token")
+    if token_scope != scope or not isinstance(key, list):
+        raise InvalidPageRequest("next_token does not belong to this request")
+    return key
+
+
+def page_request(event, scope, body=None):
+    """Read (limit, after) from the query string, falling back to the JSON body.
+
+    limit is None for a request that doesn't page at all.
+    """
+    params = event.get("queryStringParameters") or {}
+    body = body or {}
+    limit = params.get("limit", body.get("limit"))
+    token = params.get("next_token", body.get("next_token"))
+
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE if token else None
+    else:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise InvalidPageRequest("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise InvalidPageRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    after = decode_token(scope, token) if token else None
+    return limit, after
+
+
+def keyset_condition(columns, after):
+    """SQL and params restricting a query to rows after the previous page."""
+    if after is None:
+        return "TRUE", ()
+    if len(after) != len(columns):
+        raise InvalidPageRequest("Invalid next_token")
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"({', '.join(columns)}) > ({placeholders})", tuple(after)
+
+
+def fetch_limit(limit):
+    """The LIMIT to fetch a page with: one row more, to tell whether another page follows.
+
+    None, which is LIMIT NULL, for an unpaged request.
+    """
+    return None if limit is None else limit + 1
+
+
+def next_page(rows, limit, key_fields, scope):
+    """Trim rows fetched with LIMIT fetch_limit(limit) and build the token for the rest.
+
+    Returns (rows, next_token); next_token is None on the last page.
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_token(scope, [rows[-1][field] for field in key_fields])
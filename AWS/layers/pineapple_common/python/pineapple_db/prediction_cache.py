@@ -0,0 +1,57 @@
+"""Predictions cached by image content hash.
+
+Keys carry PREDICTION_CACHE_VERSION: bump it when the prompt, model or
+parsing changes and older predictions stop matching. An entry is kept while
+it keeps being used and purged PREDICTION_CACHE_RETENTION_DAYS after its last
+use.
+"""
+import json
+import os
+
+CACHE_VERSION = os.environ.get("PREDICTION_CACHE_VERSION", "2")
+RETENTION_DAYS = int(os.environ.get("PREDICTION_CACHE_RETENTION_DAYS", "90"))
+PREDICTION_FIELDS = ("predicted_amount", "predicted_date", "predicted_category")
+
+# Looking an entry up also marks it used, in the same statement.
+LOOKUP_QUERY = """
+UPDATE prediction_cache
+SET hit_count = hit_count + 1, last_used_at = now()
+WHERE cache_key = %s
+AND last_used_at > now() - make_interval(days => %s)
+RETURNING prediction
+"""
+
+STORE_QUERY = """
+INSERT INTO prediction_cache (cache_key, prediction)
+VALUES (%s, %s::jsonb)
+ON CONFLICT (cache_key) DO UPDATE
+SET prediction = EXCLUDED.prediction, last_used_at = now()
+"""
+
+PURGE_QUERY = """
+DELETE FROM prediction_cache
+WHERE last_used_at <= now() - make_interval(days => %s)
+"""
+
+
+def cache_key(content_hash):
+    return f"v{CACHE_VERSION}:{content_hash}"
+
+
+def lookup(cursor, content_hash, retention_days=RETENTION_DAYS):
+    """The cached prediction fields for this content, or None (plain cursor)."""
+    cursor.execute(LOOKUP_QUERY, (cache_key(content_hash), retention_days))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def store(cursor, content_hash, prediction):
+    """Cache the prediction fields of a state machine payload."""
+    cursor.execute(STORE_QUERY, (cache_key(content_hash),
+                                 json.dumps({field: prediction.get(field) for field in PREDICTION_FIELDS})))
+
+
+def purge(cursor, retention_days=RETENTION_DAYS):
+    """Delete entries unused for `retention_days`; returns how many."""
+    cursor.execute(PURGE_QUERY, (retention_days,))
+    return cursor.rowcount
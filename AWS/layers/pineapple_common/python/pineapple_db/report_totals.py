@@ -0,0 +1,73 @@
+"""Check and rebuild the report totals stored on report_data.
+
+total and receipt_count are kept by triggers on receipt_data (migration
+0004). find_drift compares them with a fresh SUM over receipt_data and
+rebuild rewrites reports from that SUM, e.g. after rows were fixed by hand
+with the triggers disabled.
+"""
+
+DRIFT_QUERY = """
+SELECT rd.report_number, rd.user_id, rd.total, rd.receipt_count,
+       COALESCE(sums.amount, 0) AS expected_total,
+       COALESCE(sums.receipts, 0) AS expected_receipt_count
+FROM report_data rd
+LEFT JOIN (
+    SELECT report_number, user_id, SUM(act_amount) AS amount, COUNT(*) AS receipts
+    FROM receipt_data
+    WHERE report_number IS NOT NULL
+    GROUP BY report_number, user_id
+) sums ON sums.report_number = rd.report_number AND sums.user_id = rd.user_id
+WHERE rd.total <> COALESCE(sums.amount, 0)
+   OR rd.receipt_count <> COALESCE(sums.receipts, 0)
+ORDER BY rd.report_number, rd.user_id
+"""
+
+REBUILD_QUERY = """
+UPDATE report_data rd
+SET (total, receipt_count) = (
+    SELECT COALESCE(SUM(rct.act_amount), 0), COUNT(*)
+    FROM receipt_data rct
+    WHERE rct.report_number = rd.report_number AND rct.user_id = rd.user_id
+)
+FROM unnest(%s::text[], %s::text[]) AS k(report_number, user_id)
+WHERE rd.report_number = k.report_number AND rd.user_id = k.user_id
+"""
+
+
+def find_drift(cursor):
+    """Reports whose stored total or receipt_count disagree with receipt_data."""
+    cursor.execute(DRIFT_QUERY)
+    return cursor.fetchall()
+
+
+def rebuild(cursor, reports):
+    """Recompute the totals of the given (report_number, user_id) pairs.
+
+    The report rows are locked first so that the SUM, taken by the next
+    statement, sees every receipt change that got to the row before us; any
+    later change waits and applies its delta on top.
+    """
+    reports = list(reports)
+    if not reports:
+        return 0
+    keys = ([r[0] for r in reports], [r[1] for r in reports])
+    cursor.execute("""
+    SELECT 1 FROM report_data rd
+    JOIN unnest(%s::text[], %s::text[]) AS k(report_number, user_id)
+      ON rd.report_number = k.report_number AND rd.user_id = k.user_id
+    ORDER BY rd.report_number, rd.user_id
+    FOR UPDATE OF rd
+    """, keys)
+    cursor.execute(REBUILD_QUERY, keys)
+    return cursor.rowcount
+
+
+def reconcile(cursor, repair=False):
+    """Return the drifted reports, rebuilding them when repair is set.
+
+    Expects a dict-row cursor, i.e. db_cursor(dict_rows=True).
+    """
+    drift = find_drift(cursor)
+    if repair:
+        rebuild(cursor, [(row["report_number"], row["user_id"]) for row in drift])
+    return drift
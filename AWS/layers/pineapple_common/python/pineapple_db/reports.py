@@ -0,0 +1,161 @@
+"""Multi-report queries shared by the report membership and review handlers."""
+
+SUMMARY_QUERY = """
+SELECT r.report_number, r.total::float8 AS total, r.receipt_count,
+       (SELECT COALESCE(json_agg(rct.receipt_id ORDER BY rct.receipt_id), '[]')
+        FROM receipt_data rct
+        WHERE rct.report_number = r.report_number AND rct.user_id = r.user_id) AS receipt_ids
+FROM report_data r
+WHERE r.user_id = %s AND r.report_number = ANY(%s)
+ORDER BY r.report_number
+"""
+
+
+def report_summaries(cursor, user_id, report_numbers):
+    """Total, receipt count and member receipt ids of each of the user's reports.
+
+    Run it after the change in the same transaction: the stored totals are
+    only updated once the changing statement has finished.
+    """
+    report_numbers = sorted(set(report_numbers))
+    if not report_numbers:
+        return []
+    cursor.execute(SUMMARY_QUERY, (user_id, report_numbers))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def receipt_id_list(value, max_items=500):
+    """Validate a list of receipt ids from a request body; raises ValueError."""
+    if not isinstance(value, list) or not value:
+        raise ValueError("'receipt_ids' must be a non-empty list")
+    if len(value) > max_items:
+        raise ValueError(f"At most {max_items} receipt_ids per request")
+    if not all(isinstance(receipt_id, str) and receipt_id for receipt_id in value):
+        raise ValueError("Every receipt_id must be a non-empty string")
+    return list(dict.fromkeys(value))
+
+
+# Approving and returning both act on reports that are waiting for review
+# (submitted and not yet approved); only the columns they set differ.
+REVIEW_ACTIONS = {
+    "approve": ("approved", "approved = true"),
+    "return": ("returned", "returned = true, submitted = false"),
+}
+
+REQUESTED_REPORTS = """
+SELECT q.idx, q.report_number, q.user_id, q.comment
+FROM unnest(%(idx)s::int[], %(report_number)s::text[], %(user_id)s::text[], %(comment)s::text[])
+    AS q(idx, report_number, user_id, comment)
+"""
+
+# The filter form: every report of one user that is waiting for review.
+PENDING_REPORTS_OF_USER = """
+SELECT (row_number() OVER (ORDER BY r.report_number))::int - 1 AS idx,
+       r.report_number, r.user_id, %(comment)s::text AS comment
+FROM report_data r
+WHERE r.user_id = %(filter_user_id)s
+AND r.submitted = true
+AND r.approved = false
+"""
+
+REVIEW_QUERY = """
+WITH requested AS ({requested}),
+targets AS (
+    SELECT q.idx, q.report_number, r.user_id, q.user_id AS requested_user_id, q.comment,
+           r.user_id IS NOT NULL AS found,
+           COALESCE(r.submitted AND NOT r.approved, false) AS pending
+    FROM requested q
+    LEFT JOIN report_data r
+      ON r.report_number = q.report_number
+      AND (q.user_id IS NULL OR r.user_id = q.user_id)
+),
+reviewed AS (
+    UPDATE report_data r
+    SET {assignments},
+        comment = COALESCE(t.comment, r.comment)
+    FROM targets t
+    WHERE r.report_number = t.report_number
+    AND r.user_id = t.user_id
+    AND t.pending
+    RETURNING r.report_number, r.user_id
+)
+SELECT t.idx, t.report_number, COALESCE(t.user_id, t.requested_user_id) AS user_id, t.found,
+       v.report_number IS NOT NULL AS reviewed
+FROM targets t
+LEFT JOIN reviewed v ON v.report_number = t.report_number AND v.user_id = t.user_id
+ORDER BY t.idx, t.user_id
+"""
+
+
+def review_request(body, max_items=500):
+    """Parse a bulk approve/return body into (reports, filter_user_id, comment).
+
+    Either "reports" lists report numbers or {"report_number", "user_id",
+    "comment"} objects, or "user_id" alone selects all of that user's
+    submitted reports. "comment" applies to every report without its own.
+    Raises ValueError.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    comment = body.get("comment")
+    if comment is not None and not isinstance(comment, str):
+        raise ValueError("'comment' must be a string")
+
+    items = body.get("reports", body.get("report_numbers"))
+    if items is None:
+        filter_user_id = body.get("user_id")
+        if not filter_user_id or not isinstance(filter_user_id, str):
+            raise ValueError("Provide 'reports' or a 'user_id' filter")
+        return [], filter_user_id, comment
+
+    if not isinstance(items, list) or not items:
+        raise ValueError("'reports' must be a non-empty list")
+    if len(items) > max_items:
+        raise ValueError(f"At most {max_items} reports per request")
+
+    reports = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"report_number": item}
+        if not isinstance(item, dict):
+            raise ValueError("Each report must be a report number or an object")
+        report_number, user_id = item.get("report_number"), item.get("user_id")
+        item_comment = item.get("comment", comment)
+        if not report_number or not isinstance(report_number, str):
+            raise ValueError("Every report needs a 'report_number'")
+        if user_id is not None and not isinstance(user_id, str):
+            raise ValueError("'user_id' must be a string")
+        if item_comment is not None and not isinstance(item_comment, str):
+            raise ValueError("'comment' must be a string")
+        reports.append({"report_number": report_number, "user_id": user_id, "comment": item_comment})
+    return reports, None, comment
+
+
+def review_reports(cursor, action, reports=(), filter_user_id=None, comment=None):
+    """Approve or return many reports in one statement.
+
+    Returns one outcome per report touched, in request order: status is the
+    action's past tense ("approved"/"returned"), "not_found", or
+    "not_pending" for reports that aren't waiting for review. A report number
+    given without a user_id matches that number for every user, as the single
+    report endpoints do.
+    """
+    done, assignments = REVIEW_ACTIONS[action]
+    if filter_user_id is not None:
+        requested = PENDING_REPORTS_OF_USER
+        params = {"filter_user_id": filter_user_id, "comment": comment}
+    else:
+        requested = REQUESTED_REPORTS
+        params = {
+            "idx": list(range(len(reports))),
+            "report_number": [r["report_number"] for r in reports],
+            "user_id": [r["user_id"] for r in reports],
+            "comment": [r["comment"] for r in reports],
+        }
+    cursor.execute(REVIEW_QUERY.format(requested=requested, assignments=assignments), params)
+
+    outcomes = []
+    for row in cursor.fetchall():
+        status = done if row["reviewed"] else "not_found" if not row["found"] else "not_pending"
+        outcomes.append({"report_number": row["report_number"], "user_id": row["user_id"], "status": status})
+    return outcomes
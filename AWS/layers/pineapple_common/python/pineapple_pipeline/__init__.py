@@ -0,0 +1,86 @@
+"""The receipt prediction steps as plain functions.
+
+Each step used to live only in its own Lambda, so one prediction paid a Step
+Functions transition, a possible cold start and a JSON round trip of the
+growing payload for steps that take microseconds. `predict` runs condense ->
+amount/date -> prompt -> model -> parse in one process; the per-step Lambdas
+are thin wrappers around the same functions, so both paths give the same
+output.
+
+A merchant the index already knows can skip the model, and so can a receipt
+the local classifier is sure about: `predict` takes a `category_lookup` and a
+`classify` for those (see pineapple_db.merchant_index and
+pineapple_pipeline.classifier, which needs numpy and is imported on its own).
+"""
+from pineapple_pipeline.condense import Condensed, LineItem, analyze_expense, condense, condense_expense
+from pineapple_pipeline.extract import DEFAULT_DATE, amount_and_date, extract_many
+from pineapple_pipeline import claim_check
+from pineapple_pipeline.merchant import merchant_key, merchant_of
+from pineapple_pipeline.model import invoke_model, invoke_model_response, parse_category
+from pineapple_pipeline.prompt import build_prompt
+
+DEFAULT_CATEGORY = "Meals"
+DEFAULT_AMOUNT = "0.00"
+
+
+def default_prediction(event):
+    """What a receipt Textract found nothing on is saved as."""
+    return {
+        "key": event["key"],
+        "user_id": event["user_id"],
+        "predicted_category": DEFAULT_CATEGORY,
+        "name": event["name"],
+        "predicted_date": dict(DEFAULT_DATE),
+        "predicted_amount": DEFAULT_AMOUNT
+    }
+
+
+def predict(event, textract_response=None, category_lookup=None, classify=None):
+    """Predict category, date and amount for the receipt in `event`.
+
+    `event` carries key, user_id and name (plus bucket when Textract still has
+    to run, and content_hash when RetrieveObjectFromS3 computed one). With an
+    `execution` name and PIPELINE_BUCKET set, the raw Textract and Bedrock
+    responses are stored there and referenced from "artifacts".
+
+    `category_lookup(merchant)` returns a category for a merchant key, or
+    None to ask the next one; so does `classify(condensed)`, and the model
+    answers last. "category_source" records which one answered. The
+    condensed extract goes along so PutReceiptToRDS can keep it to train the
+    classifier on.
+    """
+    artifacts = claim_check.Writer(event.get("execution"))
+    if textract_response is None:
+        textract_response = analyze_expense(event["bucket"], event["key"])
+        artifacts.store("textract", textract_response)
+    condensed = condense_expense(textract_response)
+    if not condensed:
+        prediction = default_prediction(event)
+    else:
+        predicted_date, predicted_amount = amount_and_date(condensed)
+        merchant = merchant_of(condensed)
+        category = category_lookup(merchant) if merchant and category_lookup else None
+        category_source = "merchant"
+        if not category and classify:
+            category, category_source = classify(condensed), "classifier"
+        if not category:
+            model_response = invoke_model_response(build_prompt(condensed))
+            artifacts.store("bedrock", model_response)
+            category, category_source = parse_category(model_response["generation"]), "model"
+        prediction = {
+            "key": event["key"],
+            "user_id": event["user_id"],
+            "predicted_category": category,
+            "predicted_date": predicted_date,
+            "predicted_amount": predicted_amount,
+            "name": event["name"],
+            "content_hash": event.get("content_hash"),
+            "merchant": merchant,
+            "category_source": category_source,
+            "condensed_extract": condensed
+        }
+
+    refs = artifacts.wait()
+    if refs:
+        prediction["artifacts"] = refs
+    return prediction
@@ -0,0 +1,68 @@
+"""Large step payloads kept in S3, with only a reference in the state.
+
+A state machine payload is capped at 256 KB and is re-serialised on every
+transition, so raw service responses (a long receipt's AnalyzeExpense output
+runs to hundreds of KB) are written to PIPELINE_BUCKET under
+executions/<execution name>/ and the state carries {"bucket", "key", "bytes"}.
+Without PIPELINE_BUCKET, or outside an execution, nothing is stored.
+"""
+import json
+import os
+import threading
+
+from pineapple_aws import get_client
+
+PREFIX = "executions"
+
+
+def artifact_key(execution, name):
+    return f"{PREFIX}/{execution}/{name}.json"
+
+
+def store(execution, name, payload, bucket=None):
+    """Write `payload` as JSON; returns its reference, or None when storing is off."""
+    bucket = bucket or os.environ.get("PIPELINE_BUCKET")
+    if not bucket or not execution:
+        return None
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    key = artifact_key(execution, name)
+    get_client("s3").put_object(Bucket=bucket, Key=key, Body=body, ContentType="application/json")
+    return {"bucket": bucket, "key": key, "bytes": len(body)}
+
+
+def load(ref):
+    return json.loads(get_client("s3").get_object(Bucket=ref["bucket"], Key=ref["key"])["Body"].read())
+
+
+class Writer:
+    """Stores artifacts on background threads so the writes overlap the next step.
+
+    An artifact that fails to store is logged and left out: the prediction
+    doesn't depend on it.
+    """
+
+    def __init__(self, execution, bucket=None):
+        self.execution = execution
+        self.bucket = bucket or os.environ.get("PIPELINE_BUCKET")
+        self.refs = {}
+        self._threads = []
+
+    def store(self, name, payload):
+        if not self.bucket or not self.execution:
+            return
+        thread = threading.Thread(target=self._store, args=(name, payload))
+        thread.start()
+        self._threads.append(thread)
+
+    def _store(self, name, payload):
+        try:
+            self.refs[name] = store(self.execution, name, payload, self.bucket)
+        except Exception as e:
+            print(f"Could not store {name} for {self.execution}: {e}")
+
+    def wait(self):
+        """{name: reference} for everything stored."""
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        return dict(self.refs)
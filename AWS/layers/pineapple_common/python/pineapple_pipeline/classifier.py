@@ -0,0 +1,150 @@
+"""Receipt category from a linear model over hashed n-grams, trained on corrected receipts.
+
+Each receipt is reduced to a handful of features: words and word pairs of
+its merchant and line items, and the size of its amount. Features are hashed
+into `dimensions` buckets, so the model is one (dimensions, categories)
+weight matrix, whatever the vocabulary (384 KB at the default size, much
+less compressed). Scoring a receipt
+is a sum of a few dozen weight rows and a softmax, microseconds next to the
+second a Bedrock call takes.
+
+`train` fits the weights offline (AWS/local/train_classifier.py); `load`
+fetches a trained index from S3 once per container. numpy is only imported
+with this module, which PredictReceipt loads on its first prediction rather
+than during a cold start.
+"""
+import io
+import math
+import zlib
+
+import numpy as np
+
+from pineapple_aws import get_client
+from pineapple_pipeline.extract import extract_amt_from_string
+from pineapple_pipeline.merchant import merchant_key
+
+# Bump when features() changes: an index trained on other features is refused.
+FEATURES_VERSION = 1
+DEFAULT_DIMENSIONS = 1 << 14
+AMOUNT_FIELDS = ("TOTAL", "AMOUNT_PAID", "SUBTOTAL")
+
+_loaded = {}
+
+
+def _words(text):
+    return [word for word in text.upper().split() if word.isalpha() and len(word) > 1]
+
+
+def features(condensed):
+    """The feature strings of a condensed extract."""
+    found = ["bias"]
+    merchant = merchant_key(condensed.get("VENDOR_NAME") or "")
+    if merchant:
+        words = merchant.split()
+        found.append("m:" + merchant)
+        found += ["v:" + word for word in words]
+        found += [f"vv:{a} {b}" for a, b in zip(words, words[1:])]
+    for item in (condensed.get("items") or {}).values():
+        words = _words(item)
+        found += ["i:" + word for word in words]
+        found += [f"ii:{a} {b}" for a, b in zip(words, words[1:])]
+    for field in AMOUNT_FIELDS:
+        amount = float(extract_amt_from_string(condensed.get(field, "")))
+        if amount:
+            # Powers of two: a coffee, a lunch, a tank of fuel, a hotel night.
+            found.append(f"a:{int(math.log2(amount + 1))}")
+            break
+    return found
+
+
+def hashed(found, dimensions):
+    """Distinct bucket numbers of a list of feature strings."""
+    return np.fromiter({zlib.crc32(feature.encode()) % dimensions for feature in found}, dtype=np.int64)
+
+
+class Classifier:
+    def __init__(self, weights, categories):
+        self.weights = weights
+        self.categories = list(categories)
+
+    @property
+    def dimensions(self):
+        return self.weights.shape[0]
+
+    def _probabilities(self, condensed):
+        scores = self.weights[hashed(features(condensed), self.dimensions)].sum(axis=0, dtype=np.float32)
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def probabilities(self, condensed):
+        """{category: probability} for a condensed extract."""
+        return dict(zip(self.categories, self._probabilities(condensed).tolist()))
+
+    def classify(self, condensed):
+        """(most likely category, its probability)."""
+        probabilities = self._probabilities(condensed)
+        best = int(probabilities.argmax())
+        return self.categories[best], float(probabilities[best])
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, weights=self.weights, categories=np.array(self.categories),
+                            features_version=np.array(FEATURES_VERSION))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as index:
+            if int(index["features_version"]) != FEATURES_VERSION:
+                raise ValueError(f"Classifier index has features version {int(index['features_version'])}, "
+                                 f"expected {FEATURES_VERSION}")
+            return cls(index["weights"], index["categories"].tolist())
+
+
+def train(extracts, categories, dimensions=DEFAULT_DIMENSIONS, epochs=200, learning_rate=0.5, l2=1e-4):
+    """A Classifier fitted to condensed extracts and the categories users kept for them.
+
+    Softmax regression by full-batch gradient descent (Adagrad steps), with
+    the sparse features kept as a flat list of bucket numbers per receipt.
+    """
+    names = sorted(set(categories))
+    labels = np.array([names.index(category) for category in categories])
+    rows = [hashed(features(condensed), dimensions) for condensed in extracts]
+    lengths = np.array([len(row) for row in rows])
+    columns = np.concatenate(rows)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    receipt_of = np.repeat(np.arange(len(rows)), lengths)
+
+    weights = np.zeros((dimensions, len(names)))
+    squared = np.zeros_like(weights)
+    for _ in range(epochs):
+        # Every receipt has the bias feature, so no row of reduceat is empty.
+        scores = np.add.reduceat(weights[columns], starts, axis=0)
+        probabilities = np.exp(scores - scores.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        probabilities[np.arange(len(rows)), labels] -= 1
+        probabilities /= len(rows)
+        gradient = np.stack([np.bincount(columns, probabilities[receipt_of, c], dimensions)
+                             for c in range(len(names))], axis=1)
+        gradient += l2 * weights
+        squared += gradient ** 2
+        weights -= learning_rate * gradient / (np.sqrt(squared) + 1e-8)
+    return Classifier(weights.astype(np.float32), names)
+
+
+def load(bucket, key):
+    """The classifier stored at s3://bucket/key, fetched once per container.
+
+    A failed fetch is remembered too, so a missing index costs one S3 call
+    per container rather than one per receipt.
+    """
+    if (bucket, key) not in _loaded:
+        try:
+            _loaded[(bucket, key)] = Classifier.from_bytes(
+                get_client("s3").get_object(Bucket=bucket, Key=key)["Body"].read())
+        except Exception as e:
+            _loaded[(bucket, key)] = e
+    found = _loaded[(bucket, key)]
+    if isinstance(found, Exception):
+        raise found
+    return found
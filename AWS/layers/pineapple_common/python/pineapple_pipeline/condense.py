@@ -0,0 +1,107 @@
+"""Textract AnalyzeExpense output reduced to the fields the later steps use.
+
+`condense` walks the response once: every ExpenseDocument (a multi-page
+receipt can come back as several), every LineItemGroup and every LineItem.
+The result keeps each field's confidence so callers can tell a clear TOTAL
+from a smudged one. `Condensed.as_extract()` is the plain dict the prompt,
+the amount/date step and the state machine payload use.
+"""
+from pineapple_aws import get_client
+
+# Line items beyond this are left out of the extract. A big grocery receipt
+# would otherwise blow up the prompt and the state machine payload, and the
+# first few dozen items say as much about the category as all of them.
+MAX_EXTRACT_ITEMS = 50
+
+# Fields that make up an item's description, in the order they're written.
+ITEM_DESCRIPTION_FIELDS = ("ITEM", "QUANTITY", "PRICE")
+
+
+class LineItem:
+    __slots__ = ("fields", "confidence")
+
+    def __init__(self, fields, confidence):
+        self.fields = fields
+        self.confidence = confidence
+
+    def describe(self):
+        """One line for the item: name, quantity and price, else the whole row Textract read."""
+        parts = [self.fields[name] for name in ITEM_DESCRIPTION_FIELDS if self.fields.get(name)]
+        if parts:
+            return " ".join(parts)
+        if self.fields.get("EXPENSE_ROW"):
+            return self.fields["EXPENSE_ROW"]
+        return " ".join(value for value in self.fields.values() if value)
+
+
+class Condensed:
+    """fields: {type: text}, repeated types joined with a space.
+    confidences: {type: lowest confidence of any value joined into it}.
+    items: LineItem for every line item, in document order.
+    """
+
+    __slots__ = ("fields", "confidences", "items")
+
+    def __init__(self, fields, confidences, items):
+        self.fields = fields
+        self.confidences = confidences
+        self.items = items
+
+    def __bool__(self):
+        return bool(self.fields or self.items)
+
+    def as_extract(self, max_items=MAX_EXTRACT_ITEMS):
+        """{type: text, ..., "items": {"item0": description, ...}}; empty when nothing was found."""
+        extract = dict(self.fields)
+        if self.items:
+            extract["items"] = {f"item{n}": item.describe() for n, item in enumerate(self.items[:max_items])}
+        return extract
+
+
+def analyze_expense(bucket, key):
+    return get_client("textract").analyze_expense(
+        Document={"S3Object": {"Bucket": bucket, "Name": key}})
+
+
+def condense(response):
+    fields, confidences, items = {}, {}, []
+    # Missing Type / ValueDetection / Confidence read as empty and certain.
+    empty = {}
+    for document in response.get("ExpenseDocuments") or ():
+        for field in document.get("SummaryFields") or ():
+            kind = field.get("Type") or empty
+            detection = field.get("ValueDetection") or empty
+            key = kind.get("Text", "")
+            value = detection.get("Text", "")
+            confidence = min(kind.get("Confidence", 100.0), detection.get("Confidence", 100.0))
+            if key in fields:
+                fields[key] += " " + value
+                if confidence < confidences[key]:
+                    confidences[key] = confidence
+            else:
+                fields[key] = value
+                confidences[key] = confidence
+
+        for group in document.get("LineItemGroups") or ():
+            for line_item in group.get("LineItems") or ():
+                item_fields, item_confidence = {}, 100.0
+                for field in line_item.get("LineItemExpenseFields") or ():
+                    kind = field.get("Type") or empty
+                    detection = field.get("ValueDetection") or empty
+                    key = kind.get("Text", "")
+                    value = detection.get("Text", "")
+                    item_fields[key] = item_fields[key] + " " + value if key in item_fields else value
+                    confidence = detection.get("Confidence", 100.0)
+                    if confidence < item_confidence:
+                        item_confidence = confidence
+                    confidence = kind.get("Confidence", 100.0)
+                    if confidence < item_confidence:
+                        item_confidence = confidence
+                if item_fields:
+                    items.append(LineItem(item_fields, item_confidence))
+    return Condensed(fields, confidences, items)
+
+
+def condense_expense(response):
+    """condense(response).as_extract(): the plain dict the other steps take."""
+    return condense(response).as_extract()
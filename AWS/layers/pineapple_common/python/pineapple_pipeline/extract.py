@@ -0,0 +1,257 @@
+"""Receipt date and total picked out of the condensed Textract fields.
+
+Each date pattern is paired with the parser for the shape it matches, so a
+match is turned into a date directly instead of being run past a list of
+strptime formats until one stops raising. The patterns and their order are
+the ones the strptime version used, and the results are the same, including
+which strings are rejected.
+"""
+import json
+import re
+
+DEFAULT_DATE = {"full_date": "01/01/1899", "month": "01", "year": "1899", "day": "01"}
+
+AMOUNT_PATTERN = re.compile(r'\d+\.\d{2}?')
+
+# Year given to dates written without one.
+DEFAULT_YEAR = 2024
+
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+          "november", "december")
+FULL_MONTHS = {name: number for number, name in enumerate(MONTHS, 1)}
+ABBREVIATED_MONTHS = {name[:3]: number for number, name in enumerate(MONTHS, 1)}
+DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _two_digit_year(year):
+    # strptime's %y: 69-99 are 1969-1999, 00-68 are 2000-2068.
+    year = int(year)
+    return year + (1900 if year >= 69 else 2000)
+
+
+def _year(year):
+    """%y or %Y, by length; a three digit year matched neither."""
+    if len(year) == 2:
+        return _two_digit_year(year)
+    if len(year) == 4:
+        return int(year)
+    return None
+
+
+def _day_abbreviated_month_year(match):                 # 22Sep24
+    return _two_digit_year(match["year"]), ABBREVIATED_MONTHS.get(match["month"].lower()), match["day"]
+
+
+def _day_month_year(match):                             # 14-Dec-2024, 14 Dec 2024
+    if match["sep"] != match["sep2"]:
+        return None
+    return int(match["year"]), ABBREVIATED_MONTHS.get(match["month"].lower()), match["day"]
+
+
+def _month_name_day_year(match):                        # September 4 2024, Sep 4 2024
+    month = match["month"].lower()
+    return int(match["year"]), FULL_MONTHS.get(month) or ABBREVIATED_MONTHS.get(month), match["day"]
+
+
+def _abbreviated_month_day(match):                      # Sep 4
+    return None, ABBREVIATED_MONTHS.get(match["month"].lower()), match["day"]
+
+
+def _iso(match):                                        # 2024-10-30
+    return int(match["year"]), match["month"], match["day"]
+
+
+def _numeric(match):                                    # 10/30/24, 10-30-2024
+    year = _year(match["year"])
+    if match["sep"] != match["sep2"] or year is None:
+        return None
+    return year, match["month"], match["day"]
+
+
+def _month_day(match):                                  # 10/30, 10-30
+    return None, match["month"], match["day"]
+
+
+# Tried in order against INVOICE_RECEIPT_DATE; the last match of the first
+# pattern that matches wins and goes to that pattern's parser.
+INVOICE_DATE_PATTERNS = [(re.compile(pattern), parser) for pattern, parser in (
+    (r'\b(?P<day>\d{1,2})(?P<month>[A-Za-z]{3})(?P<year>\d{2})\b', _day_abbreviated_month_year),
+    (r'\b(?P<day>\d{1,2})(?P<sep>[- ])(?P<month>[A-Za-z]{3})(?P<sep2>[- ])(?P<year>\d{4})\b', _day_month_year),
+    (r'\b(?P<month>[A-Za-z]+)\s+(?P<day>\d{1,2})\s+(?P<year>\d{4})\b', _month_name_day_year),
+    (r'\b(?P<month>[A-Za-z]{3})\s+(?P<day>\d{1,2}),?\s+(?P<year>\d{4})\b', _month_name_day_year),
+    (r'\b(?P<month>[A-Za-z]{3})\s+(?P<day>\d{1,2})\b', _abbreviated_month_day),
+    (r'\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b', _iso),
+    (r'\b(?P<month>\d{1,2})(?P<sep>[-/])(?P<day>\d{1,2})(?P<sep2>[-/])(?P<year>\d{2,4})\b', _numeric),
+    (r'\b(?P<month>\d{1,2})-(?P<day>\d{1,2})\b', _month_day),
+    (r'\b(?P<month>\d{1,2})/(?P<day>\d{1,2})\b', _month_day),
+)]
+
+# mm/dd/yy, mm/dd/yyyy, mm-dd-yy, mm-dd-yyyy anywhere in the receipt
+FULL_TEXT_DATE_PATTERN = re.compile(
+    r'\b(?P<month>\d{1,2})(?P<sep>[-/])(?P<day>\d{1,2})(?P<sep2>[-/])(?P<year>\d{2}\d{2}?)\b')
+
+
+def amount_and_date(condensed):
+    """(predicted_date, predicted_amount) for a condensed extract."""
+    return _amount_and_date(condensed, invoice_receipt_date, extract_amt_from_string)
+
+
+def extract_many(extracts):
+    """amount_and_date for every extract in a batch, in order.
+
+    A receipt whose date raised gets its ValueError in place of the tuple,
+    so one bad date doesn't lose the rest of the batch. Dates and amounts
+    are parsed once per distinct text: a backfill repeats the same
+    INVOICE_RECEIPT_DATE and TOTAL strings many times over.
+    """
+    dates, amounts = {}, {}
+
+    def date_of(text):
+        found = dates.get(text)
+        if found is None:
+            try:
+                found = invoice_receipt_date(text)
+            except ValueError as e:
+                found = str(e)
+            dates[text] = found
+        if isinstance(found, str):
+            raise ValueError(found)
+        return dict(found)
+
+    def amount_of(text):
+        found = amounts.get(text)
+        if found is None:
+            found = amounts[text] = extract_amt_from_string(text)
+        return found
+
+    results = []
+    for condensed in extracts:
+        try:
+            results.append(_amount_and_date(condensed, date_of, amount_of))
+        except ValueError as e:
+            results.append(e)
+    return results
+
+
+def _amount_and_date(condensed, date_of, amount_of):
+    if 'INVOICE_RECEIPT_DATE' in condensed:
+        predicted_date = date_of(condensed['INVOICE_RECEIPT_DATE'])
+    else:
+        predicted_date = full_text_date(condensed) or dict(DEFAULT_DATE)
+
+    total = amount_of(condensed['TOTAL']) if 'TOTAL' in condensed else "0.00"
+    if total != "0.00":
+        predicted_amount = total
+    elif 'AMOUNT_PAID' in condensed:
+        predicted_amount = amount_of(condensed['AMOUNT_PAID'])
+    elif 'SUBTOTAL' in condensed:
+        subtotal = float(amount_of(condensed['SUBTOTAL']))
+        tax = float(amount_of(condensed.get('TAX', '')))
+        predicted_amount = f"{subtotal + tax:.2f}"
+    else:
+        predicted_amount = "0.00"
+
+    return predicted_date, predicted_amount
+
+
+def extract_amt_from_string(s):
+    """Largest d.dd amount in `s`, formatted with two decimals ("0.00" if none)."""
+    amounts = [float(a) for a in AMOUNT_PATTERN.findall(s)]
+    return f"{max(amounts) if amounts else 0:.2f}"
+
+
+def invoice_receipt_date(text):
+    """The date in an INVOICE_RECEIPT_DATE field as Textract read it."""
+    return invoice_date(text.replace(',', ' ').replace('.', ' ').strip())
+
+
+def invoice_date(s):
+    """The date in an INVOICE_RECEIPT_DATE value.
+
+    Raises ValueError when there is none, or when what looks like a date
+    isn't one ("13/45/2024").
+    """
+    match = None
+    for pattern, parser in INVOICE_DATE_PATTERNS:
+        for match in pattern.finditer(s):
+            pass
+        if match:
+            return _date(match, parser)
+    # What strptime made of an INVOICE_RECEIPT_DATE with no date in it.
+    raise ValueError("Date format not recognized: ")
+
+
+def full_text_date(condensed):
+    """The last mm/dd/yy(yy) date anywhere in the extract, or None."""
+    candidates = []
+    _date_candidates(condensed, candidates)
+    if not candidates:
+        return None
+    match = None
+    for match in FULL_TEXT_DATE_PATTERN.finditer('"'.join(candidates)):
+        pass
+    return _date(match, _numeric) if match else None
+
+
+def _date_candidates(value, candidates):
+    """Keys and values of `value` with a / or - in them, as json.dumps would write them.
+
+    The fallback date used to be searched for in json.dumps(condensed). Joining
+    the strings with a quote keeps that search's word boundaries without
+    serialising the whole extract, and text without a separator can't hold a
+    date. Only text json would escape (control characters, non-ASCII) is
+    written the way json writes it.
+    """
+    if isinstance(value, str):
+        if "/" in value or "-" in value:
+            candidates.append(value if value.isascii() and value.isprintable() else json.dumps(value))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            # Most keys and values are plain strings; skip the call for them.
+            if isinstance(key, str):
+                if "/" in key or "-" in key:
+                    _date_candidates(key, candidates)
+            else:
+                _date_candidates(key, candidates)
+            if isinstance(item, str):
+                if "/" in item or "-" in item:
+                    _date_candidates(item, candidates)
+            else:
+                _date_candidates(item, candidates)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _date_candidates(item, candidates)
+    else:
+        _date_candidates(json.dumps(value), candidates)
+
+
+def _date(match, parser):
+    """{"full_date": "mm/dd/yyyy", "month", "year", "day"} for a date Textract found.
+
+    Dates without a year are put in DEFAULT_YEAR.
+    """
+    fields = parser(match)
+    if fields is None or fields[1] is None:
+        raise ValueError(f"Date format not recognized: {match[0]}")
+    year, month, day = fields
+    # Like strptime, a date without a year is checked against 1900 (so no Feb 29).
+    year = 1900 if year is None else year
+    month, day = int(month), int(day)
+    if not _is_date(year, month, day):
+        raise ValueError(f"Date format not recognized: {match[0]}")
+
+    if year == 1900:
+        year = DEFAULT_YEAR
+    return {
+        "full_date": f"{month:02d}/{day:02d}/{year}",
+        "month": f"{month:02d}",
+        "year": str(year),
+        "day": f"{day:02d}"
+    }
+
+
+def _is_date(year, month, day):
+    # datetime.date's checks, without importing datetime for them.
+    if not (1 <= year <= 9999 and 1 <= month <= 12 and 1 <= day <= DAYS_IN_MONTH[month - 1]):
+        return False
+    return month != 2 or day < 29 or year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
@@ -0,0 +1,37 @@
+"""Merchant names reduced to one key per merchant, for the merchant index.
+
+Textract reads the same shop's VENDOR_NAME differently from receipt to
+receipt ("Shell 0571", "SHELL #0612", "Shell."), so the key drops case,
+punctuation, store numbers and a trailing company suffix. Plain string
+methods rather than regular expressions: PredictReceipt imports this on a
+cold start.
+"""
+STORE_WORDS = {"STORE", "NO"}
+COMPANY_SUFFIXES = {"INC", "LLC", "LTD", "CORP", "CO"}
+
+
+def merchant_key(vendor_name):
+    """The index key for a VENDOR_NAME, or None when nothing is left of it."""
+    text = "".join(c if c.isalnum() or c in "&#" else " " for c in vendor_name.upper().replace("'", ""))
+    words = []
+    for word in text.replace("#", " # ").split():
+        # "#0571", "STORE 12", "NO. 4410" and any bare number of three or more
+        # digits; "Motel 6" and "Pho 88" keep theirs.
+        if word.isdigit() and words and words[-1] in STORE_WORDS | {"#"}:
+            words.pop()
+        elif not (word.isdigit() and len(word) >= 3):
+            words.append(word)
+    words = [word for word in words if word != "#"]
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    # condense joins a VENDOR_NAME found on every page: "STARBUCKS STARBUCKS".
+    half = len(words) // 2
+    if half and len(words) % 2 == 0 and words[:half] == words[half:]:
+        words = words[:half]
+    return " ".join(words) or None
+
+
+def merchant_of(condensed):
+    """The merchant key of a condensed extract, or None without a VENDOR_NAME."""
+    vendor_name = condensed.get("VENDOR_NAME")
+    return merchant_key(vendor_name) if vendor_name else None
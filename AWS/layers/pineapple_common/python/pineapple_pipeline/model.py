@@ -0,0 +1,33 @@
+"""Bedrock call and parsing of the category out of its reply."""
+import json
+import re
+
+from pineapple_aws import get_client
+
+MODEL_ID = "arn:aws:bedrock:us-east-1::foundation-model/meta.llama3-70b-instruct-v1:0"
+MODEL_PARAMETERS = {"temperature": 0.2, "top_p": 1, "max_gen_len": 100}
+
+CATEGORY_PATTERN = re.compile(r'(Meals|Supplies|Safety|Travel|Lodging|Other)')
+FALLBACK_CATEGORY = "Meals"
+
+
+def invoke_model_response(prompt):
+    """The model's whole reply body for `prompt`, same parameters as the state machine used."""
+    response = get_client("bedrock-runtime").invoke_model(
+        modelId=MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps({"prompt": prompt, **MODEL_PARAMETERS})
+    )
+    return json.loads(response["body"].read())
+
+
+def invoke_model(prompt):
+    return invoke_model_response(prompt)["generation"]
+
+
+def parse_category(generation):
+    match = CATEGORY_PATTERN.search(generation)
+    if match is None:
+        return FALLBACK_CATEGORY
+    return match.group()
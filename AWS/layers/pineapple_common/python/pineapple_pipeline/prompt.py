@@ -0,0 +1,37 @@
+"""The categorisation prompt sent to Llama 3 on Bedrock."""
+
+PROMPT_HEADER = '''<s>[INST] <<SYS>>
+    You are an expert in receipt categorization. Categorize the following receipt into one of these categories: Meals, Supplies, Safety, Travel, Lodging, or Other. 
+
+    These are the definitions of each category with examples:
+    Meals: Expenses for food and drinks (e.g., restaurant bills, coffee shop receipts).
+    Supplies: Purchases for office or work-related materials (e.g., stationery, printer ink, electronics).
+    Safety: Expenses related to safety equipment or services (e.g., gloves, helmets, fire extinguishers).
+    Travel: Expenses for transportation (e.g., airfare, train tickets, taxi fares, gas, car rentals).
+    Lodging: Accommodation expenses (e.g., hotel bills, Airbnb receipts).
+    Other: Any expense that does not fit the above categories.
+    
+    Do not include explanations, steps, or any additional text.
+    If you do not know, pick a category at random.
+    Respond strictly in the format: Category:<category>
+
+    <</SYS>>
+
+    Receipt:
+
+    '''
+
+PROMPT_FOOTER = '''[/INST] What category does this receipt belong to? </s>'''
+
+
+def build_prompt(condensed):
+    lines = [PROMPT_HEADER]
+    for key, value in condensed.items():
+        if key == "items":
+            lines.append(key + ":\n")
+            for k, item in value.items():
+                lines.append(k + ":" + item.replace("\n", " ") + "\n")
+        else:
+            lines.append(key + ":" + value + "\n")
+    lines.append(PROMPT_FOOTER)
+    return "".join(lines)
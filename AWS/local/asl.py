@@ -0,0 +1,525 @@
+"""Run the Step Functions definitions in this repo locally.
+
+The interpreter covers the parts of the Amazon States Language our workflows
+use: Task, Choice, Pass, Parallel, Wait, Succeed and Fail states, Retry and
+Catch, and InputPath / Parameters / ResultSelector / ResultPath / OutputPath.
+
+Lambda tasks import AWS/src/<FunctionName>/lambda_function.py and call the
+handler in-process, once loaded per StateMachine like a warm container. The
+payload goes through JSON both ways, as it does on AWS, so a handler that
+returns something Lambda can't serialise fails here too. aws-sdk and Bedrock
+tasks call pineapple_aws.get_client, so the fakes the tests install there
+(or a real boto3 client) answer them; `integrations` overrides a resource
+outright.
+
+Parallel branches run one after the other. The handlers share module-level
+state such as the database connection, which separate Lambda containers
+would not. Every state's duration is recorded on the Execution, so a
+branch's cost is still visible.
+
+    python AWS/local/asl.py AWS/DeleteReceipt-definition.asl.json \\
+        --input '{"bucket": "b", "key": "r1.jpg", "user_id": "u1"}'
+"""
+import argparse
+import copy
+import importlib.util
+import json
+import operator
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(AWS_DIR, "src")
+LAYER_DIR = os.path.join(AWS_DIR, "layers", "pineapple_common", "python")
+
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+
+LAMBDA_INVOKE = "arn:aws:states:::lambda:invoke"
+BEDROCK_INVOKE_MODEL = "arn:aws:states:::bedrock:invokeModel"
+SDK_PREFIX = "arn:aws:states:::aws-sdk:"
+# aws-sdk integration service names that boto3 spells differently.
+SDK_SERVICE_NAMES = {"sfn": "stepfunctions"}
+
+PATH_TOKEN = re.compile(r"\.([^.\[]+)|\[(\d+)\]|\['([^']*)'\]")
+COMPARATORS = {"Equals": operator.eq, "LessThan": operator.lt, "GreaterThan": operator.gt,
+               "LessThanEquals": operator.le, "GreaterThanEquals": operator.ge}
+
+
+class StatesError(Exception):
+    """A failure with an ASL error name, which Retry and Catch match on."""
+
+    def __init__(self, error, cause=""):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+class StateRun:
+    """One state entered. output_bytes is the JSON size of what it passed on (None if it failed)."""
+
+    def __init__(self, name, state_type, seconds, attempts=1, output_bytes=None):
+        self.name = name
+        self.state_type = state_type
+        self.seconds = seconds
+        self.attempts = attempts
+        self.output_bytes = output_bytes
+
+    def __repr__(self):
+        return f"StateRun({self.name!r}, {self.state_type!r}, {self.seconds * 1000:.3f} ms)"
+
+
+class Execution:
+    """Result of one run. `states` lists every state entered, branches as Parallel/<n>/<name>."""
+
+    def __init__(self, status, output=None, error=None, cause=None, states=(), seconds=0.0):
+        self.status = status
+        self.output = output
+        self.error = error
+        self.cause = cause
+        self.states = list(states)
+        self.seconds = seconds
+
+
+# JSONPath -------------------------------------------------------------------
+
+def _path_tokens(path):
+    if not path.startswith("$"):
+        raise StatesError("States.Runtime", f"Invalid path: {path}")
+    tokens, position = [], 1
+    while position < len(path):
+        match = PATH_TOKEN.match(path, position)
+        if match is None:
+            raise StatesError("States.Runtime", f"Unsupported path: {path}")
+        name, index, quoted = match.groups()
+        tokens.append(int(index) if index is not None else (name if name is not None else quoted))
+        position = match.end()
+    return tokens
+
+
+def get_path(data, path, context=None):
+    if path.startswith("$$"):
+        data, path = context or {}, path[1:]
+    for token in _path_tokens(path):
+        try:
+            data = data[token]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError("States.Runtime", f"Path {path} not found in the input") from None
+    return data
+
+
+def has_path(data, path, context=None):
+    try:
+        get_path(data, path, context)
+    except StatesError:
+        return False
+    return True
+
+
+def set_path(data, path, value):
+    """Copy of `data` with `value` at `path` (ResultPath semantics)."""
+    tokens = _path_tokens(path)
+    if not tokens:
+        return value
+    result = copy.deepcopy(data) if isinstance(data, dict) else {}
+    node = result
+    for token in tokens[:-1]:
+        if not isinstance(node.get(token), dict):
+            node[token] = {}
+        node = node[token]
+    node[tokens[-1]] = value
+    return result
+
+
+def resolve_parameters(template, data, context=None):
+    """Parameters / ResultSelector: keys ending in ".$" are paths into `data`."""
+    if isinstance(template, dict):
+        resolved = {}
+        for key, value in template.items():
+            if key.endswith(".$"):
+                if not value.startswith("$"):
+                    raise StatesError("States.Runtime", f"Intrinsic functions are not supported: {value}")
+                resolved[key[:-2]] = get_path(data, value, context)
+            else:
+                resolved[key] = resolve_parameters(value, data, context)
+        return resolved
+    if isinstance(template, list):
+        return [resolve_parameters(item, data, context) for item in template]
+    return template
+
+
+# Choice rules ---------------------------------------------------------------
+
+def _typed(kind, value):
+    if kind == "Numeric":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind == "Boolean":
+        return isinstance(value, bool)
+    if kind == "Timestamp":
+        try:
+            datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except (AttributeError, ValueError):
+            return False
+        return True
+    return isinstance(value, str)
+
+
+def _comparable(kind, value):
+    if kind == "Timestamp":
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+def _string_matches(value, pattern):
+    parts = re.split(r"(?<!\\)\*", pattern)
+    regex = ".*".join(re.escape(part.replace("\\*", "*")) for part in parts)
+    return re.fullmatch(regex, value, re.DOTALL) is not None
+
+
+def evaluate_rule(rule, data, context=None):
+    if "And" in rule:
+        return all(evaluate_rule(r, data, context) for r in rule["And"])
+    if "Or" in rule:
+        return any(evaluate_rule(r, data, context) for r in rule["Or"])
+    if "Not" in rule:
+        return not evaluate_rule(rule["Not"], data, context)
+
+    variable = rule["Variable"]
+    if "IsPresent" in rule:
+        return has_path(data, variable, context) == rule["IsPresent"]
+    value = get_path(data, variable, context)
+    for test in ("IsNull", "IsString", "IsNumeric", "IsBoolean", "IsTimestamp"):
+        if test in rule:
+            kind = test[2:]
+            actual = value is None if kind == "Null" else _typed(kind, value)
+            return actual == rule[test]
+    if "StringMatches" in rule:
+        return isinstance(value, str) and _string_matches(value, rule["StringMatches"])
+
+    for key, expected in rule.items():
+        if key in ("Variable", "Next"):
+            continue
+        kind = next((k for k in ("String", "Numeric", "Boolean", "Timestamp") if key.startswith(k)), None)
+        comparison = key[len(kind):] if kind else key
+        if comparison.endswith("Path"):
+            comparison, expected = comparison[:-4], get_path(data, expected, context)
+        if kind is None or comparison not in COMPARATORS:
+            raise StatesError("States.Runtime", f"Unsupported choice rule: {key}")
+        if not (_typed(kind, value) and _typed(kind, expected)):
+            return False
+        return COMPARATORS[comparison](_comparable(kind, value), _comparable(kind, expected))
+    raise StatesError("States.Runtime", f"Choice rule has no comparison: {rule}")
+
+
+# Task integrations ----------------------------------------------------------
+
+def _now():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _snake_case(name):
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _function_name(function_name):
+    """Bare function name from a name, partial ARN or ARN with a qualifier."""
+    if function_name.startswith("arn:"):
+        return function_name.split(":")[6]
+    return function_name.split(":")[0]
+
+
+def _error_code(error):
+    response = getattr(error, "response", None)
+    if isinstance(response, dict) and response.get("Error", {}).get("Code"):
+        return response["Error"]["Code"]
+    return type(error).__name__
+
+
+def _round_trip(payload, error="Runtime.MarshalError"):
+    try:
+        return json.loads(json.dumps(payload))
+    except (TypeError, ValueError) as e:
+        raise StatesError(error, str(e)) from None
+
+
+def sdk_integration(service, action):
+    """aws-sdk:<service>:<action> through pineapple_aws.get_client."""
+    client_name = SDK_SERVICE_NAMES.get(service, service)
+    error_prefix = service.upper() if service == "s3" else service[:1].upper() + service[1:]
+
+    def call(parameters):
+        from pineapple_aws import get_client
+        try:
+            response = getattr(get_client(client_name), _snake_case(action))(**parameters)
+        except Exception as e:
+            raise StatesError(f"{error_prefix}.{_error_code(e)}", str(e)) from None
+        response = {k: v for k, v in response.items() if k != "ResponseMetadata"}
+        return _round_trip(response, "States.Runtime")
+    return call
+
+
+def bedrock_invoke_model(parameters):
+    from pineapple_aws import get_client
+    try:
+        response = get_client("bedrock-runtime").invoke_model(
+            modelId=parameters["ModelId"], contentType="application/json", accept="application/json",
+            body=json.dumps(parameters["Body"]))
+    except Exception as e:
+        raise StatesError(f"Bedrock.{_error_code(e)}", str(e)) from None
+    return {"Body": json.loads(response["body"].read()), "ContentType": "application/json"}
+
+
+def load_handler(function_name):
+    """lambda_handler from AWS/src/<function_name>/lambda_function.py."""
+    path = os.path.join(SRC_DIR, function_name, "lambda_function.py")
+    if not os.path.exists(path):
+        raise StatesError("Lambda.ResourceNotFoundException", f"No handler at {path}")
+    spec = importlib.util.spec_from_file_location("lambda_" + function_name.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+# Interpreter ----------------------------------------------------------------
+
+class StateMachine:
+    """One ASL definition, run with `run(input)`.
+
+    handlers       {function name: callable(event, context)} used instead of
+                   the handler in AWS/src
+    integrations   {Task Resource: callable(parameters)} used instead of the
+                   built-in lambda / bedrock / aws-sdk integrations
+    transition_ms  fixed delay added before every state, for modelling the
+                   per-state overhead of the real service
+    sleep, clock   injectable for Retry backoff, Wait states and timings
+    """
+
+    def __init__(self, definition, handlers=None, integrations=None, transition_ms=0.0,
+                 sleep=time.sleep, clock=time.perf_counter, rng=None):
+        self.definition = definition
+        self.handlers = dict(handlers or {})
+        self.integrations = dict(integrations or {})
+        self.transition = transition_ms / 1000
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def run(self, input, name="local"):
+        context = {"Execution": {"Id": f"arn:aws:states:local:000000000000:execution:local:{name}",
+                                 "Name": name, "Input": input,
+                                 "StartTime": _now()}}
+        runs = []
+        start = self.clock()
+        try:
+            output = self._run_states(self.definition, _round_trip(input, "States.Runtime"), context, runs, "")
+        except StatesError as e:
+            return Execution("FAILED", error=e.error, cause=e.cause, states=runs, seconds=self.clock() - start)
+        return Execution("SUCCEEDED", output=output, states=runs, seconds=self.clock() - start)
+
+    def _run_states(self, machine, data, context, runs, prefix):
+        states = machine["States"]
+        name = machine["StartAt"]
+        while True:
+            state = states[name]
+            if self.transition:
+                self.sleep(self.transition)
+            start = self.clock()
+            run = StateRun(prefix + name, state["Type"], 0.0)
+            runs.append(run)
+            context["State"] = {"Name": name, "EnteredTime": _now()}
+            try:
+                data, next_name = self._run_state(state, data, context, runs, prefix + name + "/", run)
+            finally:
+                run.seconds = self.clock() - start
+            run.output_bytes = len(json.dumps(data))
+            if next_name is None:
+                return data
+            name = next_name
+
+    def _run_state(self, state, data, context, runs, prefix, run):
+        kind = state["Type"]
+        if kind == "Fail":
+            raise StatesError(state.get("Error", "States.Fail"), state.get("Cause", ""))
+        if "InputPath" not in state:
+            effective = data
+        elif state["InputPath"] is None:
+            effective = {}
+        else:
+            effective = get_path(data, state["InputPath"], context)
+
+        if kind == "Choice":
+            for rule in state.get("Choices", []):
+                if evaluate_rule(rule, effective, context):
+                    return self._output(state, effective, context), rule["Next"]
+            if "Default" not in state:
+                raise StatesError("States.NoChoiceMatched", "No Choice rule matched and there is no Default")
+            return self._output(state, effective, context), state["Default"]
+        if kind == "Succeed":
+            return self._output(state, effective, context), None
+        if kind == "Wait":
+            seconds = state["Seconds"] if "Seconds" in state else get_path(effective, state["SecondsPath"], context)
+            self.sleep(seconds)
+            return self._output(state, effective, context), self._next(state)
+
+        parameters = effective
+        if "Parameters" in state:
+            parameters = resolve_parameters(state["Parameters"], effective, context)
+
+        if kind == "Pass":
+            result = state["Result"] if "Result" in state else parameters
+        elif kind in ("Task", "Parallel"):
+            try:
+                result = self._attempt(state, parameters, context, runs, prefix, run)
+            except StatesError as e:
+                catcher = self._catcher(state.get("Catch", []), e.error)
+                if catcher is None:
+                    raise
+                error_output = {"Error": e.error, "Cause": e.cause}
+                return self._apply_result_path(data, error_output, catcher.get("ResultPath", "$")), catcher["Next"]
+            if "ResultSelector" in state:
+                result = resolve_parameters(state["ResultSelector"], result, context)
+        else:
+            raise StatesError("States.Runtime", f"{kind} states are not supported")
+
+        data = self._apply_result_path(data, result, state.get("ResultPath", "$"))
+        return self._output(state, data, context), self._next(state)
+
+    def _attempt(self, state, parameters, context, runs, prefix, run):
+        attempts = {}
+        while True:
+            try:
+                if state["Type"] == "Parallel":
+                    return [self._run_states(branch, copy.deepcopy(parameters), dict(context), runs, f"{prefix}{n}/")
+                            for n, branch in enumerate(state["Branches"])]
+                return self._invoke(state["Resource"], parameters)
+            except StatesError as e:
+                retrier = self._catcher(state.get("Retry", []), e.error)
+                if retrier is None:
+                    raise
+                index = state["Retry"].index(retrier)
+                attempt = attempts.get(index, 0)
+                if attempt >= retrier.get("MaxAttempts", 3):
+                    raise
+                attempts[index] = attempt + 1
+                run.attempts += 1
+                delay = retrier.get("IntervalSeconds", 1) * retrier.get("BackoffRate", 2.0) ** attempt
+                if "MaxDelaySeconds" in retrier:
+                    delay = min(delay, retrier["MaxDelaySeconds"])
+                if retrier.get("JitterStrategy") == "FULL":
+                    delay = self.rng.uniform(0, delay)
+                self.sleep(delay)
+
+    def _invoke(self, resource, parameters):
+        if resource in self.integrations:
+            return _round_trip(self.integrations[resource](parameters), "States.Runtime")
+        if resource == LAMBDA_INVOKE:
+            payload = self._invoke_lambda(parameters["FunctionName"], parameters.get("Payload", {}))
+            return {"ExecutedVersion": "$LATEST", "Payload": payload, "StatusCode": 200}
+        if resource.startswith("arn:aws:lambda:"):
+            return self._invoke_lambda(resource, parameters)
+        if resource == BEDROCK_INVOKE_MODEL:
+            return bedrock_invoke_model(parameters)
+        if resource.startswith(SDK_PREFIX):
+            service, action = resource[len(SDK_PREFIX):].split(":")[:2]
+            return sdk_integration(service, action)(parameters)
+        raise StatesError("States.Runtime", f"No local integration for {resource}")
+
+    def _invoke_lambda(self, function_name, payload):
+        name = _function_name(function_name)
+        if name not in self.handlers:
+            self.handlers[name] = load_handler(name)
+        event = _round_trip(payload, "Lambda.InvalidRequestContentException")
+        try:
+            result = self.handlers[name](event, None)
+        except StatesError:
+            raise
+        except Exception as e:
+            cause = json.dumps({"errorMessage": str(e), "errorType": type(e).__name__})
+            raise StatesError(type(e).__name__, cause) from None
+        return _round_trip(result)
+
+    @staticmethod
+    def _catcher(rules, error):
+        """First Retry or Catch rule whose ErrorEquals matches `error`.
+
+        As on AWS, States.Runtime errors (bad paths, unsupported features)
+        are never caught, and States.TaskFailed matches everything except
+        States.Timeout.
+        """
+        for rule in rules:
+            names = rule["ErrorEquals"]
+            if error in names:
+                return rule
+            if error == "States.Runtime":
+                continue
+            if "States.ALL" in names or ("States.TaskFailed" in names and error != "States.Timeout"):
+                return rule
+        return None
+
+    @staticmethod
+    def _apply_result_path(data, result, result_path):
+        if result_path is None:
+            return data
+        return set_path(data, result_path, result)
+
+    @staticmethod
+    def _output(state, data, context):
+        if "OutputPath" not in state:
+            return data
+        if state["OutputPath"] is None:
+            return {}
+        return get_path(data, state["OutputPath"], context)
+
+    @staticmethod
+    def _next(state):
+        return None if state.get("End") else state["Next"]
+
+
+class LocalStepFunctions:
+    """Step Functions client stand-in that runs state machines with this interpreter.
+
+    `machines` maps state machine ARNs to StateMachine objects; handlers that
+    call pineapple_aws.stepfunctions.run_execution get the local result.
+    """
+
+    def __init__(self, machines):
+        self.machines = machines
+        self.executions = []
+
+    def start_sync_execution(self, stateMachineArn, input, name=None):
+        execution = self.machines[stateMachineArn].run(json.loads(input), name=name or "local")
+        self.executions.append(execution)
+        if execution.status == "SUCCEEDED":
+            return {"status": "SUCCEEDED", "output": json.dumps(execution.output)}
+        return {"status": execution.status, "error": execution.error, "cause": execution.cause}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("definition")
+    parser.add_argument("--input", default="{}")
+    parser.add_argument("--transition-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    execution = StateMachine.from_file(args.definition, transition_ms=args.transition_ms).run(json.loads(args.input))
+    for run in execution.states:
+        retries = f"  ({run.attempts} attempts)" if run.attempts > 1 else ""
+        print(f"{run.name:<48}{run.state_type:<10}{run.seconds * 1000:>10.3f} ms"
+              f"{run.output_bytes or 0:>10} B{retries}")
+    print(f"{execution.status} in {execution.seconds * 1000:.3f} ms")
+    print(json.dumps(execution.output if execution.status == "SUCCEEDED"
+                     else {"error": execution.error, "cause": execution.cause}, indent=2))
+    return 0 if execution.status == "SUCCEEDED" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
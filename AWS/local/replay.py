@@ -0,0 +1,309 @@
+"""Record Textract, Bedrock and S3 responses once, replay them offline.
+
+A Recorder wraps a real client and logs every call, with its request,
+response and latency. save() writes one fixture file per service:
+
+    <dir>/textract.json
+    <dir>/bedrock-runtime.json
+
+A ReplayClient answers from such a file. Calls are matched on the request,
+or, unless strict, on the operation alone, cycling through the recordings
+so a load test can send any number of receipts. Each call first sleeps
+for a latency drawn from a configurable distribution, and can fail with
+the service's throttling or internal error at a configured rate, so
+benchmarks see realistic tail behaviour without network access.
+
+install() puts replay clients into pineapple_aws._clients, where the
+handlers, the pipeline and the local state machine interpreter pick them up.
+
+    python AWS/local/replay.py record --bucket pineapple-receipts \\
+        --key TestImage1.jpg --key TestImage2.jpg --out AWS/tests/fixtures/replay/recorded
+
+Latency specs:
+    none                   no delay
+    recorded               the delay measured when the call was recorded
+    fixed:MS
+    uniform:LOW:HIGH
+    lognormal:MEDIAN:P99   right-skewed, like real service latency
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(AWS_DIR, "layers", "pineapple_common", "python")
+
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+
+FORMAT_VERSION = 1
+# z-score of the 99th percentile of a standard normal distribution
+Z_99 = 2.326
+
+# Error codes each service answers with when it is throttling or failing.
+THROTTLE_CODES = {"textract": "ProvisionedThroughputExceededException",
+                  "bedrock-runtime": "ThrottlingException", "s3": "SlowDown"}
+ERROR_CODES = {"textract": "InternalServerError", "bedrock-runtime": "InternalServerException",
+               "s3": "InternalError"}
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayClientError(Exception):
+    """Shaped like botocore's ClientError: the code is in response["Error"]["Code"]."""
+
+    def __init__(self, code, operation):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation (replayed)")
+        self.response = {"Error": {"Code": code, "Message": "replayed"}, "ResponseMetadata": {}}
+        self.operation_name = operation
+
+
+class _Exceptions:
+    """client.exceptions.<Code>: a ReplayClientError subclass per modelled error."""
+
+    ClientError = ReplayClientError
+
+    def __getattr__(self, name):
+        error = type(name, (ReplayClientError,), {})
+        setattr(self, name, error)
+        return error
+
+
+# Fixture encoding -----------------------------------------------------------
+
+def encode(value):
+    """JSON-safe copy of a boto3 request or response."""
+    if isinstance(value, dict):
+        return {k: encode(v) for k, v in value.items() if k != "ResponseMetadata"}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        # Keep text bodies (the Bedrock reply) readable in the fixture.
+        try:
+            return {"__text__": value.decode("utf-8")}
+        except UnicodeDecodeError:
+            return {"__bytes__": base64.b64encode(value).decode()}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    return value
+
+
+def decode(value):
+    """Inverse of encode(); bytes come back as readable streams, as boto3 returns bodies."""
+    if isinstance(value, dict):
+        if "__text__" in value:
+            return io.BytesIO(value["__text__"].encode("utf-8"))
+        if "__bytes__" in value:
+            return io.BytesIO(base64.b64decode(value["__bytes__"]))
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        return {k: decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    return value
+
+
+def request_key(request):
+    """Stable digest of a request, so replays can match on it."""
+    return hashlib.sha256(json.dumps(encode(request), sort_keys=True).encode()).hexdigest()[:16]
+
+
+def fixture_path(directory, service_name):
+    return os.path.join(directory, f"{service_name}.json")
+
+
+def load_fixture(directory, service_name):
+    with open(fixture_path(directory, service_name)) as f:
+        fixture = json.load(f)
+    if fixture.get("format_version") != FORMAT_VERSION:
+        raise ReplayError(f"{fixture_path(directory, service_name)}: format_version "
+                          f"{fixture.get('format_version')}, this replayer reads {FORMAT_VERSION}")
+    return fixture
+
+
+# Recording ------------------------------------------------------------------
+
+class Recorder:
+    """Wraps a client and records each call made through it."""
+
+    def __init__(self, client, service_name, clock=time.perf_counter):
+        self._client = client
+        self.service_name = service_name
+        self.clock = clock
+        self.calls = []
+
+    @property
+    def exceptions(self):
+        return self._client.exceptions
+
+    def __getattr__(self, operation):
+        method = getattr(self._client, operation)
+
+        def call(**request):
+            start = self.clock()
+            response = method(**request)
+            latency_ms = (self.clock() - start) * 1000
+            # Streaming bodies can be read once: keep the bytes and hand the
+            # caller a fresh stream over them.
+            bodies = {key: response[key].read() for key in ("body", "Body") if hasattr(response.get(key), "read")}
+            encoded = encode({**response, **bodies})
+            response.update({key: io.BytesIO(raw) for key, raw in bodies.items()})
+            self.calls.append({"operation": operation, "request_key": request_key(request),
+                               "request": encode(request), "response": encoded,
+                               "latency_ms": round(latency_ms, 3)})
+            return response
+        return call
+
+    def save(self, directory, synthetic=False, note=None):
+        os.makedirs(directory, exist_ok=True)
+        fixture = {"format_version": FORMAT_VERSION, "service": self.service_name,
+                   "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                   "synthetic": synthetic, "calls": self.calls}
+        if note:
+            fixture["note"] = note
+        with open(fixture_path(directory, self.service_name), "w") as f:
+            f.write(json.dumps(fixture, indent=2) + "\n")
+
+
+# Replay ---------------------------------------------------------------------
+
+def latency_model(spec, rng):
+    """callable(recorded_ms) -> ms to wait, from a spec such as "lognormal:800:3000"."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":")] if args else []
+    if kind == "none":
+        return lambda recorded: 0.0
+    if kind == "recorded":
+        return lambda recorded: recorded or 0.0
+    if kind == "fixed" and len(values) == 1:
+        return lambda recorded: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda recorded: rng.uniform(*values)
+    if kind == "lognormal" and len(values) == 2 and values[1] >= values[0] > 0:
+        mu, sigma = math.log(values[0]), math.log(values[1] / values[0]) / Z_99
+        return lambda recorded: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Bad latency spec: {spec}")
+
+
+class ReplayClient:
+    """Answers calls from a fixture file, with injected latency and faults.
+
+    latency      spec string (see the module docstring)
+    throttle     fraction of calls failing with the service's throttling error
+    error_rate   fraction failing with its internal server error
+    strict       only answer requests that were recorded exactly
+    """
+
+    def __init__(self, fixture, latency="recorded", throttle=0.0, error_rate=0.0, strict=False,
+                 sleep=time.sleep, rng=None):
+        self.service_name = fixture["service"]
+        self.rng = rng or random.Random()
+        self.latency = latency_model(latency, self.rng)
+        self.throttle = throttle
+        self.error_rate = error_rate
+        self.strict = strict
+        self.sleep = sleep
+        self.exceptions = _Exceptions()
+        self.by_request = {}
+        self.by_operation = {}
+        for call in fixture["calls"]:
+            self.by_request.setdefault((call["operation"], call["request_key"]), call)
+            self.by_operation.setdefault(call["operation"], []).append(call)
+        self._next = {operation: 0 for operation in self.by_operation}
+        self.served = []
+
+    @classmethod
+    def from_dir(cls, directory, service_name, **kwargs):
+        return cls(load_fixture(directory, service_name), **kwargs)
+
+    def _recording(self, operation, request):
+        call = self.by_request.get((operation, request_key(request)))
+        if call is None and not self.strict and self.by_operation.get(operation):
+            calls = self.by_operation[operation]
+            call = calls[self._next[operation] % len(calls)]
+            self._next[operation] += 1
+        if call is None:
+            raise ReplayError(f"No recorded {self.service_name}.{operation} call for {encode(request)}")
+        return call
+
+    def __getattr__(self, operation):
+        if operation.startswith("_"):
+            raise AttributeError(operation)
+
+        def call(**request):
+            recording = self._recording(operation, request)
+            delay_ms = self.latency(recording.get("latency_ms"))
+            roll = self.rng.random()
+            if roll < self.throttle:
+                # Throttled requests are turned away before any real work.
+                self.sleep(delay_ms / 1000 * 0.1)
+                raise getattr(self.exceptions, THROTTLE_CODES.get(self.service_name, "ThrottlingException"))(
+                    THROTTLE_CODES.get(self.service_name, "ThrottlingException"), operation)
+            self.sleep(delay_ms / 1000)
+            if roll < self.throttle + self.error_rate:
+                raise getattr(self.exceptions, ERROR_CODES.get(self.service_name, "InternalError"))(
+                    ERROR_CODES.get(self.service_name, "InternalError"), operation)
+            self.served.append(recording)
+            return decode(recording["response"])
+        return call
+
+
+def install(directory, services=("textract", "bedrock-runtime"), overrides=None, clients=None, **kwargs):
+    """Serve `services` from the fixture files in `directory` via pineapple_aws.get_client.
+
+    `kwargs` go to every ReplayClient; `overrides` maps a service name to
+    options for that service only. Returns {service: ReplayClient}.
+    """
+    if clients is None:
+        import pineapple_aws
+        clients = pineapple_aws._clients
+    installed = {}
+    for service_name in services:
+        options = {**kwargs, **(overrides or {}).get(service_name, {})}
+        client = ReplayClient.from_dir(directory, service_name, **options)
+        installed[service_name] = clients[(service_name, ())] = client
+    return installed
+
+
+def record(bucket, keys, directory, services=("textract", "bedrock-runtime")):
+    """Run the prediction pipeline live for `keys` and save what the services said."""
+    import pineapple_aws
+    from pineapple_pipeline import predict
+
+    recorders = {}
+    for service_name in services:
+        recorders[service_name] = Recorder(pineapple_aws.get_client(service_name), service_name)
+    pineapple_aws._clients.update({(name, ()): recorder for name, recorder in recorders.items()})
+    for key in keys:
+        prediction = predict({"bucket": bucket, "key": key, "user_id": "recorder", "name": key})
+        print(f"{key}: {prediction['predicted_category']} {prediction['predicted_amount']}")
+    for recorder in recorders.values():
+        recorder.save(directory)
+    return recorders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    recording = subparsers.add_parser("record", help="call Textract and Bedrock live and save the responses")
+    recording.add_argument("--bucket", required=True)
+    recording.add_argument("--key", action="append", required=True)
+    recording.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.bucket, args.key, args.out)
+
+
+if __name__ == "__main__":
+    main()
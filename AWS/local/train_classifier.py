@@ -0,0 +1,107 @@
+"""Train the local receipt classifier on the categories users kept, and upload it.
+
+Reads the condensed extract of every prediction (receipt_pred, from
+migration 0007) with the category its receipt ended up under
+(receipt_data.act_category), fits pineapple_pipeline.classifier on all but
+--holdout of them, reports how the held-out receipts fare at the serving
+threshold, and writes the index:
+
+    python AWS/local/train_classifier.py --out index.npz
+    python AWS/local/train_classifier.py --upload pineapple-pipeline-artifacts/classifier/index.npz
+
+--corpus trains on JSON lines of {"extract", "truth": {"category"}} instead,
+the format benchmarks/receipt_corpus.py writes. The database comes from
+PINEAPPLE_DB_DSN, then the SSM credentials the lambdas use.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(AWS_DIR, "layers", "pineapple_common", "python")
+
+if LAYER_DIR not in sys.path:
+    sys.path.insert(0, LAYER_DIR)
+
+from pineapple_aws import get_client
+from pineapple_pipeline import classifier
+
+TRAINING_QUERY = """
+SELECT p.condensed_extract, d.act_category
+FROM receipt_pred p
+JOIN receipt_data d ON d.receipt_id = p.receipt_id AND d.user_id = p.user_id
+WHERE p.condensed_extract IS NOT NULL AND d.act_category IS NOT NULL
+"""
+
+
+def training_data(cursor):
+    """[(condensed extract, category)] for every stored receipt that has both."""
+    cursor.execute(TRAINING_QUERY)
+    return [(extract, category) for extract, category in cursor.fetchall()]
+
+
+def corpus_data(path):
+    with open(path) as f:
+        return [(case["extract"], case["truth"]["category"]) for case in map(json.loads, f)]
+
+
+def evaluate(model, examples, min_confidence):
+    """(share of receipts answered at min_confidence, accuracy on those, accuracy on all)."""
+    answers = [(model.classify(extract), category) for extract, category in examples]
+    confident = [(found, category) for (found, confidence), category in answers if confidence >= min_confidence]
+    return (len(confident) / len(answers),
+            sum(found == category for found, category in confident) / len(confident) if confident else None,
+            sum(found == category for (found, _), category in answers) / len(answers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", metavar="PATH", help="train on these JSON lines instead of the database")
+    parser.add_argument("--dimensions", type=int, default=classifier.DEFAULT_DIMENSIONS)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--min-confidence", type=float,
+                        default=float(os.environ.get("CLASSIFIER_MIN_CONFIDENCE", "0.9")))
+    parser.add_argument("--seed", type=int, default=25)
+    parser.add_argument("--out", metavar="PATH")
+    parser.add_argument("--upload", metavar="BUCKET/KEY")
+    args = parser.parse_args()
+    if not (args.out or args.upload):
+        parser.error("pass --out, --upload or both")
+
+    if args.corpus:
+        examples = corpus_data(args.corpus)
+    else:
+        from pineapple_db import db_cursor
+        with db_cursor() as cursor:
+            examples = training_data(cursor)
+    if not examples:
+        raise SystemExit("No receipts with both a condensed extract and a category")
+
+    random.Random(args.seed).shuffle(examples)
+    held_out = examples[:int(len(examples) * args.holdout)]
+    trained_on = examples[len(held_out):]
+    model = classifier.train([extract for extract, _ in trained_on], [category for _, category in trained_on],
+                             dimensions=args.dimensions, epochs=args.epochs)
+    print(f"Trained on {len(trained_on)} receipts, {len(model.categories)} categories")
+    if held_out:
+        answered, confident_accuracy, accuracy = evaluate(model, held_out, args.min_confidence)
+        print(f"Held out {len(held_out)}: {accuracy:.1%} correct; at confidence {args.min_confidence:g} "
+              f"the classifier answers {answered:.1%}"
+              + (f", {confident_accuracy:.1%} of them correctly" if confident_accuracy is not None else ""))
+
+    data = model.to_bytes()
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(data)
+        print(f"Wrote {len(data)} bytes to {args.out}")
+    if args.upload:
+        bucket, key = args.upload.split("/", 1)
+        get_client("s3").put_object(Bucket=bucket, Key=key, Body=data, ContentType="application/octet-stream")
+        print(f"Uploaded {len(data)} bytes to s3://{bucket}/{key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+-- Tables used by the Lambda handlers in AWS/src. IF NOT EXISTS lets this run
+-- against the database that predates the migrations without touching it.
+
+CREATE TABLE IF NOT EXISTS report_data (
+    report_number TEXT NOT NULL,
+    user_id       TEXT NOT NULL,
+    name          TEXT,
+    comment       TEXT,
+    current       BOOLEAN NOT NULL DEFAULT TRUE,
+    submitted     BOOLEAN NOT NULL DEFAULT FALSE,
+    approved      BOOLEAN NOT NULL DEFAULT FALSE,
+    returned      BOOLEAN NOT NULL DEFAULT FALSE,
+    csv_file      TEXT,
+    PRIMARY KEY (report_number, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS receipt_data (
+    receipt_id    TEXT NOT NULL,
+    user_id       TEXT NOT NULL,
+    report_number TEXT,
+    name          TEXT,
+    title         TEXT,
+    act_amount    NUMERIC(12, 2),
+    act_date      DATE,
+    act_category  TEXT,
+    comment       TEXT,
+    PRIMARY KEY (receipt_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS receipt_pred (
+    receipt_id    TEXT NOT NULL,
+    user_id       TEXT NOT NULL,
+    pred_amount   NUMERIC(12, 2),
+    pred_date     DATE,
+    pred_category TEXT,
+    PRIMARY KEY (receipt_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS account_mapping (
+    expense_type TEXT PRIMARY KEY,
+    account_code TEXT
+);
@@ -0,0 +1,31 @@
+-- migrate: no-transaction
+-- Indexes for the WHERE clauses the handlers run on every request. Built
+-- CONCURRENTLY so writes to the live tables carry on while they build.
+
+-- RetrieveReceiptsWithNoReport (user_id = ? AND report_number IS NULL) and the
+-- report/receipt joins on (report_number, user_id).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS receipt_data_user_report_idx
+    ON receipt_data (user_id, report_number);
+
+-- RetreiveReportExpenseInformation and the approver views, which look up a
+-- report's receipts by report_number alone.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS receipt_data_report_idx
+    ON receipt_data (report_number);
+
+-- RetreiveCurrentReport, SubmitReport-user, UpdateReportNumber.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_user_current_idx
+    ON report_data (user_id, current);
+
+-- RetrieveReturnedReports-User, RetrieveReportTotalsAndNames-User.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_user_returned_idx
+    ON report_data (user_id, returned);
+
+-- RetrieveSubmittedReports-Approver.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_submitted_approved_idx
+    ON report_data (submitted, approved);
+
+-- RetrieveApprovedReports-Approver and AttachApprovedReportsToCSV-Approver
+-- only ever want approved reports that aren't in a CSV export yet.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_approved_unexported_idx
+    ON report_data (approved)
+    WHERE csv_file IS NULL;
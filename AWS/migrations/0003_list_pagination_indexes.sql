@@ -0,0 +1,31 @@
+-- migrate: no-transaction
+-- The list endpoints page with ORDER BY <key> and WHERE (<key>) > (<last key>).
+-- Each index below puts the page key right after the filter columns, so a page
+-- is a short range scan at any depth. They cover the 0002 indexes they replace.
+
+-- RetrieveReceiptsWithNoReport: user_id = ? AND report_number IS NULL, by receipt_id.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS receipt_data_user_report_receipt_idx
+    ON receipt_data (user_id, report_number, receipt_id);
+DROP INDEX CONCURRENTLY IF EXISTS receipt_data_user_report_idx;
+
+-- RetreiveReportExpenseInformation: report_number = ?, by (receipt_id, user_id).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS receipt_data_report_receipt_idx
+    ON receipt_data (report_number, receipt_id, user_id);
+DROP INDEX CONCURRENTLY IF EXISTS receipt_data_report_idx;
+
+-- RetrieveReturnedReports-Approver.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_returned_page_idx
+    ON report_data (report_number, user_id)
+    WHERE returned;
+
+-- RetrieveApprovedReports-Approver and AttachApprovedReportsToCSV-Approver.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_approved_unexported_page_idx
+    ON report_data (report_number, user_id)
+    WHERE approved AND csv_file IS NULL;
+DROP INDEX CONCURRENTLY IF EXISTS report_data_approved_unexported_idx;
+
+-- RetrieveSubmittedReports-Approver.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS report_data_awaiting_approval_page_idx
+    ON report_data (report_number, user_id)
+    WHERE submitted AND NOT approved;
+DROP INDEX CONCURRENTLY IF EXISTS report_data_submitted_approved_idx;
@@ -0,0 +1,98 @@
+-- Store each report's receipt total and count on report_data so the report
+-- lists read one row per report instead of summing receipt_data per request.
+-- Triggers keep them exact for every write to receipt_data, whichever lambda
+-- makes it; report_totals.py in the common layer can check and rebuild them.
+
+ALTER TABLE report_data
+    ADD COLUMN IF NOT EXISTS total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS receipt_count INTEGER NOT NULL DEFAULT 0;
+
+-- Statement-level, so a bulk attach or delete touches each report row once.
+CREATE OR REPLACE FUNCTION receipt_data_report_totals() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE report_data rd
+        SET total = rd.total + d.amount, receipt_count = rd.receipt_count + d.receipts
+        FROM (
+            SELECT report_number, user_id, SUM(COALESCE(act_amount, 0)) AS amount, COUNT(*) AS receipts
+            FROM new_receipts
+            WHERE report_number IS NOT NULL
+            GROUP BY report_number, user_id
+        ) d
+        WHERE rd.report_number = d.report_number AND rd.user_id = d.user_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE report_data rd
+        SET total = rd.total - d.amount, receipt_count = rd.receipt_count - d.receipts
+        FROM (
+            SELECT report_number, user_id, SUM(COALESCE(act_amount, 0)) AS amount, COUNT(*) AS receipts
+            FROM old_receipts
+            WHERE report_number IS NOT NULL
+            GROUP BY report_number, user_id
+        ) d
+        WHERE rd.report_number = d.report_number AND rd.user_id = d.user_id;
+    ELSE
+        -- Net old against new so edits that don't move money (a comment, a
+        -- title) leave report_data alone.
+        UPDATE report_data rd
+        SET total = rd.total + d.amount, receipt_count = rd.receipt_count + d.receipts
+        FROM (
+            SELECT report_number, user_id, SUM(amount) AS amount, SUM(receipts) AS receipts
+            FROM (
+                SELECT report_number, user_id, COALESCE(act_amount, 0) AS amount, 1 AS receipts
+                FROM new_receipts
+                UNION ALL
+                SELECT report_number, user_id, -COALESCE(act_amount, 0), -1
+                FROM old_receipts
+            ) changes
+            WHERE report_number IS NOT NULL
+            GROUP BY report_number, user_id
+            HAVING SUM(amount) <> 0 OR SUM(receipts) <> 0
+        ) d
+        WHERE rd.report_number = d.report_number AND rd.user_id = d.user_id;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS receipt_data_totals_insert ON receipt_data;
+CREATE TRIGGER receipt_data_totals_insert
+    AFTER INSERT ON receipt_data
+    REFERENCING NEW TABLE AS new_receipts
+    FOR EACH STATEMENT EXECUTE FUNCTION receipt_data_report_totals();
+
+DROP TRIGGER IF EXISTS receipt_data_totals_update ON receipt_data;
+CREATE TRIGGER receipt_data_totals_update
+    AFTER UPDATE ON receipt_data
+    REFERENCING OLD TABLE AS old_receipts NEW TABLE AS new_receipts
+    FOR EACH STATEMENT EXECUTE FUNCTION receipt_data_report_totals();
+
+DROP TRIGGER IF EXISTS receipt_data_totals_delete ON receipt_data;
+CREATE TRIGGER receipt_data_totals_delete
+    AFTER DELETE ON receipt_data
+    REFERENCING OLD TABLE AS old_receipts
+    FOR EACH STATEMENT EXECUTE FUNCTION receipt_data_report_totals();
+
+-- A report created after receipts already name it starts from their sum.
+CREATE OR REPLACE FUNCTION report_data_initial_totals() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    SELECT COALESCE(SUM(act_amount), 0), COUNT(*)
+    INTO NEW.total, NEW.receipt_count
+    FROM receipt_data
+    WHERE report_number = NEW.report_number AND user_id = NEW.user_id;
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS report_data_initial_totals ON report_data;
+CREATE TRIGGER report_data_initial_totals
+    BEFORE INSERT ON report_data
+    FOR EACH ROW EXECUTE FUNCTION report_data_initial_totals();
+
+UPDATE report_data rd
+SET (total, receipt_count) = (
+    SELECT COALESCE(SUM(rct.act_amount), 0), COUNT(*)
+    FROM receipt_data rct
+    WHERE rct.report_number = rd.report_number AND rct.user_id = rd.user_id
+);
@@ -0,0 +1,14 @@
+-- Predictions keyed by the uploaded image's content, so a photo that has been
+-- seen before skips Textract and Bedrock. prediction_cache.py in the common
+-- layer reads and writes it; PurgePredictionCache drops entries nobody has
+-- used for PREDICTION_CACHE_RETENTION_DAYS.
+
+CREATE TABLE IF NOT EXISTS prediction_cache (
+    cache_key    TEXT PRIMARY KEY,
+    prediction   JSONB NOT NULL,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_used_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    hit_count    INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS prediction_cache_last_used_at_idx ON prediction_cache (last_used_at);
@@ -0,0 +1,18 @@
+-- The category users settle on for each merchant, so PredictReceipt can skip
+-- Bedrock for merchants whose receipts always end up in the same category.
+-- PutReceiptToRDS records the merchant key of each prediction in
+-- receipt_pred.merchant; RefreshMerchantIndex rebuilds merchant_index from that
+-- and receipt_data.act_category. merchant_index.py in the common layer reads
+-- and refreshes it.
+
+ALTER TABLE receipt_pred ADD COLUMN IF NOT EXISTS merchant TEXT;
+
+CREATE TABLE IF NOT EXISTS merchant_index (
+    merchant     TEXT PRIMARY KEY,
+    category     TEXT NOT NULL,
+    receipts     INTEGER NOT NULL,
+    agreeing     INTEGER NOT NULL,
+    hit_count    INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_hit_at  TIMESTAMPTZ
+);
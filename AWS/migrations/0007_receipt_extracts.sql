@@ -0,0 +1,7 @@
+-- The condensed Textract extract each prediction was made from, kept with the
+-- prediction so the local classifier (pineapple_pipeline/classifier.py) can be
+-- trained on what users filed receipts under. AWS/local/train_classifier.py
+-- reads it joined to receipt_data.act_category. Receipts stored before this
+-- column, and predictions served from the prediction cache, have none.
+
+ALTER TABLE receipt_pred ADD COLUMN IF NOT EXISTS condensed_extract JSONB;
@@ -0,0 +1,8 @@
+-- Which of the merchant index, the local classifier and the model answered
+-- each prediction ('merchant', 'classifier', 'model'), as PutReceiptToRDS
+-- receives it in category_source. merchant_index.py refreshes from model
+-- answers and from categories users changed, never from the index's or the
+-- classifier's own unchanged answers, which would only reinforce themselves.
+-- Receipts stored before this column have none and count as model answers.
+
+ALTER TABLE receipt_pred ADD COLUMN IF NOT EXISTS category_source TEXT;
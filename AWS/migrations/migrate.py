@@ -0,0 +1,229 @@
+"""Apply the versioned SQL migrations in this directory to Postgres.
+
+Migrations are files named NNNN_description.sql and run in version order.
+Each one is recorded in schema_migrations with a checksum, so it runs once,
+and an applied file that has since been edited is reported instead of being
+silently skipped.
+
+A file runs inside a single transaction unless its first line is
+
+    -- migrate: no-transaction
+
+in which case its statements run one at a time in autocommit mode. CREATE
+INDEX CONCURRENTLY needs that. If a concurrent build fails, Postgres leaves an
+INVALID index behind that IF NOT EXISTS would skip, so the runner drops those
+before retrying the file.
+
+    python AWS/migrations/migrate.py --dsn postgresql://localhost/pineapple
+    python AWS/migrations/migrate.py --status
+
+Without --dsn the runner uses PINEAPPLE_DB_DSN, then the SSM credentials the
+lambdas use.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+import psycopg2
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+FILENAME_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Any value works as long as every runner uses the same one.
+ADVISORY_LOCK_ID = 7460011
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version, name, path, sql):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        self.transactional = not sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+    def statements(self):
+        return split_statements(self.sql)
+
+
+def split_statements(sql):
+    """Split on semicolons at the end of a line, dropping comment-only chunks.
+
+    Enough for the DDL kept here; function bodies with inner semicolons belong
+    in a transactional migration, which is sent as a single string.
+    """
+    statements = []
+    for chunk in re.split(r";[ \t]*(?:\n|$)", sql):
+        code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--"))
+        if code.strip():
+            statements.append(chunk.strip())
+    return statements
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    seen = {}
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME_PATTERN.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"{filename} and {seen[version]} share version {version}")
+        seen[version] = filename
+        path = os.path.join(directory, filename)
+        with open(path) as f:
+            migrations.append(Migration(version, match.group(2), path, f.read()))
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def ensure_history_table(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            checksum   TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """)
+    connection.commit()
+
+
+def applied_migrations(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT version, name, checksum FROM schema_migrations ORDER BY version")
+        rows = cursor.fetchall()
+    connection.commit()
+    return {version: (name, checksum) for version, name, checksum in rows}
+
+
+def drop_invalid_indexes(connection):
+    """Drop indexes left INVALID by an interrupted CREATE INDEX CONCURRENTLY."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+        SELECT format('%I.%I', n.nspname, c.relname)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE NOT i.indisvalid AND n.nspname = current_schema()
+        """)
+        invalid = [row[0] for row in cursor.fetchall()]
+        for index in invalid:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+    return invalid
+
+
+def apply_migration(connection, migration):
+    if migration.transactional:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(migration.sql)
+                record_migration(cursor, migration)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        return
+
+    connection.autocommit = True
+    try:
+        drop_invalid_indexes(connection)
+        with connection.cursor() as cursor:
+            for statement in migration.statements():
+                cursor.execute(statement)
+            record_migration(cursor, migration)
+    finally:
+        connection.autocommit = False
+
+
+def record_migration(cursor, migration):
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        (migration.version, migration.name, migration.checksum)
+    )
+
+
+def pending_migrations(migrations, applied):
+    pending = []
+    for migration in migrations:
+        if migration.version not in applied:
+            pending.append(migration)
+            continue
+        _, checksum = applied[migration.version]
+        if checksum != migration.checksum:
+            raise MigrationError(
+                f"{os.path.basename(migration.path)} was edited after it was applied; "
+                f"add a new migration instead")
+    return pending
+
+
+def migrate(connection, migrations=None, log=print):
+    """Apply every pending migration and return the ones that ran."""
+    migrations = load_migrations() if migrations is None else migrations
+    ensure_history_table(connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+    connection.commit()
+    try:
+        pending = pending_migrations(migrations, applied_migrations(connection))
+        for migration in pending:
+            log(f"Applying {os.path.basename(migration.path)}")
+            apply_migration(connection, migration)
+        return pending
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
+        connection.commit()
+
+
+def connect(dsn=None):
+    dsn = dsn or os.environ.get("PINEAPPLE_DB_DSN")
+    if dsn:
+        return psycopg2.connect(dsn)
+
+    sys.path.insert(0, os.path.join(os.path.dirname(MIGRATIONS_DIR), "layers", "pineapple_common", "python"))
+    from pineapple_db.credentials import get_credentials
+    credentials = get_credentials()
+    return psycopg2.connect(
+        host=credentials["DB_HOST"],
+        port=credentials["DB_PORT"],
+        user=credentials["DB_USER"],
+        password=credentials["DB_PASSWORD"],
+        dbname=credentials["DB_NAME"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply Pineapple Expense database migrations.")
+    parser.add_argument("--dsn", help="Postgres DSN (default: PINEAPPLE_DB_DSN, then SSM credentials)")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied")
+    args = parser.parse_args()
+
+    connection = connect(args.dsn)
+    try:
+        if args.status:
+            ensure_history_table(connection)
+            applied = applied_migrations(connection)
+            for migration in load_migrations():
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:04d} {migration.name:<40} {state}")
+            return
+
+        applied = migrate(connection)
+        print(f"{len(applied)} migration(s) applied")
+    except MigrationError as e:
+        sys.exit(f"Error: {e}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,7 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store = "/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]   
-    db_name = credentials["DB_NAME"]
-
     role = event['requestContext']['authorizer']['jwt']['claims']['roleType']
     if role != 'Admin':
         return {
@@ -63,19 +34,10 @@ def lambda_handler(event, context):
     WHERE rd.report_number = %s;  
     """
     
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port = db_port,
-            password=db_password,
-            dbname=db_name
-    )
-        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        with db_cursor(dict_rows=True) as cursor:
             cursor.execute(update_query, (comment, report_number))
             rows_affected = cursor.rowcount
-        connection.commit()
         if rows_affected == 0:
             return {
                 "statusCode": 404,
@@ -91,4 +53,4 @@ def lambda_handler(event, context):
     return {
         "statusCode": 200,
         "body": json.dumps({"message": "Report approved successfully"})
-    }
\ No newline at end of file
+    }
@@ -1,33 +1,7 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store = "/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]   
-    db_name = credentials["DB_NAME"]
     
     role = event['requestContext']['authorizer']['jwt']['claims']['roleType']
     if role != 'Admin':
@@ -62,18 +36,9 @@ def lambda_handler(event, context):
     WHERE approved = TRUE AND csv_file IS NULL
     """
     
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port = db_port,
-            password=db_password,
-            dbname=db_name
-    )
-        with connection.cursor() as cursor:
+        with db_cursor() as cursor:
             cursor.execute(update_query,(csv_file_name,))
-            connection.commit()
             rows_updated = cursor.rowcount
     except Exception as e:
         return {
@@ -85,4 +50,3 @@ def lambda_handler(event, context):
         "statusCode": 200,
         "body": json.dumps({"message": f"Updated {rows_updated} rows"})
     }
-
@@ -0,0 +1,49 @@
+import json
+from pineapple_db import db_cursor
+from pineapple_db.reports import review_request, review_reports
+
+def lambda_handler(event, context):
+    role = event['requestContext']['authorizer']['jwt']['claims']['roleType']
+    if role != 'Admin':
+        return {
+            "statusCode": 403,
+            "body": json.dumps({"error": "Access denied. Requires admin only."})
+        }
+
+    body = event.get("body")
+    if not body:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing request body"})
+        }
+
+    try:
+        body_json = json.loads(body)
+    except json.JSONDecodeError:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Invalid JSON format"})
+        }
+
+    try:
+        reports, filter_user_id, comment = review_request(body_json)
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    try:
+        with db_cursor(dict_rows=True) as cursor:
+            results = review_reports(cursor, "approve", reports, filter_user_id, comment)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    approved = sum(1 for r in results if r["status"] == "approved")
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"approved": approved, "failed": len(results) - approved, "results": results})
+    }
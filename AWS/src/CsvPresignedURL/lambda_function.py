@@ -1,11 +1,9 @@
 import json
 import os
-import boto3
+from pineapple_aws import get_client
 
 S3_BUCKET_NAME = os.getenv("BUCKET")
 
-s3_client = boto3.client("s3")
-
 def lambda_handler(event, context):
     role = event['requestContext']['authorizer']['jwt']['claims']['roleType']
     if role != 'Admin':
@@ -46,7 +44,7 @@ def lambda_handler(event, context):
             }
 
 
-        presigned_url = s3_client.generate_presigned_url(
+        presigned_url = get_client("s3").generate_presigned_url(
             "put_object",
             Params={
                 "Bucket": S3_BUCKET_NAME,
@@ -1,10 +1,6 @@
 import json
-import psycopg2
 import os
-import time
-import boto3
-
-stepfunction_client = boto3.client('stepfunctions')
+from pineapple_aws.stepfunctions import run_execution
 
 def lambda_handler(event, context):
 
@@ -40,17 +36,7 @@ def lambda_handler(event, context):
             "user_id": user_id
         }
 
-        response = stepfunction_client.start_execution(
-            stateMachineArn=step_function_arn,
-            input=json.dumps(step_function_input)
-        )
-        print("returned from step function")
-        print(response)
-
-        execution_arn = response['executionArn']
-        print(f"Execution ARN: {execution_arn}")
-
-        output = get_execution_output(execution_arn)
+        output = run_execution(step_function_arn, step_function_input)
         print(output)
         return output
         
@@ -58,16 +44,3 @@ def lambda_handler(event, context):
         print(e)
         print(f"Error getting object {receipt_id} from bucket {bucket}. Make sure they exist and your bucket is in the same region as this function.")
         raise e
-
-def get_execution_output(execution_arn):
-    while True:
-        execution_response = stepfunction_client.describe_execution(executionArn=execution_arn)
-        status = execution_response['status']
-
-        if status == 'SUCCEEDED':
-            return json.loads(execution_response['output'])
-        
-        elif status in ['FAILED', 'TIMED_OUT', 'ABORTED']:
-            raise Exception(f"Step Function execution failed with status: {status}")
-
-        time.sleep(2)
\ No newline at end of file
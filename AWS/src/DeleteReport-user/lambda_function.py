@@ -1,33 +1,7 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store="/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]
-    db_name = credentials["DB_NAME"]
 
     user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
 
@@ -70,25 +44,13 @@ def lambda_handler(event, context):
     AND user_id = %s;
     """
 
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            port=db_port,
-            user=db_user,
-            password=db_password,
-            dbname=db_name
-        )
-        cursor = connection.cursor()
-
-        cursor.execute(detach_query, (report_number, user_id))
-        receipts_detached = cursor.rowcount 
-
-
-        cursor.execute(delete_query, (report_number, user_id))
-        reports_deleted = cursor.rowcount
+        with db_cursor() as cursor:
+            cursor.execute(detach_query, (report_number, user_id))
+            receipts_detached = cursor.rowcount
 
-        connection.commit()
+            cursor.execute(delete_query, (report_number, user_id))
+            reports_deleted = cursor.rowcount
 
         if reports_deleted == 0:
             message = "No matching report found to delete."
@@ -101,12 +63,7 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        if connection:
-            connection.rollback()
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
-    finally:
-        if connection:
-            connection.close()
@@ -0,0 +1,68 @@
+import json
+from pineapple_db import db_cursor
+from pineapple_db.reports import receipt_id_list, report_summaries
+
+# Take the receipts off whatever open report they are on (or only off
+# report_number when given). Receipts on submitted or approved reports stay.
+detach_query = """
+UPDATE receipt_data rd
+SET report_number = NULL
+FROM report_data r
+WHERE rd.user_id = %(user_id)s
+AND rd.receipt_id = ANY(%(receipt_ids)s)
+AND (%(report_number)s IS NULL OR rd.report_number = %(report_number)s)
+AND r.report_number = rd.report_number
+AND r.user_id = rd.user_id
+AND r.submitted = false
+AND r.approved = false
+RETURNING rd.receipt_id, r.report_number;
+"""
+
+def lambda_handler(event, context):
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+
+    body = event.get("body")
+    if not body:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing request body"})
+        }
+
+    try:
+        body_json = json.loads(body)
+    except json.JSONDecodeError:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Invalid JSON format"})
+        }
+
+    try:
+        receipt_ids = receipt_id_list(body_json.get("receipt_ids"))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    params = {"user_id": user_id, "report_number": body_json.get("report_number"), "receipt_ids": receipt_ids}
+
+    try:
+        with db_cursor(dict_rows=True) as cursor:
+            cursor.execute(detach_query, params)
+            detached = cursor.fetchall()
+            summaries = report_summaries(cursor, user_id, [row["report_number"] for row in detached])
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    detached_ids = {row["receipt_id"] for row in detached}
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "detached": [r for r in receipt_ids if r in detached_ids],
+            "not_detached": [r for r in receipt_ids if r not in detached_ids],
+            "reports": summaries
+        })
+    }
@@ -1,8 +1,7 @@
-import boto3
 import os
 import json
+from pineapple_aws import get_client
 
-s3_client = boto3.client('s3')
 BUCKET_NAME = os.environ.get('BUCKET')
 
 def lambda_handler(event, context):
@@ -15,7 +14,7 @@ def lambda_handler(event, context):
         }
 
     try:
-        paginator = s3_client.get_paginator('list_objects_v2')
+        paginator = get_client('s3').get_paginator('list_objects_v2')
         page_iterator = paginator.paginate(Bucket=BUCKET_NAME)
 
         csv_files = []
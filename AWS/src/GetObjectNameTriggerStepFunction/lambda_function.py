@@ -1,13 +1,9 @@
 import json
-import urllib.parse
-import boto3
-import time
 import os
-
-print('Loading function')
-
-stepfunction_client = boto3.client('stepfunctions')
-
+from pineapple_aws import get_client
+from pineapple_aws.stepfunctions import (FAILED_STATUSES, ExecutionFailed, describe_execution, execution_arn,
+                                         run_execution, start_execution, upload_execution_name,
+                                         wait_for_execution)
 
 
 def lambda_handler(event, context):
@@ -36,6 +32,13 @@ def lambda_handler(event, context):
     receipt_id = body_json.get("receipt_id")
     name = body_json.get("name")
 
+    # {"async": true} or "Prefer: respond-async" answers straight away with a
+    # job id for /predictions/status instead of holding the request open for
+    # Textract and Bedrock.
+    headers = event.get("headers") or {}
+    if body_json.get("async") is True or "respond-async" in headers.get("prefer", ""):
+        return start_prediction_job(bucket, receipt_id, user_id, name)
+
     try:
         print("in try loop")
         step_function_input = {
@@ -45,17 +48,9 @@ def lambda_handler(event, context):
             "name": name
         }
 
-        response = stepfunction_client.start_execution(
-            stateMachineArn=step_function_arn,
-            input=json.dumps(step_function_input)
-        )
-        print("returned from step function")
-        print(response)
-
-        execution_arn = response['executionArn']
-        print(f"Execution ARN: {execution_arn}")
-
-        output = get_execution_output(execution_arn)
+        output = upload_prediction(bucket, user_id, receipt_id)
+        if output is None:
+            output = run_execution(step_function_arn, step_function_input)
         print(output)
         return output
         
@@ -64,14 +59,67 @@ def lambda_handler(event, context):
         print(f"Error getting object {receipt_id} from bucket {bucket}. Make sure they exist and your bucket is in the same region as this function.")
         raise e
 
-def get_execution_output(execution_arn):
-    while True:
-        execution_response = stepfunction_client.describe_execution(executionArn=execution_arn)
-        
-        status = execution_response['status']
-        if status == 'SUCCEEDED':
-            return json.loads(execution_response['output'])
-        elif status in ['FAILED', 'TIMED_OUT', 'ABORTED']:
-            raise Exception(f"Step Function execution failed with status: {status}")
-        
-        time.sleep(2)
\ No newline at end of file
+def start_prediction_job(bucket, receipt_id, user_id, name):
+    if not receipt_id:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing receipt_id in request"})
+        }
+
+    # Hand back the upload-triggered job when there is one that hasn't failed.
+    execution = upload_execution(bucket, user_id, receipt_id)
+    if execution is not None and execution["status"] not in FAILED_STATUSES:
+        return {
+            "statusCode": 202,
+            "body": json.dumps({"job_id": execution["name"], "receipt_id": receipt_id,
+                                "status": execution["status"]})
+        }
+
+    # os.urandom rather than uuid: importing uuid also loads platform and re.
+    job_id = os.urandom(16).hex()
+    step_function_input = {
+        "bucket": bucket,
+        "key": receipt_id,
+        "user_id": user_id,
+        "name": name
+    }
+    start_execution(os.environ.get("ASYNC_STEP_FUNCTION_ARN"), step_function_input, name=job_id)
+
+    return {
+        "statusCode": 202,
+        "body": json.dumps({"job_id": job_id, "receipt_id": receipt_id, "status": "RUNNING"})
+    }
+
+def upload_execution(bucket, user_id, receipt_id):
+    """The prediction StartPredictionOnUpload began for this upload, if any.
+
+    Its name comes from the uploader, the object's ETag and the upload's
+    nonce, so a later upload under the same key, even of the same image, isn't
+    answered with the earlier upload's prediction.
+    """
+    s3 = get_client("s3")
+    try:
+        head = s3.head_object(Bucket=bucket, Key=receipt_id)
+    except s3.exceptions.ClientError:
+        return None
+    metadata = head.get("Metadata", {})
+    if metadata.get("user-id") != user_id:
+        return None
+    name = upload_execution_name(user_id, receipt_id, head["ETag"].strip('"'), metadata)
+    return describe_execution(execution_arn(os.environ.get("ASYNC_STEP_FUNCTION_ARN"), name))
+
+def upload_prediction(bucket, user_id, receipt_id):
+    """Output of the upload-triggered prediction, waiting for it if needed.
+
+    None if there wasn't one or it failed; the caller then runs it itself.
+    """
+    execution = upload_execution(bucket, user_id, receipt_id)
+    if execution is None:
+        return None
+    try:
+        if execution["status"] == "SUCCEEDED":
+            return json.loads(execution["output"])
+        return wait_for_execution(execution["executionArn"])
+    except ExecutionFailed as e:
+        print(f"Upload-triggered prediction for {receipt_id} failed ({e}); running it again")
+        return None
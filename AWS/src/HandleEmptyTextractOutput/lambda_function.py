@@ -1,14 +1,9 @@
-import json
+from pineapple_pipeline import DEFAULT_AMOUNT, DEFAULT_CATEGORY, DEFAULT_DATE
+
 
 def lambda_handler(event, context):
-    
     return {
-  "predicted_category": "Meals",
-  "predicted_date": {
-    "full_date": "01/01/1899",
-    "month": "01",
-    "year": "1899",
-    "day": "01"
-  },
-  "predicted_amount": "0.00"
-}
\ No newline at end of file
+        "predicted_category": DEFAULT_CATEGORY,
+        "predicted_date": dict(DEFAULT_DATE),
+        "predicted_amount": DEFAULT_AMOUNT
+    }
@@ -1,37 +1,19 @@
-import json
-import re
+from pineapple_pipeline import claim_check, parse_category
 
-def lambda_handler(event, context):
-    key = event['key']
-    user_id = event['user_id']
-    name = event['name']
-
-    ## llame model
-    generation = event['bedrock_response']['Body']['generation']
-
-    predicted_category = parse_llama_response(generation)
 
-    predicted_date = event['predicted_date']
-    predicted_amount = event['predicted_amount']
-
-    content = {
-        "key": key,
-        "user_id": user_id,
-        "predicted_category" : predicted_category,
-        "predicted_date" : predicted_date,
-        "predicted_amount" : predicted_amount,
-        "name": name
+def lambda_handler(event, context):
+    ## llama model
+    if 'bedrock_response' in event:
+        generation = event['bedrock_response']['Body']['generation']
+    else:
+        generation = claim_check.load(event['bedrock_ref'])['generation']
+
+    return {
+        "key": event['key'],
+        "user_id": event['user_id'],
+        "predicted_category": parse_category(generation),
+        "predicted_date": event['predicted_date'],
+        "predicted_amount": event['predicted_amount'],
+        "name": event['name'],
+        "content_hash": event.get("content_hash")
     }
-
-    return content
-
-
-
-
-def parse_llama_response(parsed_body):
-    regex = r'(Meals|Supplies|Safety|Travel|Lodging|Other)'
-    match = re.search(regex, parsed_body)
-    print(match)
-    if match is None:
-        return "Meals"
-    return match.group()
\ No newline at end of file
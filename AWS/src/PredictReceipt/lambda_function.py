@@ -0,0 +1,86 @@
+import os
+import time
+from pineapple_aws.metrics import emit, payload_size
+from pineapple_pipeline import predict
+
+
+def merchant_category(merchant):
+    # The index is an optimisation: any failure here means asking the model.
+    try:
+        # Imported here so a container with the fast path off never loads the
+        # DB code; the first lookup loads psycopg2 anyway.
+        from pineapple_db import db_cursor, merchant_index
+        with db_cursor() as cursor:
+            category = merchant_index.lookup(cursor, merchant)
+    except Exception as e:
+        print(f"Merchant index lookup failed for {merchant}: {e}")
+        category = None
+    # Counted where the index is asked: a receipt without a merchant never
+    # reaches it, so it is neither a hit nor a miss.
+    emit({"MerchantFastPathHit": int(category is not None), "MerchantFastPathMiss": int(category is None)},
+         {"Function": "PredictReceipt"})
+    return category
+
+
+# Why the classifier can't be used in this container, once that is known.
+_classifier_unavailable = None
+
+
+def classifier_unavailable(error):
+    # Configured but unusable is a deployment mistake, not a miss: say so once
+    # per container, at error level, and count it.
+    global _classifier_unavailable
+    import logging
+    _classifier_unavailable = error
+    logging.getLogger().error(f"Classifier unavailable, using the model: {error!r}")
+    emit({"ClassifierUnavailable": 1}, {"Function": "PredictReceipt"})
+
+
+def classifier_category(condensed):
+    # Like the index, the classifier only ever saves a model call.
+    if _classifier_unavailable is not None:
+        return None
+    try:
+        # numpy loads with the classifier, on the first prediction instead of
+        # during the cold start; the index is fetched once per container.
+        from pineapple_pipeline import classifier
+        model = classifier.load(os.environ["PIPELINE_BUCKET"], os.environ["CLASSIFIER_INDEX_KEY"])
+    except Exception as e:
+        classifier_unavailable(e)
+        return None
+    try:
+        category, confidence = model.classify(condensed)
+    except Exception as e:
+        print(f"Classifier failed: {e}")
+        category, confidence = None, 0
+    confident = confidence >= float(os.environ.get("CLASSIFIER_MIN_CONFIDENCE", "0.9"))
+    emit({"ClassifierHit": int(confident), "ClassifierMiss": int(not confident)}, {"Function": "PredictReceipt"})
+    return category if confident else None
+
+
+def lambda_handler(event, context):
+    """Everything between RetrieveObjectFromS3 and PutReceiptToRDS in one invocation.
+
+    Textract is called from here, so its raw response never enters the state
+    payload; with PIPELINE_BUCKET set it is kept in S3 under the execution
+    (see pineapple_pipeline.claim_check). A textract_response in the event,
+    from an execution started on the old definition, is used as is.
+
+    With MERCHANT_FAST_PATH=on, a merchant the index is confident about gets
+    its category from there instead of from Bedrock. PredictionMs by
+    CategorySource shows the latency that saves. With CLASSIFIER_INDEX_KEY
+    set, the classifier trained by AWS/local/train_classifier.py answers next,
+    when its confidence reaches CLASSIFIER_MIN_CONFIDENCE. Each counts its
+    own hits and misses when it is asked.
+    """
+    lookup = merchant_category if os.environ.get("MERCHANT_FAST_PATH") == "on" else None
+    classify = classifier_category if os.environ.get("CLASSIFIER_INDEX_KEY") else None
+    started = time.perf_counter()
+    prediction = predict(event, event.get('textract_response'), category_lookup=lookup, classify=classify)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    source = prediction.get("category_source")
+    if source:
+        emit({"PredictionMs": elapsed_ms}, {"Function": "PredictReceipt", "CategorySource": source},
+             unit="Milliseconds")
+    return payload_size("PredictReceipt", prediction)
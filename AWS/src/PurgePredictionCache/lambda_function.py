@@ -0,0 +1,12 @@
+from pineapple_db import db_cursor
+from pineapple_db import prediction_cache
+
+def lambda_handler(event, context):
+    # Scheduled daily; {"retention_days": N} overrides the configured retention.
+    retention_days = int((event or {}).get("retention_days", prediction_cache.RETENTION_DAYS))
+
+    with db_cursor() as cursor:
+        purged = prediction_cache.purge(cursor, retention_days)
+
+    print(f"Purged {purged} prediction cache entr{'y' if purged == 1 else 'ies'} unused for {retention_days} days")
+    return {"purged": purged, "retention_days": retention_days}
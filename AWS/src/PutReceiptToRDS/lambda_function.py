@@ -0,0 +1,52 @@
+import datetime
+import json
+from pineapple_aws.metrics import payload_size
+from pineapple_db import db_cursor
+from pineapple_db import prediction_cache
+
+# The prediction and the user's editable copy of it go in together: one
+# connection, one transaction, so a receipt never has one row without the
+# other. ON CONFLICT makes a Step Functions retry after a lost response a no-op
+# instead of a duplicate key error (and never overwrites edits to receipt_data).
+insert_pred_query = """
+INSERT INTO receipt_pred (receipt_id, user_id, pred_amount, pred_date, pred_category, merchant, condensed_extract,
+                          category_source)
+VALUES (%s, %s, %s, %s, %s, %s, %s::jsonb, %s)
+ON CONFLICT (receipt_id, user_id) DO NOTHING
+"""
+
+insert_data_query = """
+INSERT INTO receipt_data (receipt_id, user_id, name, act_amount, act_date, act_category)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (receipt_id, user_id) DO NOTHING
+"""
+
+def lambda_handler(event, context):
+    receipt_id = event['key']
+    user_id = event['user_id']
+    amount = event["predicted_amount"]
+    date_str = event["predicted_date"]['full_date']
+    category = event['predicted_category']
+    name = event.get('name')
+    # The merchant index is built from this; cached predictions don't carry one.
+    merchant = event.get('merchant')
+    # Which answered, so the index learns only from the model and from users.
+    category_source = event.get('category_source')
+    # Training data for the local classifier.
+    condensed_extract = json.dumps(event['condensed_extract']) if event.get('condensed_extract') else None
+
+    date = datetime.datetime.strptime(date_str, "%m/%d/%Y").date() if date_str else None
+
+    # Unlike the two writers this replaces, a failure is raised so the
+    # execution fails rather than reporting a receipt that was never stored.
+    with db_cursor() as cursor:
+        cursor.execute(insert_pred_query, (receipt_id, user_id, amount, date, category, merchant,
+                                          condensed_extract, category_source))
+        cursor.execute(insert_data_query, (receipt_id, user_id, name, amount, date, category))
+        # A fresh Textract + Bedrock prediction: remember it for this image.
+        if event.get("content_hash") and not event.get("cache_hit"):
+            prediction_cache.store(cursor, event["content_hash"], event)
+
+    print(f"Successfully inserted receipt {receipt_id} for user {user_id} into receipt_pred and receipt_data")
+
+    return payload_size("PutReceiptToRDS", event)
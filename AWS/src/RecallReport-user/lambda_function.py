@@ -1,34 +1,7 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store = "/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]   
-    db_name = credentials["DB_NAME"]
-
     user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
 
     body = event.get("body")
@@ -56,18 +29,9 @@ def lambda_handler(event, context):
     WHERE rd.report_number = %s AND rd.user_id = %s AND rd.approved = false;  
     """
     
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port=db_port,
-            password=db_password,
-            dbname=db_name
-        )
-        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        with db_cursor(dict_rows=True) as cursor:
             cursor.execute(update_query, (report_number, user_id))
-            connection.commit() 
             updated_rows = cursor.rowcount  
 
     except Exception as e:
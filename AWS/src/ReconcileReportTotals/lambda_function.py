@@ -0,0 +1,20 @@
+import json
+from pineapple_db import db_cursor
+from pineapple_db.report_totals import reconcile
+
+def lambda_handler(event, context):
+    # The daily schedule passes {"repair": true}; invoke without it to only look.
+    repair = bool((event or {}).get("repair"))
+
+    with db_cursor(dict_rows=True) as cursor:
+        drift = reconcile(cursor, repair=repair)
+
+    for row in drift:
+        print(json.dumps({"drift": row}, default=str))
+    print(f"{len(drift)} report(s) with drifted totals, repaired: {repair and bool(drift)}")
+
+    return {
+        "drifted": len(drift),
+        "repaired": repair and bool(drift),
+        "reports": [{"report_number": r["report_number"], "user_id": r["user_id"]} for r in drift[:100]]
+    }
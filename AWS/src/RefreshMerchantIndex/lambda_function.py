@@ -0,0 +1,10 @@
+from pineapple_db import db_cursor
+from pineapple_db import merchant_index
+
+def lambda_handler(event, context):
+    # Scheduled hourly, so categories users correct reach the index the same day.
+    with db_cursor() as cursor:
+        merchants, removed = merchant_index.refresh(cursor)
+
+    print(f"Merchant index refreshed: {merchants} merchants, {removed} removed")
+    return {"merchants": merchants, "removed": removed}
@@ -1,34 +1,8 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store="/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
+from pineapple_db.pagination import InvalidPageRequest, fetch_limit, keyset_condition, next_page, page_request
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]
-    db_name = credentials["DB_NAME"]
-
     body = event.get("body")
     if not body:
         return {
@@ -45,31 +19,36 @@ def lambda_handler(event, context):
         }
 
     report_number = body_json.get("report_number")
+    scope = "report-expenses:" + str(report_number)
 
+    try:
+        limit, after = page_request(event, scope, body_json)
+        keyset, keyset_params = keyset_condition(["receipt_id", "user_id"], after)
+    except InvalidPageRequest as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
 
-
-    query = """
+    query = f"""
     SELECT * 
     FROM receipt_data
-    WHERE report_number = %s;
+    WHERE report_number = %s
+    AND {keyset}
+    ORDER BY receipt_id, user_id
+    LIMIT %s;
     """
 
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port=db_port,
-            password=db_password,
-            dbname=db_name
-        )
-        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            cursor.execute(query,(report_number,))
+        with db_cursor(dict_rows=True) as cursor:
+            cursor.execute(query, (report_number, *keyset_params, fetch_limit(limit)))
             receipts = cursor.fetchall()
 
+        receipts, next_token = next_page(receipts, limit, ["receipt_id", "user_id"], scope)
+
         return {
             "statusCode": 200,
-            "body": json.dumps({"receipts": receipts}, default=str)
+            "body": json.dumps({"receipts": receipts, "next_token": next_token}, default=str)
         }
 
     except Exception as e:
@@ -77,6 +56,3 @@ def lambda_handler(event, context):
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
-    finally:
-        if connection:
-            connection.close()
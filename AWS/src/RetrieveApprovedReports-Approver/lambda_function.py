@@ -1,33 +1,8 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store = "/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
+from pineapple_db.pagination import NEXT_TOKEN_HEADER, InvalidPageRequest, fetch_limit, keyset_condition, next_page, page_request
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]   
-    db_name = credentials["DB_NAME"]
     
     # Check for admin status
     role = event['requestContext']['authorizer']['jwt']['claims']['roleType']
@@ -37,28 +12,39 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": "Access denied. Requires admin only."})
         }
 
-    select_query = """
-    SELECT *
+    try:
+        limit, after = page_request(event, "approved-reports")
+        keyset, keyset_params = keyset_condition(["report_number", "user_id"], after)
+    except InvalidPageRequest as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    select_query = f"""
+    SELECT report_number, user_id, name, comment, current, submitted, approved, returned, csv_file,
+           total::float8 AS total, receipt_count
     FROM report_data
     WHERE approved = TRUE AND csv_file IS NULL
+    AND {keyset}
+    ORDER BY report_number, user_id
+    LIMIT %s
     """
     
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port = db_port,
-            password=db_password,
-            dbname=db_name
-    )
-        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            cursor.execute(select_query,)
+        with db_cursor(dict_rows=True) as cursor:
+            cursor.execute(select_query, (*keyset_params, fetch_limit(limit)))
             results = cursor.fetchall()
     except Exception as e:
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
-    
-    return results
+
+    results, next_token = next_page(results, limit, ["report_number", "user_id"], "approved-reports")
+
+    return {
+        "statusCode": 200,
+        "headers": {NEXT_TOKEN_HEADER: next_token} if next_token else {},
+        "body": json.dumps(results)
+    }
@@ -1,8 +1,6 @@
 import json
-import boto3
 import os
-
-s3_client = boto3.client('s3')
+from pineapple_aws import get_client
 
 BUCKET_NAME = os.environ.get('BUCKET')
 
@@ -36,7 +34,7 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Missing receipt_id in request body'})
             }
 
-        presigned_url = s3_client.generate_presigned_url(
+        presigned_url = get_client('s3').generate_presigned_url(
             'get_object',
             Params={'Bucket': BUCKET_NAME, 'Key': csv_file},
             ExpiresIn=3600
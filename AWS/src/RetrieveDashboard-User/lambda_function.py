@@ -0,0 +1,99 @@
+import json
+from pineapple_db import db_cursor
+from pineapple_db.pagination import InvalidPageRequest, fetch_limit, next_page, page_request
+
+# Each section is the query of the endpoint it replaces, aggregated to one JSON
+# value so every requested section comes back in a single round trip.
+SECTIONS = {
+    # RetreiveCurrentReport
+    "current_report": """
+        SELECT COALESCE(json_agg(r), '[]')
+        FROM (
+            SELECT report_number, comment, total::float8 AS total
+            FROM report_data
+            WHERE user_id = %(user_id)s AND current = true AND receipt_count > 0
+        ) r""",
+    # RetrieveReturnedReports-User
+    "returned_reports": """
+        SELECT COALESCE(json_agg(r), '[]')
+        FROM (
+            SELECT report_number, comment, total::float8 AS total
+            FROM report_data
+            WHERE user_id = %(user_id)s AND returned = true AND receipt_count > 0
+        ) r""",
+    # RetrieveApprovedReports-User
+    "approved_reports": """
+        SELECT COALESCE(json_agg(r), '[]')
+        FROM (
+            SELECT report_number, comment
+            FROM report_data
+            WHERE user_id = %(user_id)s AND approved = true
+        ) r""",
+    # RetrieveReceiptsWithNoReport, or its first page when a limit is passed
+    "unassigned_receipts": """
+        SELECT COALESCE(json_agg(r ORDER BY r.receipt_id), '[]')
+        FROM (
+            SELECT *
+            FROM receipt_data
+            WHERE user_id = %(user_id)s AND report_number IS NULL
+            ORDER BY receipt_id
+            LIMIT %(receipt_limit)s
+        ) r""",
+    # RetrieveAllUnsubmittedReport
+    "unsubmitted_reports": """
+        SELECT COALESCE(json_agg(r), '[]')
+        FROM (
+            SELECT rd.report_number, rd.user_id, rct.receipt_id
+            FROM report_data AS rd
+            JOIN receipt_data AS rct
+              ON rct.report_number = rd.report_number
+              AND rct.user_id = rd.user_id
+            WHERE rd.user_id = %(user_id)s
+            AND rd.submitted = false
+            AND rd.approved = false
+        ) r""",
+}
+
+def lambda_handler(event, context):
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+
+    params = event.get("queryStringParameters") or {}
+    requested = [s.strip() for s in params.get("sections", "").split(",") if s.strip()] or list(SECTIONS)
+    unknown = [s for s in requested if s not in SECTIONS]
+    if unknown:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"Unknown sections: {', '.join(unknown)}", "sections": list(SECTIONS)})
+        }
+    sections = [s for s in SECTIONS if s in requested]
+
+    try:
+        limit, _ = page_request(event, "receipts-with-no-report")
+    except InvalidPageRequest as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    query = "SELECT " + ",\n".join(f"({SECTIONS[s]}) AS {s}" for s in sections)
+
+    try:
+        with db_cursor(dict_rows=True) as cursor:
+            cursor.execute(query, {"user_id": user_id, "receipt_limit": fetch_limit(limit)})
+            dashboard = cursor.fetchone()
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    if "unassigned_receipts" in dashboard:
+        # Same token as RetrieveReceiptsWithNoReport, which serves the later pages.
+        receipts, next_token = next_page(dashboard["unassigned_receipts"], limit,
+                                         ["receipt_id"], "receipts-with-no-report")
+        dashboard["unassigned_receipts"] = {"receipts": receipts, "next_token": next_token}
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps(dashboard)
+    }
@@ -1,11 +1,24 @@
-import json
-import urllib.parse
-import boto3
+import hashlib
 import os
+from pineapple_aws import get_client
+from pineapple_aws.metrics import emit, payload_size
+from pineapple_db import db_cursor
+from pineapple_db import prediction_cache
 
-print('Loading function')
 
-s3 = boto3.client('s3')
+def content_hash(bucket, key):
+    s3 = get_client("s3")
+    etag = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+    # A single-part upload's ETag is the MD5 of its bytes (with SSE-S3, which
+    # the bucket uses); only multipart uploads need reading.
+    if "-" not in etag:
+        return "md5:" + etag
+
+    digest = hashlib.sha256()
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    for chunk in iter(lambda: body.read(1024 * 1024), b""):
+        digest.update(chunk)
+    return "sha256:" + digest.hexdigest()
 
 
 def lambda_handler(event, context):
@@ -20,7 +33,23 @@ def lambda_handler(event, context):
                 'bucket': bucket,
                 'key': key,
                 'user_id' : user_id,
-                'name': name
+                'name': name,
+                'content_hash': None
     }
-    
-    return content
\ No newline at end of file
+
+    # A photo seen before goes straight to PutReceiptToRDS with the cached
+    # prediction. The cache is an optimisation: any failure here is a miss.
+    try:
+        content['content_hash'] = content_hash(bucket, key)
+        with db_cursor() as cursor:
+            cached = prediction_cache.lookup(cursor, content['content_hash'])
+    except Exception as e:
+        print(f"Prediction cache lookup failed for {key}: {e}")
+        cached = None
+
+    emit({"PredictionCacheHit": int(cached is not None), "PredictionCacheMiss": int(cached is None)},
+         {"Function": "RetrieveObjectFromS3"})
+    if cached is not None:
+        content['cached_prediction'] = cached
+
+    return payload_size("RetrieveObjectFromS3", content)
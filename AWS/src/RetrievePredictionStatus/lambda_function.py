@@ -0,0 +1,111 @@
+import json
+import math
+import os
+import time
+from pineapple_db import db_cursor
+from pineapple_aws.stepfunctions import FAILED_STATUSES, describe_execution, execution_arn
+
+MAX_RECEIPTS = 100
+MAX_WAIT_SECONDS = float(os.environ.get("PREDICTION_MAX_WAIT_SECONDS", "20"))
+
+# A prediction is done once PutReceiptToRDS has written receipt_pred, so a
+# poll for any number of receipts is one indexed query.
+status_query = """
+SELECT receipt_id, pred_amount, pred_date, pred_category
+FROM receipt_pred
+WHERE user_id = %s
+AND receipt_id = ANY(%s)
+"""
+
+def prediction(row):
+    date = row["pred_date"]
+    return {
+        "receipt_id": row["receipt_id"],
+        "status": "SUCCEEDED",
+        "predicted_category": row["pred_category"],
+        "predicted_date": {
+            "full_date": date.strftime("%m/%d/%Y"),
+            "month": date.strftime("%m"),
+            "year": date.strftime("%Y"),
+            "day": date.strftime("%d")
+        } if date else None,
+        "predicted_amount": f"{row['pred_amount']:.2f}" if row["pred_amount"] is not None else None
+    }
+
+def find_predictions(user_id, receipt_ids):
+    with db_cursor(dict_rows=True) as cursor:
+        cursor.execute(status_query, (user_id, receipt_ids))
+        return {row["receipt_id"]: prediction(row) for row in cursor.fetchall()}
+
+def lambda_handler(event, context):
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+    params = event.get("queryStringParameters") or {}
+
+    receipt_ids = [r for r in (params.get("receipt_ids") or "").split(",") if r]
+    job_id = params.get("job_id")
+    try:
+        wait = float(params.get("wait", 0))
+        # nan would make the deadline one the poll never reaches.
+        if not math.isfinite(wait):
+            raise ValueError
+    except ValueError:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "'wait' must be a number of seconds"})
+        }
+    wait = min(max(wait, 0), MAX_WAIT_SECONDS)
+
+    if not receipt_ids and not job_id:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Provide receipt_ids or job_id"})
+        }
+    if len(receipt_ids) > MAX_RECEIPTS:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"At most {MAX_RECEIPTS} receipt_ids per request"})
+        }
+
+    # A job id only matters when the workflow failed: that never reaches
+    # receipt_pred, so its status comes from the execution itself.
+    failed = {}
+    if job_id:
+        execution = describe_execution(execution_arn(os.environ.get("STEP_FUNCTION_ARN"), job_id))
+        job_input = json.loads(execution["input"]) if execution else {}
+        if job_input.get("user_id") != user_id:
+            return {
+                "statusCode": 404,
+                "body": json.dumps({"error": "Job not found"})
+            }
+        if job_input["key"] not in receipt_ids:
+            receipt_ids.append(job_input["key"])
+        if execution["status"] in FAILED_STATUSES:
+            failed[job_input["key"]] = {"receipt_id": job_input["key"], "status": execution["status"],
+                                        "error": execution.get("error")}
+
+    # Long poll: re-check with a growing pause until everything has finished
+    # or `wait` seconds have passed.
+    deadline = time.monotonic() + wait
+    delay = 0.25
+    while True:
+        try:
+            done = find_predictions(user_id, receipt_ids)
+        except Exception as e:
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"error": str(e)})
+            }
+        done.update({r: item for r, item in failed.items() if r not in done})
+        pending = [r for r in receipt_ids if r not in done]
+        if not pending or time.monotonic() + delay > deadline:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "predictions": [done.get(r, {"receipt_id": r, "status": "RUNNING"}) for r in receipt_ids],
+            "pending": len(pending)
+        })
+    }
@@ -1,59 +1,39 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
-
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store="/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+from pineapple_db import db_cursor
+from pineapple_db.pagination import InvalidPageRequest, fetch_limit, keyset_condition, next_page, page_request
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]
-    db_name = credentials["DB_NAME"]
-
     user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
 
-    query = """
+    try:
+        limit, after = page_request(event, "receipts-with-no-report")
+        keyset, keyset_params = keyset_condition(["receipt_id"], after)
+    except InvalidPageRequest as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    query = f"""
     SELECT * 
     FROM receipt_data
     WHERE user_id = %s 
-    AND report_number IS NULL;
+    AND report_number IS NULL
+    AND {keyset}
+    ORDER BY receipt_id
+    LIMIT %s;
     """
 
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port=db_port,
-            password=db_password,
-            dbname=db_name
-        )
-        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            cursor.execute(query,(user_id,))
+        with db_cursor(dict_rows=True) as cursor:
+            cursor.execute(query, (user_id, *keyset_params, fetch_limit(limit)))
             receipts = cursor.fetchall()
 
+        receipts, next_token = next_page(receipts, limit, ["receipt_id"], "receipts-with-no-report")
+
         return {
             "statusCode": 200,
-            "body": json.dumps({"receipts": receipts}, default=str)
+            "body": json.dumps({"receipts": receipts, "next_token": next_token}, default=str)
         }
 
     except Exception as e:
@@ -61,6 +41,3 @@ def lambda_handler(event, context):
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
-    finally:
-        if connection:
-            connection.close()
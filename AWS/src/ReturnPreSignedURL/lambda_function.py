@@ -1,10 +1,20 @@
 import json
 import os
-import boto3
+from urllib.parse import quote
+from pineapple_aws import get_client
 
 S3_BUCKET_NAME = os.getenv("BUCKET")
 
-s3_client = boto3.client("s3")
+_sigv4_s3 = None
+
+def sigv4_s3_client():
+    # SigV4 makes the metadata signed headers the PUT has to send, rather than
+    # query parameters whose placement depends on the signer's defaults.
+    global _sigv4_s3
+    if _sigv4_s3 is None:
+        from botocore.config import Config
+        _sigv4_s3 = get_client("s3", config=Config(signature_version="s3v4"))
+    return _sigv4_s3
 
 def lambda_handler(event, context):
     try:
@@ -39,19 +49,39 @@ def lambda_handler(event, context):
             }
 
 
-        presigned_url = s3_client.generate_presigned_url(
+        params = {
+            "Bucket": S3_BUCKET_NAME,
+            "Key": file_name,
+            "ContentType": content_type
+        }
+
+        # With "predict": true the uploader's id is signed into the object's
+        # metadata and StartPredictionOnUpload begins the prediction as soon as
+        # the upload lands. The PUT must then send the returned headers as-is.
+        # upload-id is new for every URL, so uploading the same photo again
+        # under the same name starts a new prediction (see
+        # pineapple_aws.stepfunctions.upload_execution_name).
+        s3 = get_client("s3")
+        upload_headers = {}
+        if body_json.get("predict") is True:
+            s3 = sigv4_s3_client()
+            user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+            params["Metadata"] = {"user-id": user_id, "name": quote(body_json.get("name") or ""),
+                                  "upload-id": os.urandom(8).hex()}
+            upload_headers = {f"x-amz-meta-{k}": v for k, v in params["Metadata"].items()}
+
+        presigned_url = s3.generate_presigned_url(
             "put_object",
-            Params={
-                "Bucket": S3_BUCKET_NAME,
-                "Key": file_name,
-                "ContentType": content_type
-            },
+            Params=params,
             ExpiresIn=3600
         )
 
+        response_body = {"presignedUrl": presigned_url}
+        if upload_headers:
+            response_body["headers"] = upload_headers
         return {
             "statusCode": 200,
-            "body": json.dumps({"presignedUrl": presigned_url})
+            "body": json.dumps(response_body)
         }
 
     except Exception as e:
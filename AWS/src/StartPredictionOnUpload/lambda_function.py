@@ -0,0 +1,43 @@
+import os
+from urllib.parse import unquote, unquote_plus
+from pineapple_aws import get_client
+from pineapple_aws.stepfunctions import start_execution, upload_execution_name
+
+# ReturnPreSignedURL signs the uploader's user id (and display name) into the
+# object's metadata when asked to, so the prediction can start as soon as the
+# object lands instead of after the phone's follow-up /predictions call.
+USER_ID_METADATA = "user-id"
+NAME_METADATA = "name"
+
+def lambda_handler(event, context):
+    step_function_arn = os.environ.get("STEP_FUNCTION_ARN")
+    started = []
+
+    for record in event.get("Records", []):
+        bucket = record["s3"]["bucket"]["name"]
+        key = unquote_plus(record["s3"]["object"]["key"])
+
+        metadata = get_client("s3").head_object(Bucket=bucket, Key=key).get("Metadata", {})
+        user_id = metadata.get(USER_ID_METADATA)
+        if not user_id:
+            # Uploaded through an old client: it will call /predictions itself.
+            print(f"No {USER_ID_METADATA} metadata on {key}; not starting a prediction")
+            continue
+
+        step_function_input = {
+            "bucket": bucket,
+            "key": key,
+            "user_id": user_id,
+            "name": unquote(metadata.get(NAME_METADATA, "")) or None
+        }
+        # S3 can deliver an event more than once; the name makes the repeat a
+        # no-op and lets /predictions find this execution from the object.
+        name = upload_execution_name(user_id, key, record["s3"]["object"]["eTag"].strip('"'), metadata)
+        try:
+            start_execution(step_function_arn, step_function_input, name=name)
+        except get_client("stepfunctions").exceptions.ExecutionAlreadyExists:
+            print(f"Prediction for {key} already started")
+            continue
+        started.append(key)
+
+    return {"started": started}
@@ -1,36 +1,81 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
 import datetime
-import boto3
-
-CACHED_CREDENTIALS = None
+from pineapple_db import db_cursor
+
+MAX_BATCH_SIZE = 500
+
+# One statement for the whole batch: the edits arrive as parallel arrays,
+# `targets` records why a receipt can't be edited (missing, or its report is
+# submitted/approved) and the UPDATE's RETURNING gives the rows that changed.
+update_query = """
+WITH edits AS (
+    SELECT *
+    FROM unnest(%(idx)s::int[], %(receipt_id)s::text[], %(amount)s::numeric[], %(date)s::date[],
+                %(category)s::text[], %(title)s::text[], %(comment)s::text[])
+        AS e(idx, receipt_id, act_amount, act_date, act_category, title, comment)
+),
+targets AS (
+    SELECT e.idx,
+           rd.receipt_id IS NOT NULL AS found,
+           COALESCE(r.approved OR r.submitted, false) AS locked
+    FROM edits e
+    LEFT JOIN receipt_data rd
+      ON rd.receipt_id = e.receipt_id
+      AND rd.user_id = %(user_id)s
+    LEFT JOIN report_data r
+      ON r.report_number = rd.report_number
+      AND r.user_id = rd.user_id
+),
+updated AS (
+    UPDATE receipt_data AS rd
+        SET act_amount = e.act_amount,
+        act_date = e.act_date,
+        act_category = e.act_category,
+        title = e.title,
+        comment = e.comment
+    FROM edits e
+    JOIN targets t ON t.idx = e.idx
+    WHERE rd.receipt_id = e.receipt_id
+    AND rd.user_id = %(user_id)s
+    AND NOT t.locked
+    RETURNING e.idx, to_json(rd.*) AS receipt
+)
+SELECT t.idx, t.found, t.locked, u.receipt
+FROM targets t
+LEFT JOIN updated u ON u.idx = t.idx
+ORDER BY t.idx;
+"""
+
+def parse_edit(item):
+    if not isinstance(item, dict):
+        raise ValueError("Each edit must be an object")
+    receipt_id = item.get("receipt_id")
+    if not receipt_id or not isinstance(receipt_id, str):
+        raise ValueError("Invalid or missing 'receipt_id'")
+
+    act_date_str = item.get("date")
+    try:
+        act_date = datetime.datetime.strptime(act_date_str, "%m/%d/%Y").date() if act_date_str else None
+    except (TypeError, ValueError):
+        raise ValueError("'date' must be MM/DD/YYYY")
 
-def get_credentials(parameter_store = "/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
-    )
+    act_amount = item.get("amount")
+    if act_amount is not None:
+        try:
+            act_amount = float(act_amount)
+        except (TypeError, ValueError):
+            raise ValueError("'amount' must be a number")
 
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+    return {
+        "receipt_id": receipt_id,
+        "amount": act_amount,
+        "date": act_date,
+        "category": item.get("category"),
+        "title": item.get("title"),
+        "comment": item.get("comment")
+    }
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]   
-    db_name = credentials["DB_NAME"]
-
-
     user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
 
     body = event.get("body")
@@ -48,79 +93,86 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": "Invalid JSON format"})
         }
 
-    receipt_id = body_json.get("receipt_id")
-    act_date_str = body_json.get("date")
-    act_amount = body_json.get('amount')
-    act_category = body_json.get('category')
-    title = body_json.get('title')
-    comment = body_json.get('comment')
-
-    report_number = body_json.get('report_number')
-
-    act_date = datetime.datetime.strptime(act_date_str, "%m/%d/%Y").date() if act_date_str else None
-
-    print(receipt_id)
-    update_query = """
-    UPDATE receipt_data AS rd
-        SET act_amount = %s,
-        act_date = %s,
-        act_category = %s,
-        title = %s,
-        comment = %s
-    FROM report_data AS r
-    WHERE rd.receipt_id = %s
-    AND rd.user_id = %s
-    AND (
-        (rd.report_number = r.report_number 
-            AND rd.user_id = r.user_id
-            AND r.approved = false
-            AND r.submitted = false)
-        OR
-        NOT EXISTS (
-            SELECT 1 FROM report_data r2 
-            WHERE r2.report_number = rd.report_number 
-            AND r2.user_id = rd.user_id
-        )
-    );  
-    """
-    
-    connection = None
-    try:
-        print("here")
-        connection = psycopg2.connect(
-            host=db_host,
-            user=db_user,
-            port = db_port,
-            password=db_password,
-            dbname=db_name
-    )
-        print("here2")
-        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            print("Running update with values:", act_amount, act_date, act_category, title, comment, receipt_id, user_id)
-            
-            cursor.execute(update_query, (act_amount, act_date, act_category, title, comment, receipt_id, user_id))
-
-            connection.commit()
-            cursor.execute(
-                """
-                SELECT * FROM receipt_data
-                WHERE receipt_id = %s AND user_id = %s
-                """,
-                (receipt_id, user_id)
-            )
-            updated_row = cursor.fetchone()
-            print("Updated row:", updated_row)
-
-
-            
-    except Exception as e:
+    # A single edit object is the original request shape; an array (or
+    # {"receipts": [...]}) applies many edits in one transaction.
+    single = False
+    if isinstance(body_json, list):
+        items = body_json
+    elif isinstance(body_json, dict) and "receipts" in body_json:
+        items = body_json["receipts"]
+    else:
+        single = True
+        items = [body_json]
+    if not isinstance(items, list) or not items:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Expected a receipt edit or a non-empty list of edits"})
+        }
+    if len(items) > MAX_BATCH_SIZE:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"At most {MAX_BATCH_SIZE} edits per request"})
+        }
 
+    results = [None] * len(items)
+    edits = []
+    seen = set()
+    for idx, item in enumerate(items):
+        try:
+            edit = parse_edit(item)
+            if edit["receipt_id"] in seen:
+                raise ValueError("Duplicate receipt_id in request")
+        except ValueError as e:
+            results[idx] = {"receipt_id": item.get("receipt_id") if isinstance(item, dict) else None,
+                            "status": "invalid", "error": str(e)}
+            continue
+        seen.add(edit["receipt_id"])
+        edit["idx"] = idx
+        edits.append(edit)
+
+    if edits:
+        params = {field: [edit[field] for edit in edits]
+                  for field in ("idx", "receipt_id", "amount", "date", "category", "title", "comment")}
+        params["user_id"] = user_id
+        try:
+            with db_cursor(dict_rows=True) as cursor:
+                cursor.execute(update_query, params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"error": str(e)})
+            }
+
+        for row in rows:
+            receipt_id = items[row["idx"]]["receipt_id"]
+            if row["receipt"] is not None:
+                results[row["idx"]] = {"receipt_id": receipt_id, "status": "updated", "receipt": row["receipt"]}
+            elif not row["found"]:
+                results[row["idx"]] = {"receipt_id": receipt_id, "status": "not_found",
+                                       "error": "Receipt not found"}
+            else:
+                results[row["idx"]] = {"receipt_id": receipt_id, "status": "locked",
+                                       "error": "Receipt is on a submitted or approved report"}
+
+    if single:
+        result = results[0]
+        if result["status"] == "invalid":
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": result["error"]})
+            }
+        # The original response, 200 whether or not a row changed: the app
+        # treats anything else as a failed edit and stops before attaching the
+        # receipt to its report. "status" and "receipt" say what happened.
         return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
+            "statusCode": 200,
+            "body": json.dumps({"message": "Receipt updated successfully.", "status": result["status"],
+                                "receipt": result.get("receipt")})
         }
-    
+
+    updated = sum(1 for r in results if r["status"] == "updated")
     return {
-    "statusCode": 200,
-    "body": json.dumps({"message": "Receipt updated successfully."})
-    }
\ No newline at end of file
+        "statusCode": 200,
+        "body": json.dumps({"updated": updated, "failed": len(results) - updated, "results": results})
+    }
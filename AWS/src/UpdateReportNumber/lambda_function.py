@@ -1,33 +1,42 @@
 import json
-import psycopg2
-import psycopg2.extras
-import os
-import boto3
+from pineapple_db import db_cursor
+from pineapple_db.reports import receipt_id_list, report_summaries
 
-CACHED_CREDENTIALS = None
-
-def get_credentials(parameter_store="/pineapple_expense/db/credentials"):
-    global CACHED_CREDENTIALS
-    if CACHED_CREDENTIALS:
-        return CACHED_CREDENTIALS
-    
-    ssm = boto3.client("ssm")
-    response = ssm.get_parameters(
-        Names=[parameter_store],
-        WithDecryption=True
+# Attach the receipts to the target report (the user's current report unless
+# report_number is given) in one statement. The target must be the caller's and
+# still open, and a receipt already on a submitted or approved report stays put.
+update_query = """
+WITH target AS (
+    SELECT report_number, user_id
+    FROM report_data
+    WHERE user_id = %(user_id)s
+    AND (report_number = %(report_number)s OR (%(report_number)s IS NULL AND current = true))
+    AND submitted = false
+    AND approved = false
+    ORDER BY report_number
+    LIMIT 1
+),
+attached AS (
+    UPDATE receipt_data rd
+    SET report_number = t.report_number
+    FROM target t
+    WHERE rd.user_id = t.user_id
+    AND rd.receipt_id = ANY(%(receipt_ids)s)
+    AND NOT EXISTS (
+        SELECT 1 FROM report_data locked
+        WHERE locked.report_number = rd.report_number
+        AND locked.user_id = rd.user_id
+        AND (locked.submitted OR locked.approved)
     )
-
-    CACHED_CREDENTIALS = json.loads(response["Parameters"][0]["Value"])
-    return CACHED_CREDENTIALS
+    RETURNING rd.receipt_id
+)
+SELECT t.report_number,
+       (SELECT COALESCE(json_agg(receipt_id), '[]') FROM attached) AS attached
+FROM target t;
+"""
 
 def lambda_handler(event, context):
-    credentials = get_credentials()
-
-    db_host = credentials["DB_HOST"]
-    db_port = credentials["DB_PORT"]
-    db_user = credentials["DB_USER"]
-    db_password = credentials["DB_PASSWORD"]
-    db_name = credentials["DB_NAME"]
+    user_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
 
     body = event.get("body")
     if not body:
@@ -45,55 +54,62 @@ def lambda_handler(event, context):
         }
 
     receipt_id = body_json.get("receipt_id")
+    report_number = body_json.get("report_number")
+    single = "receipt_ids" not in body_json
 
-    if not receipt_id:
+    if single and not receipt_id:
         return {
             "statusCode": 400,
             "body": json.dumps({"error": "Missing receipt_id in request"})
         }
+    try:
+        receipt_ids = [receipt_id] if single else receipt_id_list(body_json["receipt_ids"])
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
 
-    # SQL Query to update receipt_data with report_number from report_data where current = true
-    update_query = """
-    UPDATE receipt_data rd
-    SET report_number = r.report_number
-    FROM report_data r
-    WHERE rd.receipt_id = %s
-    AND rd.user_id = r.user_id
-    AND r.current = true;
-    """
+    params = {"user_id": user_id, "report_number": report_number, "receipt_ids": receipt_ids}
 
-    connection = None
     try:
-        connection = psycopg2.connect(
-            host=db_host,
-            port=db_port,
-            user=db_user,
-            password=db_password,
-            dbname=db_name
-        )
-        
-        with connection.cursor() as cursor:
-            cursor.execute(update_query, (receipt_id,))
-            connection.commit()
+        with db_cursor(dict_rows=True) as cursor:
+            cursor.execute(update_query, params)
+            target = cursor.fetchone()
+            attached = target["attached"] if target else []
 
-            if cursor.rowcount == 0:
-                message = "No matching report found or receipt not updated."
+            if single:
+                if not attached:
+                    message = "No matching report found or receipt not updated."
+                else:
+                    message = f"Successfully updated receipt {receipt_id} with current report number."
             else:
-                message = f"Successfully updated receipt {receipt_id} with current report number."
+                summaries = report_summaries(cursor, user_id, [target["report_number"]] if target else [])
 
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    if single:
         return {
             "statusCode": 200,
             "body": json.dumps({"message": message})
         }
 
-    except Exception as e:
-        if connection:
-            connection.rollback()
+    if not summaries:
         return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
+            "statusCode": 404,
+            "body": json.dumps({"error": "No open report to attach to"})
         }
 
-    finally:
-        if connection:
-            connection.close()
\ No newline at end of file
+    attached_ids = set(attached)
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "attached": [r for r in receipt_ids if r in attached_ids],
+            "not_attached": [r for r in receipt_ids if r not in attached_ids],
+            "report": summaries[0]
+        })
+    }
@@ -2,6 +2,165 @@ import pytest
 import requests
 import os
 import json
+import sys
+import importlib.util
+import io
+import hashlib
+import uuid
+from urllib.parse import quote
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared layer code is importable the same way it is inside a Lambda.
+sys.path.insert(0, os.path.join(AWS_DIR, "layers", "pineapple_common", "python"))
+
+@pytest.fixture
+def load_lambda():
+    """Import a handler from AWS/src/<function_name>/lambda_function.py."""
+    def load(function_name):
+        path = os.path.join(AWS_DIR, "src", function_name, "lambda_function.py")
+        module_name = "lambda_" + function_name.replace("-", "_")
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+@pytest.fixture
+def scratch_schema():
+    """A connection to an empty schema on the PINEAPPLE_DB_DSN database."""
+    import psycopg2
+    dsn = os.environ.get("PINEAPPLE_DB_DSN")
+    if not dsn:
+        pytest.skip("PINEAPPLE_DB_DSN is not set")
+    schema = "test_" + uuid.uuid4().hex[:8]
+    admin = psycopg2.connect(dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    connection = psycopg2.connect(dsn, options=f"-c search_path={schema}")
+    yield connection
+    connection.close()
+    admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+    admin.close()
+
+@pytest.fixture
+def migrated_db(scratch_schema, monkeypatch):
+    """Migrated scratch schema that pineapple_db (and so every handler) talks to."""
+    sys.path.insert(0, os.path.join(AWS_DIR, "migrations"))
+    import migrate
+    from pineapple_db import close_connection
+
+    migrate.migrate(scratch_schema, log=lambda message: None)
+    with scratch_schema.cursor() as cursor:
+        cursor.execute("SELECT current_schema()")
+        schema = cursor.fetchone()[0]
+    scratch_schema.commit()
+    dsn = os.environ["PINEAPPLE_DB_DSN"]
+    separator = "&" if "?" in dsn else "?"
+    options = quote(f"-c search_path={schema}")
+    monkeypatch.setenv("PINEAPPLE_DB_DSN", f"{dsn}{separator}options={options}")
+    close_connection()
+    yield scratch_schema
+    close_connection()
+
+class FakeClientError(Exception):
+    pass
+
+
+class FakeStepFunctions:
+    """Local stand-in for the Step Functions client keeping executions in a dict."""
+
+    class exceptions:
+        class ExecutionAlreadyExists(Exception):
+            pass
+
+        class ExecutionDoesNotExist(Exception):
+            pass
+
+    def __init__(self):
+        self.executions = {}
+        self.sync_outputs = []
+
+    def start_execution(self, stateMachineArn, input, name):
+        arn = stateMachineArn.replace(":stateMachine:", ":execution:", 1) + ":" + name
+        if arn in self.executions:
+            raise self.exceptions.ExecutionAlreadyExists(arn)
+        self.executions[arn] = {"executionArn": arn, "name": name, "status": "RUNNING", "input": input}
+        return {"executionArn": arn}
+
+    def start_sync_execution(self, stateMachineArn, input):
+        self.sync_outputs.append(json.loads(input))
+        return {"status": "SUCCEEDED", "output": json.dumps({"sync": True})}
+
+    def describe_execution(self, executionArn):
+        if executionArn not in self.executions:
+            raise self.exceptions.ExecutionDoesNotExist(executionArn)
+        return self.executions[executionArn]
+
+
+class FakeS3:
+    """Local stand-in for the S3 client: objects are {key: (etag, metadata)}."""
+
+    class exceptions:
+        ClientError = FakeClientError
+
+    def __init__(self):
+        self.objects = {}
+        self.bodies = {}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise FakeClientError(Key)
+        etag, metadata = self.objects[Key]
+        return {"ETag": f'"{etag}"', "Metadata": metadata}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.bodies[Key])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.bodies[Key] = Body
+        self.objects[Key] = (hashlib.md5(Body).hexdigest(), {})
+        return {"ETag": f'"{self.objects[Key][0]}"'}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+        self.bodies.pop(Key, None)
+        return {"ResponseMetadata": {"HTTPStatusCode": 204}}
+
+
+class FakeTextract:
+    """Textract stand-in answering every AnalyzeExpense call with `response`."""
+
+    def __init__(self, response=None):
+        self.response = response or {"ExpenseDocuments": [{"SummaryFields": [], "LineItemGroups": []}]}
+        self.documents = []
+
+    def analyze_expense(self, Document):
+        self.documents.append(Document)
+        return self.response
+
+
+class FakeBedrock:
+    """bedrock-runtime stand-in replying `generation` to every prompt."""
+
+    def __init__(self, generation="Category: Meals"):
+        self.generation = generation
+        self.prompts = []
+
+    def invoke_model(self, modelId, body, contentType, accept):
+        self.prompts.append(json.loads(body)["prompt"])
+        return {"body": io.BytesIO(json.dumps({"generation": self.generation}).encode())}
+
+
+@pytest.fixture
+def fake_aws(monkeypatch):
+    """Fake Step Functions, S3, Textract and Bedrock clients returned by pineapple_aws.get_client."""
+    import pineapple_aws
+    fakes = {"stepfunctions": FakeStepFunctions(), "s3": FakeS3(), "textract": FakeTextract(),
+             "bedrock-runtime": FakeBedrock()}
+    for service_name, fake in fakes.items():
+        monkeypatch.setitem(pineapple_aws._clients, (service_name, ()), fake)
+    return fakes
 
 @pytest.fixture(scope="session")
 def auth_token():
@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+
+import pytest
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "local"))
+
+import asl
+
+PREDICTION_MACHINE = os.path.join(AWS_DIR, "MyStateMachine-sj5krp1uk-definition.asl.json")
+DELETE_MACHINE = os.path.join(AWS_DIR, "DeleteReceipt-definition.asl.json")
+
+
+def machine(states, start=None, **kwargs):
+    kwargs.setdefault("sleep", lambda seconds: None)
+    return asl.StateMachine({"StartAt": start or next(iter(states)), "States": states}, **kwargs)
+
+
+def task(resource="local:echo", **fields):
+    return {"Type": "Task", "Resource": resource, "End": True, **fields}
+
+
+class Flaky:
+    def __init__(self, failures, error=ConnectionError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, event, context):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("try again")
+        return {"ok": event}
+
+
+def test_paths_parameters_and_result_path():
+    run = machine({
+        "Shape": {"Type": "Pass", "InputPath": "$.order", "Parameters": {"id.$": "$.id", "kind": "receipt"},
+                  "ResultPath": "$.shaped", "Next": "Pick"},
+        "Pick": {"Type": "Pass", "OutputPath": "$.shaped", "End": True},
+    }).run({"order": {"id": 7}})
+
+    assert run.status == "SUCCEEDED"
+    assert run.output == {"id": 7, "kind": "receipt"}
+    assert [state.name for state in run.states] == ["Shape", "Pick"]
+
+
+@pytest.mark.parametrize("data,branch", [({"n": 5, "s": "receipt.jpg"}, "Big"), ({"n": 1, "s": "x"}, "Small"),
+                                         ({"s": "x"}, "Missing")])
+def test_choice_rules(data, branch):
+    states = {
+        "Route": {"Type": "Choice", "Default": "Small", "Choices": [
+            {"Variable": "$.n", "IsPresent": False, "Next": "Missing"},
+            {"And": [{"Variable": "$.n", "NumericGreaterThan": 3},
+                     {"Variable": "$.s", "StringMatches": "*.jpg"}], "Next": "Big"}]},
+        "Big": {"Type": "Pass", "Result": "Big", "End": True},
+        "Small": {"Type": "Pass", "Result": "Small", "End": True},
+        "Missing": {"Type": "Pass", "Result": "Missing", "End": True},
+    }
+
+    assert machine(states).run(data).output == branch
+
+
+def test_retry_backs_off_then_succeeds():
+    flaky = Flaky(failures=2)
+    sleeps = []
+    run = machine({"Call": task(asl.LAMBDA_INVOKE, OutputPath="$.Payload",
+                                Parameters={"FunctionName": "Flaky", "Payload.$": "$"},
+                                Retry=[{"ErrorEquals": ["States.TaskFailed"], "IntervalSeconds": 1,
+                                        "MaxAttempts": 3, "BackoffRate": 2}])},
+                  handlers={"Flaky": flaky}, sleep=sleeps.append).run({"key": "r1"})
+
+    assert run.output == {"ok": {"key": "r1"}}
+    assert sleeps == [1, 2] and run.states[0].attempts == 3
+
+
+def test_exhausted_retries_go_to_the_catcher():
+    run = machine({
+        "Call": task("arn:aws:lambda:us-east-1:123456789012:function:Flaky", End=None, Next="Done",
+                     Retry=[{"ErrorEquals": ["ConnectionError"], "MaxAttempts": 1}],
+                     Catch=[{"ErrorEquals": ["States.ALL"], "ResultPath": "$.error", "Next": "Recover"}]),
+        "Done": {"Type": "Succeed"},
+        "Recover": {"Type": "Pass", "End": True},
+    }, handlers={"Flaky": Flaky(failures=5)}).run({"key": "r1"})
+
+    assert run.status == "SUCCEEDED"
+    assert run.output["key"] == "r1" and run.output["error"]["Error"] == "ConnectionError"
+    assert json.loads(run.output["error"]["Cause"])["errorMessage"] == "try again"
+
+
+def test_uncaught_failures_and_unserialisable_results_fail_the_execution():
+    failed = machine({"Stop": {"Type": "Fail", "Error": "Receipt.Invalid", "Cause": "no key"}}).run({})
+    assert (failed.status, failed.error, failed.cause) == ("FAILED", "Receipt.Invalid", "no key")
+
+    unserialisable = machine({"Call": task(asl.LAMBDA_INVOKE, Parameters={"FunctionName": "Bad"})},
+                             handlers={"Bad": lambda event, context: {"when": object()}}).run({})
+    assert unserialisable.error == "Runtime.MarshalError"
+
+
+def test_parallel_collects_branch_outputs_in_order():
+    branch = lambda value: {"StartAt": "B", "States": {"B": {"Type": "Pass", "Result": value, "End": True}}}
+
+    run = machine({"Both": {"Type": "Parallel", "Branches": [branch(1), branch(2)], "End": True}}).run({})
+
+    assert run.output == [1, 2]
+    assert [state.name for state in run.states] == ["Both", "Both/0/B", "Both/1/B"]
+
+
+def test_sdk_tasks_use_the_registered_clients(fake_aws):
+    fake_aws["s3"].objects["r1.jpg"] = ("etag", {})
+
+    run = machine({"Delete": task("arn:aws:states:::aws-sdk:s3:deleteObject",
+                                  Parameters={"Bucket.$": "$.bucket", "Key.$": "$.key"}, ResultPath=None)},
+                  ).run({"bucket": "receipts", "key": "r1.jpg"})
+
+    assert run.output == {"bucket": "receipts", "key": "r1.jpg"}
+    assert fake_aws["s3"].objects == {}
+
+
+def test_prediction_machine_runs_end_to_end(migrated_db, fake_aws, monkeypatch):
+    from test_pipeline import TEXTRACT_RESPONSE
+    monkeypatch.setenv("BUCKET", "receipts")
+    monkeypatch.setenv("PIPELINE_BUCKET", "artifacts")
+    fake_aws["s3"].objects["r1.jpg"] = ("0cc175b9c0f1b6a831c399e269772661", {})
+    fake_aws["textract"].response = TEXTRACT_RESPONSE
+    fake_aws["bedrock-runtime"].generation = "Category: Travel"
+    prediction = asl.StateMachine.from_file(PREDICTION_MACHINE)
+
+    first = prediction.run({"key": "r1.jpg", "user_id": "user-1", "name": "coffee"}, name="exec-1")
+    again = prediction.run({"key": "r1.jpg", "user_id": "user-2", "name": "coffee"}, name="exec-2")
+
+    assert first.status == "SUCCEEDED" and first.output["predicted_category"] == "Travel"
+    assert [state.name for state in first.states] == [
+        "RetrieveObjectFromS3", "CheckPredictionCache", "PredictReceipt", "PutReceiptToRDS"]
+    assert first.output["artifacts"]["textract"]["key"] == "executions/exec-1/textract.json"
+    assert json.loads(fake_aws["s3"].bodies["executions/exec-1/textract.json"]) == TEXTRACT_RESPONSE
+    assert all(state.output_bytes < 2048 for state in first.states)
+    assert "UseCachedPrediction" in [state.name for state in again.states]
+    assert len(fake_aws["bedrock-runtime"].prompts) == 1
+    with migrated_db.cursor() as cursor:
+        cursor.execute("SELECT user_id, pred_category, pred_amount::text FROM receipt_pred ORDER BY user_id")
+        assert cursor.fetchall() == [("user-1", "Travel", "10.95"), ("user-2", "Travel", "10.95")]
+
+
+def test_delete_machine_runs_end_to_end_through_the_sync_api(migrated_db, fake_aws, monkeypatch, load_lambda):
+    import pineapple_aws
+    load_lambda("PutReceiptToRDS").lambda_handler({
+        "key": "r1.jpg", "user_id": "user-1", "name": "n", "predicted_amount": "1.00",
+        "predicted_date": {"full_date": "01/02/2024"}, "predicted_category": "Meals"}, None)
+    fake_aws["s3"].objects["r1.jpg"] = ("etag", {})
+    arn = "arn:aws:states:us-east-1:123456789012:stateMachine:DeleteReceipt-express"
+    local = asl.LocalStepFunctions({arn: asl.StateMachine.from_file(DELETE_MACHINE)})
+    monkeypatch.setitem(pineapple_aws._clients, ("stepfunctions", ()), local)
+    monkeypatch.setenv("STEP_FUNCTION_ARN", arn)
+    monkeypatch.setenv("STEP_FUNCTION_TYPE", "EXPRESS")
+    monkeypatch.setenv("BUCKET", "receipts")
+
+    output = load_lambda("DeleteReceipt").lambda_handler({
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": "user-1"}}}},
+        "body": json.dumps({"receipt_id": "r1.jpg"})}, None)
+
+    assert [branch["key"] for branch in output] == ["r1.jpg", "r1.jpg"]
+    assert fake_aws["s3"].objects == {}
+    with migrated_db.cursor() as cursor:
+        cursor.execute("SELECT (SELECT count(*) FROM receipt_pred) + (SELECT count(*) FROM receipt_data)")
+        assert cursor.fetchone() == (0,)
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+
+def admin_event(body, role="Admin"):
+    return {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": "approver", "roleType": role}}}},
+        "body": json.dumps(body)
+    }
+
+
+@pytest.fixture
+def queue(migrated_db):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO report_data (report_number, user_id, comment, current, submitted, approved)
+        VALUES ('jan', 'user-1', 'mine', false, true, false), ('feb', 'user-1', null, false, true, false),
+               ('mar', 'user-1', null, true, false, false), ('old', 'user-1', null, false, true, true),
+               ('jan', 'user-2', null, false, true, false)
+        """)
+    migrated_db.commit()
+    return migrated_db
+
+
+def report_state(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+        SELECT user_id || '/' || report_number, submitted, approved, returned, comment
+        FROM report_data ORDER BY 1
+        """)
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def test_bulk_approve_reports_each_outcome(queue, load_lambda):
+    response = load_lambda("BulkApproveReports-Approver").lambda_handler(admin_event({
+        "reports": [{"report_number": "jan", "user_id": "user-1", "comment": "fine"},
+                    {"report_number": "feb", "user_id": "user-1"}, "mar", "old", "nope"],
+        "comment": "month end"
+    }), None)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["approved"] == 2 and body["failed"] == 3
+    assert [(r["report_number"], r["user_id"], r["status"]) for r in body["results"]] == [
+        ("jan", "user-1", "approved"), ("feb", "user-1", "approved"), ("mar", "user-1", "not_pending"),
+        ("old", "user-1", "not_pending"), ("nope", None, "not_found")]
+
+    state = report_state(queue)
+    assert state["user-1/jan"] == (True, True, False, "fine")
+    assert state["user-1/feb"] == (True, True, False, "month end")
+    assert state["user-2/jan"] == (True, False, False, None)
+
+
+def test_report_number_without_user_matches_every_user(queue, load_lambda):
+    body = json.loads(load_lambda("BulkReturnReports-Approver").lambda_handler(
+        admin_event({"report_numbers": ["jan"], "comment": "receipts missing"}), None)["body"])
+
+    assert [(r["user_id"], r["status"]) for r in body["results"]] == [("user-1", "returned"), ("user-2", "returned")]
+    assert report_state(queue)["user-2/jan"] == (False, False, True, "receipts missing")
+
+
+def test_user_filter_returns_every_pending_report(queue, load_lambda):
+    body = json.loads(load_lambda("BulkReturnReports-Approver").lambda_handler(
+        admin_event({"user_id": "user-1", "comment": "redo"}), None)["body"])
+
+    assert body["returned"] == 2
+    assert [r["report_number"] for r in body["results"]] == ["feb", "jan"]
+    state = report_state(queue)
+    assert state["user-1/old"] == (True, True, False, None)
+    assert state["user-1/mar"] == (False, False, False, None)
+
+
+@pytest.mark.parametrize("body", [{}, {"reports": []}, {"reports": [{"user_id": "x"}]},
+                                  {"reports": ["a"], "comment": 5}, {"reports": ["a"] * 501}])
+def test_bad_requests_are_rejected(body, load_lambda):
+    for name in ("BulkApproveReports-Approver", "BulkReturnReports-Approver"):
+        assert load_lambda(name).lambda_handler(admin_event(body), None)["statusCode"] == 400
+
+
+def test_admin_role_is_required(load_lambda):
+    response = load_lambda("BulkApproveReports-Approver").lambda_handler(admin_event({"user_id": "u"}, "User"), None)
+
+    assert response["statusCode"] == 403
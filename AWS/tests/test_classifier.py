@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from pineapple_pipeline import classifier
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "benchmarks"))
+sys.path.insert(0, os.path.join(AWS_DIR, "local"))
+
+import receipt_corpus
+import train_classifier
+
+RECEIPT = {"key": "r1.jpg", "user_id": "user-1", "name": "gloves", "bucket": "receipts"}
+
+
+@pytest.fixture(scope="module")
+def trained():
+    cases = receipt_corpus.generate(1200, seed=25)
+    train, test = cases[:1000], cases[1000:]
+    model = classifier.train([case["extract"] for case in train], [case["truth"]["category"] for case in train],
+                             dimensions=1 << 12, epochs=100)
+    return model, test
+
+
+def test_features_are_merchant_item_words_and_amount_size():
+    found = classifier.features({"VENDOR_NAME": "Northern Tool 112", "TOTAL": "$30.00",
+                                 "items": {"item0": "HARD HAT WHT 2 19.99"}})
+
+    assert found == ["bias", "m:NORTHERN TOOL", "v:NORTHERN", "v:TOOL", "vv:NORTHERN TOOL",
+                     "i:HARD", "i:HAT", "i:WHT", "ii:HARD HAT", "ii:HAT WHT", "a:4"]
+
+
+def test_trained_classifier_agrees_with_what_users_kept(trained):
+    model, test = trained
+
+    answers = [model.classify(case["extract"]) for case in test]
+
+    assert sum(category == case["truth"]["category"] for (category, _), case in zip(answers, test)) / len(test) > 0.95
+    assert all(0 < confidence <= 1 for _, confidence in answers)
+    assert sum(model.probabilities(test[0]["extract"]).values()) == pytest.approx(1)
+
+
+def test_index_round_trips_and_refuses_other_features(trained, monkeypatch):
+    model, test = trained
+    data = model.to_bytes()
+    loaded = classifier.Classifier.from_bytes(data)
+
+    assert loaded.categories == model.categories
+    assert [loaded.classify(case["extract"]) for case in test[:20]] == [model.classify(case["extract"])
+                                                                       for case in test[:20]]
+    monkeypatch.setattr(classifier, "FEATURES_VERSION", classifier.FEATURES_VERSION + 1)
+    with pytest.raises(ValueError):
+        classifier.Classifier.from_bytes(data)
+
+
+@pytest.fixture
+def served(trained, fake_aws, monkeypatch):
+    """PredictReceipt with the trained index in S3 and Textract reading a Safety receipt."""
+    model, test = trained
+    [case] = [case for case in test if case["truth"]["category"] == "Safety"][:1]
+    fake_aws["s3"].put_object(Bucket="artifacts", Key="classifier/index.npz", Body=model.to_bytes())
+    def field(kind, text):
+        return {"Type": {"Text": kind}, "ValueDetection": {"Text": text}}
+
+    fake_aws["textract"].response = {"ExpenseDocuments": [{
+        "SummaryFields": [field(kind, text) for kind, text in case["extract"].items() if kind != "items"],
+        "LineItemGroups": [{"LineItems": [{"LineItemExpenseFields": [field("EXPENSE_ROW", text)]}
+                                          for text in case["extract"]["items"].values()]}]}]}
+    fake_aws["bedrock-runtime"].generation = "Category: Other"
+    monkeypatch.setenv("PIPELINE_BUCKET", "artifacts")
+    monkeypatch.setenv("CLASSIFIER_INDEX_KEY", "classifier/index.npz")
+    monkeypatch.setattr(classifier, "_loaded", {})
+    return fake_aws
+
+
+def emitted(output, name):
+    return [json.loads(line) for line in output.splitlines() if f'"{name}"' in line]
+
+
+def test_a_confident_classifier_skips_the_model(served, load_lambda, capsys):
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction["category_source"] == "classifier" and prediction["predicted_category"] == "Safety"
+    assert served["bedrock-runtime"].prompts == []
+    output = capsys.readouterr().out
+    [line], [timing] = emitted(output, "ClassifierHit"), emitted(output, "PredictionMs")
+    assert (line["ClassifierHit"], line["ClassifierMiss"]) == (1, 0)
+    assert timing["CategorySource"] == "classifier"
+    # The merchant index wasn't asked, so this is no fast path miss.
+    assert emitted(output, "MerchantFastPathMiss") == []
+
+
+def test_below_the_threshold_the_model_answers(served, load_lambda, monkeypatch):
+    monkeypatch.setenv("CLASSIFIER_MIN_CONFIDENCE", "1.01")
+
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction["category_source"] == "model" and prediction["predicted_category"] == "Other"
+
+
+def test_a_missing_index_is_fetched_once_and_the_model_answers(served, load_lambda, monkeypatch):
+    monkeypatch.setenv("CLASSIFIER_INDEX_KEY", "classifier/missing.npz")
+    handler = load_lambda("PredictReceipt").lambda_handler
+
+    assert handler(RECEIPT, None)["category_source"] == "model"
+    assert handler(RECEIPT, None)["category_source"] == "model"
+    assert isinstance(classifier._loaded[("artifacts", "classifier/missing.npz")], KeyError)
+
+
+def test_without_numpy_the_classifier_is_given_up_once_and_said_so(served, load_lambda, monkeypatch, capsys,
+                                                                   caplog):
+    import pineapple_pipeline
+    monkeypatch.delattr(pineapple_pipeline, "classifier")
+    monkeypatch.delitem(sys.modules, "pineapple_pipeline.classifier")
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    handler = load_lambda("PredictReceipt").lambda_handler
+
+    with caplog.at_level(logging.ERROR):
+        assert handler(RECEIPT, None)["category_source"] == "model"
+        assert handler(RECEIPT, None)["category_source"] == "model"
+
+    assert [r.levelno for r in caplog.records if "Classifier unavailable" in r.message] == [logging.ERROR]
+    assert "pineapple_pipeline.classifier" not in sys.modules
+    [line] = emitted(capsys.readouterr().out, "ClassifierUnavailable")
+    assert line["ClassifierUnavailable"] == 1
+    assert len(served["bedrock-runtime"].prompts) == 2
+
+
+def test_trainer_reads_stored_extracts_with_the_users_categories(migrated_db, load_lambda):
+    put = load_lambda("PutReceiptToRDS").lambda_handler
+    extract = {"VENDOR_NAME": "Grainger", "TOTAL": "$30.00"}
+    for n, condensed in enumerate([extract, None]):
+        put({"key": f"r{n}", "user_id": "user-1", "name": "n", "predicted_amount": "30.00",
+             "predicted_date": {"full_date": "03/04/2024"}, "predicted_category": "Meals",
+             "condensed_extract": condensed}, None)
+    with migrated_db.cursor() as cursor:
+        cursor.execute("UPDATE receipt_data SET act_category = 'Safety'")
+    migrated_db.commit()
+
+    with migrated_db.cursor() as cursor:
+        assert train_classifier.training_data(cursor) == [(extract, "Safety")]
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_cold_start
+
+
+@pytest.mark.parametrize("name", bench_cold_start.handler_names())
+def test_handler_stays_within_cold_start_budget(name):
+    # Import time is too noisy to assert on shared runners; the module check is exact.
+    result = bench_cold_start.probe(name)
+    result.pop("import_ms")
+    assert bench_cold_start.budget_violations({name: result}, bench_cold_start.load_budget()) == []
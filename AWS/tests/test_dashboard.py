@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+
+def user_event(user_id="user-1", sections=None, **params):
+    if sections:
+        params["sections"] = sections
+    return {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": user_id}}}},
+        "queryStringParameters": params or None
+    }
+
+
+def body(response):
+    assert response["statusCode"] == 200, response
+    return json.loads(response["body"])
+
+
+@pytest.fixture
+def seeded(migrated_db):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO report_data (report_number, user_id, comment, current, submitted, approved, returned)
+        VALUES ('current', 'user-1', 'c', true, false, false, false),
+               ('returned', 'user-1', 'fix dates', false, false, false, true),
+               ('approved', 'user-1', 'ok', false, true, true, false),
+               ('current', 'user-2', null, true, false, false, false)
+        """)
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount, act_date)
+        VALUES ('a', 'user-1', 'current', 10.00, '2024-01-05'),
+               ('b', 'user-1', 'current', 11.49, null),
+               ('c', 'user-1', 'returned', 3.00, null),
+               ('d', 'user-1', null, 7.25, '2024-02-01'),
+               ('e', 'user-1', null, 1.00, null),
+               ('f', 'user-2', 'current', 99, null)
+        """)
+    migrated_db.commit()
+    return migrated_db
+
+
+def test_sections_match_the_endpoints_they_replace(seeded, load_lambda):
+    dashboard = body(load_lambda("RetrieveDashboard-User").lambda_handler(user_event(), None))
+    event = user_event()
+
+    assert dashboard["current_report"] == load_lambda("RetreiveCurrentReport").lambda_handler(event, None)
+    assert dashboard["returned_reports"] == body(load_lambda("RetrieveReturnedReports-User").lambda_handler(event, None))
+    assert dashboard["approved_reports"] == load_lambda("RetrieveApprovedReports-User").lambda_handler(event, None)
+    assert sorted(map(json.dumps, dashboard["unsubmitted_reports"])) == sorted(map(json.dumps, body(
+        load_lambda("RetrieveAllUnsubmittedReport").lambda_handler(event, None))["report_numbers"]))
+
+    unassigned = body(load_lambda("RetrieveReceiptsWithNoReport").lambda_handler(event, None))
+    assert [r["receipt_id"] for r in dashboard["unassigned_receipts"]["receipts"]] == \
+        [r["receipt_id"] for r in unassigned["receipts"]] == ["d", "e"]
+    assert dashboard["unassigned_receipts"]["next_token"] is None
+    assert dashboard["current_report"] == [{"report_number": "current", "comment": "c", "total": 21.49}]
+
+
+def test_unassigned_receipts_are_paged_only_when_asked(seeded, load_lambda):
+    handler = load_lambda("RetrieveDashboard-User").lambda_handler
+
+    page = body(handler(user_event(sections="unassigned_receipts", limit="1"), None))["unassigned_receipts"]
+    assert [r["receipt_id"] for r in page["receipts"]] == ["d"]
+    rest = body(load_lambda("RetrieveReceiptsWithNoReport").lambda_handler(
+        user_event(limit="1", next_token=page["next_token"]), None))
+    assert [r["receipt_id"] for r in rest["receipts"]] == ["e"]
+
+    assert handler(user_event(sections="unassigned_receipts", limit="0"), None)["statusCode"] == 400
+
+
+def test_sections_parameter_selects_a_subset(seeded, load_lambda):
+    dashboard = body(load_lambda("RetrieveDashboard-User").lambda_handler(
+        user_event(sections="approved_reports, current_report"), None))
+
+    assert set(dashboard) == {"approved_reports", "current_report"}
+
+
+def test_unknown_sections_are_rejected(seeded, load_lambda):
+    response = load_lambda("RetrieveDashboard-User").lambda_handler(user_event(sections="current_report,bogus"), None)
+
+    assert response["statusCode"] == 400
+    assert "bogus" in json.loads(response["body"])["error"]
@@ -0,0 +1,153 @@
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from pineapple_db import connection as db
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.executed.append(query)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(db, "_connect", connect)
+    monkeypatch.setattr(db, "_connection", None)
+    monkeypatch.setattr(db, "PING_AFTER_SECONDS", 60)
+    return opened
+
+
+def test_connection_is_reused_across_invocations(connections):
+    for _ in range(3):
+        with db.db_cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    assert len(connections) == 1
+    assert connections[0].commits == 3
+
+
+def test_aborted_transaction_is_rolled_back_before_reuse(connections):
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+    connections[0].status = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+    assert len(connections) == 1
+    assert connections[0].rollbacks == 1
+
+
+def test_closed_connection_is_replaced(connections):
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+    connections[0].closed = 2
+
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+    assert len(connections) == 2
+
+
+def test_idle_connection_is_pinged_and_replaced_when_dead(connections, monkeypatch):
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+    monkeypatch.setattr(db, "PING_AFTER_SECONDS", -1)
+    connections[0].broken = True
+
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+    assert len(connections) == 2
+    assert connections[0].closed
+
+
+def test_connection_error_drops_connection(connections):
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+    connections[0].broken = True
+
+    with pytest.raises(psycopg2.OperationalError):
+        with db.db_cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    assert db._connection is None
+    with db.db_cursor() as cursor:
+        cursor.execute("SELECT 1")
+    assert len(connections) == 2
+
+
+def test_query_error_rolls_back_and_keeps_connection(connections):
+    with pytest.raises(ValueError):
+        with db.db_cursor() as cursor:
+            cursor.execute("SELECT 1")
+            raise ValueError("bad input")
+
+    assert connections[0].rollbacks == 1
+    assert connections[0].commits == 0
+    assert db._connection is connections[0]
+
+
+def test_handler_reuses_connection_between_warm_invocations(connections, load_lambda):
+    handler = load_lambda("PutToRDS-receipt_data")
+    event = {
+        "key": "receipt.jpg",
+        "user_id": "user-1",
+        "name": "Test User",
+        "predicted_amount": "11.49",
+        "predicted_date": {"full_date": "10/30/2024"},
+        "predicted_category": "Meals"
+    }
+
+    handler.lambda_handler(event, None)
+    handler.lambda_handler(event, None)
+
+    assert len(connections) == 1
+    assert len(connections[0].executed) == 2
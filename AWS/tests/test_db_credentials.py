@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+
+import psycopg2
+import pytest
+
+from pineapple_db import connection as db
+from pineapple_db import credentials
+
+
+class FakeSSM:
+    """Local stand-in for the SSM client that counts get_parameters calls."""
+
+    def __init__(self, password="first", delay=0.0):
+        self.password = password
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_parameters(self, Names, WithDecryption):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        value = {
+            "DB_HOST": "localhost",
+            "DB_PORT": 5432,
+            "DB_USER": "pineapple",
+            "DB_PASSWORD": self.password,
+            "DB_NAME": "pineapple"
+        }
+        return {"Parameters": [{"Name": Names[0], "Value": json.dumps(value)}]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def ssm(monkeypatch):
+    fake = FakeSSM()
+    monkeypatch.setattr(credentials, "_ssm", fake)
+    monkeypatch.setattr(credentials, "_caches", {})
+    return fake
+
+
+def test_one_fetch_per_container(ssm):
+    for _ in range(50):
+        assert credentials.get_credentials()["DB_PASSWORD"] == "first"
+    assert ssm.calls == 1
+
+
+def test_concurrent_cold_callers_share_one_fetch(ssm):
+    ssm.delay = 0.05
+    results = []
+
+    def call():
+        results.append(credentials.get_credentials()["DB_PASSWORD"])
+
+    threads = [threading.Thread(target=call) for _ in range(20)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    assert results == ["first"] * 20
+    assert ssm.calls == 1
+    assert elapsed < 20 * ssm.delay
+    assert credentials.credentials_cache().stats["fetches"] == 1
+
+
+def test_stale_value_is_served_while_refresh_picks_up_rotation():
+    clock = FakeClock()
+    ssm = FakeSSM()
+    cache = credentials.CredentialsCache(lambda: json.loads(
+        ssm.get_parameters(Names=["p"], WithDecryption=True)["Parameters"][0]["Value"]),
+        ttl=60, stale_ttl=60, clock=clock, jitter=0)
+
+    assert cache.get()["DB_PASSWORD"] == "first"
+    ssm.password = "rotated"
+    clock.now += 61
+
+    # Past the TTL: the caller gets the cached value straight away.
+    assert cache.get()["DB_PASSWORD"] == "first"
+    for _ in range(100):
+        if cache.stats["fetches"] == 2:
+            break
+        time.sleep(0.01)
+
+    assert cache.get()["DB_PASSWORD"] == "rotated"
+    assert ssm.calls == 2
+    assert cache.stats["stale_hits"] == 1
+
+
+def test_expired_value_is_fetched_synchronously():
+    clock = FakeClock()
+    calls = []
+    cache = credentials.CredentialsCache(lambda: calls.append(1) or {"n": len(calls)},
+                                         ttl=10, stale_ttl=5, clock=clock, jitter=0)
+    assert cache.get() == {"n": 1}
+    clock.now += 16
+    assert cache.get() == {"n": 2}
+
+
+def test_fetch_errors_reach_the_caller_when_nothing_is_cached():
+    def fail():
+        raise RuntimeError("ThrottlingException")
+
+    cache = credentials.CredentialsCache(fail)
+    with pytest.raises(RuntimeError):
+        cache.get()
+    assert cache.stats["fetch_errors"] == 1
+
+
+def test_auth_failure_retries_once_with_fresh_credentials(ssm, monkeypatch):
+    attempts = []
+
+    def connect(**kwargs):
+        attempts.append(kwargs["password"])
+        if kwargs["password"] != "rotated":
+            raise psycopg2.OperationalError('FATAL:  password authentication failed for user "pineapple"')
+        return object()
+
+    monkeypatch.delenv("PINEAPPLE_DB_DSN", raising=False)
+    monkeypatch.setattr(db.psycopg2, "connect", connect)
+
+    credentials.get_credentials()
+    ssm.password = "rotated"
+    db._connect()
+
+    assert attempts == ["first", "rotated"]
+    assert ssm.calls == 2
+
+
+def test_other_connect_errors_do_not_refetch(ssm, monkeypatch):
+    def connect(**kwargs):
+        raise psycopg2.OperationalError("could not connect to server: Connection refused")
+
+    monkeypatch.delenv("PINEAPPLE_DB_DSN", raising=False)
+    monkeypatch.setattr(db.psycopg2, "connect", connect)
+
+    with pytest.raises(psycopg2.OperationalError):
+        db._connect()
+    assert ssm.calls == 1
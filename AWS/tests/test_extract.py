@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+from pineapple_pipeline import amount_and_date, extract_many
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_extract
+
+
+@pytest.mark.parametrize("text", [
+    "22Sep24", "14-Dec-2024", "14 Dec 2024", "14-Dec 2024", "September 4, 2024", "SEP. 4 2024", "Sept 4 2024",
+    "Sep 4", "Tue Sep 4", "2024-10-30", "10/30/2024", "10-30-24", "10/30-24", "10/30/245", "10/30", "2/29",
+    "02/29/2024", "01/01/1900", "13/45/2024", "Sep 14-Dec-2024", "1/2/3", "Date: 10/30/24 12:31 PM", "N/A", "",
+])
+def test_invoice_dates_match_the_strptime_version(text):
+    extract = {"INVOICE_RECEIPT_DATE": text}
+
+    assert bench_extract.outcome(amount_and_date, extract) == bench_extract.outcome(
+        bench_extract.legacy_amount_and_date, extract)
+
+
+@pytest.mark.parametrize("other", ["paid 3/4/2023 thanks", "Latte\n10/30/2024", "€10/30/2024", "é1/2/24", "x"])
+def test_full_text_dates_match_the_json_search(other):
+    extract = {"VENDOR_NAME": "Blue Bottle", "items": {"item0": "Latte 4.50 10/29/24"}, "OTHER": other}
+
+    assert amount_and_date(extract) == bench_extract.legacy_amount_and_date(extract)
+
+
+def test_synthetic_receipts_match_the_strptime_version():
+    for extract in bench_extract.receipt_extracts(3000):
+        assert bench_extract.outcome(amount_and_date, extract) == bench_extract.outcome(
+            bench_extract.legacy_amount_and_date, extract), extract
+
+
+def test_batches_match_one_receipt_at_a_time():
+    import receipt_corpus
+    extracts = [case["extract"] for case in receipt_corpus.generate(2000)]
+    extracts += extracts[:200]
+
+    def one(extract):
+        try:
+            return amount_and_date(extract)
+        except ValueError as e:
+            return ("ValueError", str(e))
+
+    batch = [("ValueError", str(r)) if isinstance(r, ValueError) else r for r in extract_many(extracts)]
+    assert batch == [one(extract) for extract in extracts]
+
+
+def test_receipts_in_a_batch_get_their_own_date():
+    first, second = extract_many([{"INVOICE_RECEIPT_DATE": "10/30/2024"}] * 2)
+
+    first[0]["day"] = "31"
+    assert second[0]["day"] == "30"
+
+
+def test_batch_mode_of_the_lambda(load_lambda):
+    handler = load_lambda("GetAmountAndDate").lambda_handler
+
+    response = handler({"condensed_extracts": [{"INVOICE_RECEIPT_DATE": "Oct 30, 2024", "TOTAL": "$10.95"}, {},
+                                               {"INVOICE_RECEIPT_DATE": "13/45/2024"}]}, None)
+
+    assert response == {"results": [
+        {"predicted_date": {"full_date": "10/30/2024", "month": "10", "year": "2024", "day": "30"},
+         "predicted_amount": "10.95"},
+        {"empty": "empty"},
+        {"error": "Date format not recognized: 13/45/2024"}]}
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_extraction
+import receipt_corpus
+
+
+def test_extraction_stays_above_its_accuracy_floors():
+    floors = bench_extraction.load_floors()
+    cases = receipt_corpus.generate(floors["corpus"]["receipts"], floors["corpus"]["seed"])
+    results, _ = bench_extraction.measure(cases, repeats=1)
+
+    # Throughput is too noisy to assert on shared runners; accuracy is exact.
+    for limits in floors["functions"].values():
+        limits.pop("min_per_second", None)
+    assert bench_extraction.floor_violations(results, floors) == []
+
+
+def test_corpus_is_reproducible_from_its_seed():
+    assert receipt_corpus.generate(50, seed=7) == receipt_corpus.generate(50, seed=7)
+    assert receipt_corpus.generate(50, seed=7) != receipt_corpus.generate(50, seed=8)
+
+
+def test_plainly_written_receipts_are_read_correctly():
+    cases = [case for case in receipt_corpus.generate(2000)
+             if case["tags"] == {"date": "mm/dd/yyyy", "amount": "total", "currency": "USD", "generation": "clean"}]
+    scores = bench_extraction.score(cases)
+
+    assert cases and all(s["date"] and s["amount"] and s["category"] for s in scores.values())
@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+from pineapple_db import merchant_index
+from pineapple_pipeline import merchant_key
+
+
+def field(kind, text):
+    return {"Type": {"Text": kind}, "ValueDetection": {"Text": text}}
+
+
+TEXTRACT_RESPONSE = {"ExpenseDocuments": [{
+    "SummaryFields": [field("VENDOR_NAME", "Blue Bottle #12"), field("INVOICE_RECEIPT_DATE", "Oct 30, 2024"),
+                      field("TOTAL", "$10.95")],
+    "LineItemGroups": []
+}]}
+
+RECEIPT = {"key": "r1.jpg", "user_id": "user-1", "name": "coffee", "bucket": "receipts", "content_hash": "md5:abc"}
+
+
+@pytest.mark.parametrize("vendor_name, key", [
+    ("Shell 0571", "SHELL"),
+    ("SHELL #0612", "SHELL"),
+    ("Shell.", "SHELL"),
+    ("Motel 6 #4410", "MOTEL 6"),
+    ("Target Store 12", "TARGET"),
+    ("McDonald's", "MCDONALDS"),
+    ("Safety Supply Co", "SAFETY SUPPLY"),
+    ("Blue Bottle\nCoffee", "BLUE BOTTLE COFFEE"),
+    ("STARBUCKS STARBUCKS", "STARBUCKS"),
+    ("#4410", None),
+])
+def test_vendor_names_of_one_merchant_share_a_key(vendor_name, key):
+    assert merchant_key(vendor_name) == key
+
+
+def receipts(connection, merchant, categories):
+    with connection.cursor() as cursor:
+        for n, category in enumerate(categories):
+            receipt_id = f"{merchant}-{n}"
+            cursor.execute("INSERT INTO receipt_pred (receipt_id, user_id, pred_category, merchant) "
+                           "VALUES (%s, 'user-1', 'Meals', %s)", (receipt_id, merchant))
+            cursor.execute("INSERT INTO receipt_data (receipt_id, user_id, act_category) VALUES (%s, 'user-1', %s)",
+                           (receipt_id, category))
+    connection.commit()
+
+
+def test_only_merchants_users_agree_on_are_answered(migrated_db):
+    receipts(migrated_db, "SHELL", ["Travel"] * 9 + ["Meals"])
+    receipts(migrated_db, "TARGET", ["Supplies"] * 6 + ["Safety"] * 4)
+    receipts(migrated_db, "HERTZ", ["Travel"] * 2)
+
+    with migrated_db.cursor() as cursor:
+        assert merchant_index.refresh(cursor) == (3, 0)
+        assert merchant_index.lookup(cursor, "SHELL", min_receipts=5, min_share=0.9) == "Travel"
+        assert merchant_index.lookup(cursor, "TARGET", min_receipts=5, min_share=0.9) is None
+        assert merchant_index.lookup(cursor, "HERTZ", min_receipts=5, min_share=0.9) is None
+        assert merchant_index.lookup(cursor, "UNKNOWN") is None
+        cursor.execute("SELECT merchant, category, receipts, agreeing, hit_count FROM merchant_index ORDER BY 1")
+        assert cursor.fetchall() == [("HERTZ", "Travel", 2, 2, 0), ("SHELL", "Travel", 10, 9, 1),
+                                     ("TARGET", "Supplies", 10, 6, 0)]
+
+
+def test_refresh_follows_corrections_and_keeps_hit_counts(migrated_db):
+    receipts(migrated_db, "SHELL", ["Travel"] * 5)
+    with migrated_db.cursor() as cursor:
+        merchant_index.refresh(cursor)
+        assert merchant_index.lookup(cursor, "SHELL", min_receipts=5, min_share=0.9) == "Travel"
+    migrated_db.commit()
+
+    with migrated_db.cursor() as cursor:
+        cursor.execute("UPDATE receipt_data SET act_category = 'Meals' WHERE receipt_id = 'SHELL-0'")
+        assert merchant_index.refresh(cursor) == (1, 0)
+        assert merchant_index.lookup(cursor, "SHELL", min_receipts=5, min_share=0.9) is None
+        cursor.execute("SELECT hit_count FROM merchant_index")
+        assert cursor.fetchone() == (1,)
+    migrated_db.commit()
+
+    with migrated_db.cursor() as cursor:
+        cursor.execute("DELETE FROM receipt_pred")
+        assert merchant_index.refresh(cursor) == (0, 1)
+
+
+def test_refresh_ignores_categories_the_index_supplied(migrated_db):
+    receipts(migrated_db, "SHELL", ["Travel"] * 4)
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO receipt_pred (receipt_id, user_id, pred_category, merchant, category_source) "
+                       "SELECT 'fast-' || n, 'user-1', 'Travel', 'SHELL', 'merchant' FROM generate_series(1, 6) n")
+        cursor.execute("INSERT INTO receipt_data (receipt_id, user_id, act_category) "
+                       "SELECT 'fast-' || n, 'user-1', CASE WHEN n = 1 THEN 'Meals' ELSE 'Travel' END "
+                       "FROM generate_series(1, 6) n")
+        merchant_index.refresh(cursor)
+        # Four model answers and the one answer a user corrected; the five the
+        # user left alone would only have confirmed the index.
+        cursor.execute("SELECT category, receipts, agreeing FROM merchant_index")
+        assert cursor.fetchall() == [("Travel", 5, 4)]
+
+
+@pytest.fixture
+def fast_path(migrated_db, fake_aws, monkeypatch):
+    monkeypatch.setenv("MERCHANT_FAST_PATH", "on")
+    fake_aws["textract"].response = TEXTRACT_RESPONSE
+    fake_aws["bedrock-runtime"].generation = "Category: Meals"
+    return fake_aws
+
+
+def emitted(output, name):
+    return [json.loads(line) for line in output.splitlines() if f'"{name}"' in line]
+
+
+def test_a_known_merchant_skips_the_model(fast_path, migrated_db, load_lambda, capsys):
+    receipts(migrated_db, "BLUE BOTTLE", ["Supplies"] * 5)
+    load_lambda("RefreshMerchantIndex").lambda_handler({}, None)
+    capsys.readouterr()
+
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction["predicted_category"] == "Supplies"
+    assert prediction["category_source"] == "merchant" and prediction["merchant"] == "BLUE BOTTLE"
+    assert prediction["predicted_amount"] == "10.95"
+    assert fast_path["bedrock-runtime"].prompts == []
+    [line] = emitted(capsys.readouterr().out, "MerchantFastPathHit")
+    assert (line["MerchantFastPathHit"], line["MerchantFastPathMiss"]) == (1, 0)
+
+
+def test_an_unknown_merchant_goes_to_the_model_and_is_recorded(fast_path, migrated_db, load_lambda, capsys):
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction["category_source"] == "model" and len(fast_path["bedrock-runtime"].prompts) == 1
+    output = capsys.readouterr().out
+    [hit], [timing] = emitted(output, "MerchantFastPathHit"), emitted(output, "PredictionMs")
+    assert (hit["MerchantFastPathHit"], hit["MerchantFastPathMiss"]) == (0, 1)
+    assert timing["CategorySource"] == "model"
+    assert timing["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [{"Name": "PredictionMs", "Unit": "Milliseconds"}]
+
+    load_lambda("PutReceiptToRDS").lambda_handler(prediction, None)
+    with migrated_db.cursor() as cursor:
+        cursor.execute("SELECT merchant, category_source FROM receipt_pred")
+        assert cursor.fetchall() == [("BLUE BOTTLE", "model")]
+
+
+def test_a_receipt_without_a_merchant_is_not_a_miss(fast_path, migrated_db, load_lambda, capsys):
+    fast_path["textract"].response = {"ExpenseDocuments": [{"SummaryFields": [
+        field(kind, text) for kind, text in [("TOTAL", "$10.95"), ("INVOICE_RECEIPT_DATE", "Oct 30, 2024")]]}]}
+
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction["category_source"] == "model"
+    assert emitted(capsys.readouterr().out, "MerchantFastPathMiss") == []
+
+
+def test_a_failed_lookup_falls_back_to_the_model(fast_path, migrated_db, load_lambda):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("DROP TABLE merchant_index")
+    migrated_db.commit()
+
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction["category_source"] == "model" and prediction["predicted_category"] == "Meals"
+
+
+def test_the_fast_path_is_off_unless_configured(fast_path, migrated_db, load_lambda, monkeypatch):
+    receipts(migrated_db, "BLUE BOTTLE", ["Supplies"] * 5)
+    load_lambda("RefreshMerchantIndex").lambda_handler({}, None)
+    monkeypatch.delenv("MERCHANT_FAST_PATH")
+
+    assert load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)["category_source"] == "model"
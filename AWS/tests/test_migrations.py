@@ -0,0 +1,110 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"))
+
+import migrate
+
+
+def write(directory, filename, sql):
+    (directory / filename).write_text(sql)
+
+
+def test_migrations_load_in_version_order(tmp_path):
+    write(tmp_path, "0010_later.sql", "SELECT 10;")
+    write(tmp_path, "0002_earlier.sql", "SELECT 2;")
+    write(tmp_path, "notes.txt", "not a migration")
+
+    assert [m.version for m in migrate.load_migrations(str(tmp_path))] == [2, 10]
+
+
+def test_duplicate_versions_are_rejected(tmp_path):
+    write(tmp_path, "0001_a.sql", "SELECT 1;")
+    write(tmp_path, "001_b.sql", "SELECT 1;")
+
+    with pytest.raises(migrate.MigrationError):
+        migrate.load_migrations(str(tmp_path))
+
+
+def test_no_transaction_marker_and_statement_split(tmp_path):
+    write(tmp_path, "0001_idx.sql", "-- migrate: no-transaction\n-- a comment\n"
+                                    "CREATE INDEX CONCURRENTLY a ON t (x);\n\n"
+                                    "-- another\nCREATE INDEX CONCURRENTLY b ON t (y)\n    WHERE z IS NULL;\n")
+    migration = migrate.load_migrations(str(tmp_path))[0]
+
+    assert not migration.transactional
+    statements = migration.statements()
+    assert len(statements) == 2
+    assert statements[1].endswith("WHERE z IS NULL")
+
+
+def test_edited_migration_is_reported(tmp_path):
+    write(tmp_path, "0001_a.sql", "SELECT 1;")
+    migrations = migrate.load_migrations(str(tmp_path))
+
+    assert migrate.pending_migrations(migrations, {1: ("a", migrations[0].checksum)}) == []
+    with pytest.raises(migrate.MigrationError):
+        migrate.pending_migrations(migrations, {1: ("a", "something else")})
+
+
+def test_checked_in_migrations_load():
+    migrations = migrate.load_migrations()
+    assert migrations[0].name == "create_tables"
+    assert all(m.statements() for m in migrations)
+
+
+HANDLER_QUERIES = {
+    "RetrieveReceiptsWithNoReport": ("""
+        SELECT * FROM receipt_data
+        WHERE user_id = %s AND report_number IS NULL AND receipt_id > %s
+        ORDER BY receipt_id LIMIT 101""", ("user-7", "receipt-7-1")),
+    "RetreiveCurrentReport": ("""
+        SELECT report_number, comment, total::float8 AS total
+        FROM report_data
+        WHERE user_id = %s AND current = true AND receipt_count > 0""", ("user-7",)),
+    "RetreiveReportExpenseInformation": ("""
+        SELECT * FROM receipt_data
+        WHERE report_number = %s AND (receipt_id, user_id) > (%s, %s)
+        ORDER BY receipt_id, user_id LIMIT 101""", ("report-7-3", "receipt-7-1", "user-7")),
+    "RetrieveReturnedReports-Approver": ("""
+        SELECT * FROM report_data
+        WHERE returned = true AND (report_number, user_id) > (%s, %s)
+        ORDER BY report_number, user_id LIMIT 101""", ("report-7-3", "user-7")),
+    "RetrieveApprovedReports-Approver": ("""
+        SELECT * FROM report_data
+        WHERE approved = TRUE AND csv_file IS NULL AND (report_number, user_id) > (%s, %s)
+        ORDER BY report_number, user_id LIMIT 101""", ("report-7-3", "user-7")),
+    "RetrieveSubmittedReports-Approver": ("""
+        SELECT report_number, user_id, name, comment, total::float8 AS total FROM report_data
+        WHERE submitted = true AND approved = false AND receipt_count > 0
+        AND (report_number, user_id) > (%s, %s)
+        ORDER BY report_number, user_id LIMIT 101""", ("report-7-3", "user-7")),
+}
+
+
+def test_handler_queries_use_indexes(scratch_schema):
+    connection = scratch_schema
+    assert len(migrate.migrate(connection, log=lambda message: None)) == len(migrate.load_migrations())
+    assert migrate.migrate(connection, log=lambda message: None) == []
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO report_data (report_number, user_id, current, submitted, approved, returned, csv_file)
+        SELECT 'report-' || u || '-' || r, 'user-' || u, r = 0, r = 1, r > 1, r = 0 AND u % 40 = 0,
+               CASE WHEN r < 2 OR u % 50 = 0 THEN NULL ELSE 'export.csv' END
+        FROM generate_series(1, 2000) u, generate_series(0, 4) r
+        """)
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount)
+        SELECT 'receipt-' || u || '-' || n, 'user-' || u,
+               CASE WHEN n % 4 = 0 THEN NULL ELSE 'report-' || u || '-' || (n % 5) END, n
+        FROM generate_series(1, 2000) u, generate_series(1, 20) n
+        """)
+        cursor.execute("ANALYZE")
+        for name, (query, params) in HANDLER_QUERIES.items():
+            cursor.execute("EXPLAIN " + query, params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            assert "Seq Scan" not in plan, f"{name}:\n{plan}"
+    connection.commit()
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+from pineapple_db import pagination
+
+
+def user_event(user_id="user-1", query=None, body=None, role="User"):
+    event = {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": user_id, "roleType": role}}}},
+        "queryStringParameters": query
+    }
+    if body is not None:
+        event["body"] = json.dumps(body)
+    return event
+
+
+def test_token_round_trip():
+    token = pagination.encode_token("receipts", ["receipt-9", "user-1"])
+    assert "=" not in token
+    assert pagination.decode_token("receipts", token) == ["receipt-9", "user-1"]
+
+
+@pytest.mark.parametrize("token", ["not base64!", "e30", pagination.encode_token("other", ["x"])])
+def test_bad_or_foreign_tokens_are_rejected(token):
+    with pytest.raises(pagination.InvalidPageRequest):
+        pagination.decode_token("receipts", token)
+
+
+def test_page_request_reads_query_string_then_body():
+    token = pagination.encode_token("receipts", ["a"])
+    assert pagination.page_request({}, "receipts") == (None, None)
+    assert pagination.page_request({"queryStringParameters": {"next_token": token}},
+                                   "receipts") == (pagination.DEFAULT_PAGE_SIZE, ["a"])
+    assert pagination.page_request({"queryStringParameters": {"limit": "5", "next_token": token}},
+                                   "receipts") == (5, ["a"])
+    assert pagination.page_request({}, "receipts", {"limit": 7}) == (7, None)
+
+
+@pytest.mark.parametrize("limit", ["0", "-3", "ten", str(pagination.MAX_PAGE_SIZE + 1)])
+def test_page_size_is_bounded(limit):
+    with pytest.raises(pagination.InvalidPageRequest):
+        pagination.page_request({"queryStringParameters": {"limit": limit}}, "receipts")
+
+
+def test_next_page_only_issues_a_token_when_rows_remain():
+    rows = [{"id": n} for n in range(4)]
+    assert pagination.next_page(rows, 4, ["id"], "s") == (rows, None)
+    page, token = pagination.next_page(rows, 3, ["id"], "s")
+    assert page == rows[:3]
+    assert pagination.decode_token("s", token) == [2]
+    assert pagination.next_page(rows, None, ["id"], "s") == (rows, None)
+
+
+def collect_pages(handler, event_for_page):
+    items, token, pages = [], None, 0
+    while True:
+        response = handler(event_for_page(token), None)
+        assert response["statusCode"] == 200, response
+        body = json.loads(response["body"])
+        if isinstance(body, dict):
+            items += body["receipts"]
+            token = body["next_token"]
+        else:
+            items += body
+            token = response["headers"].get(pagination.NEXT_TOKEN_HEADER)
+        pages += 1
+        if token is None:
+            return items, pages
+
+
+def test_receipts_with_no_report_pages_through_every_receipt(migrated_db, load_lambda):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount)
+        SELECT 'receipt-' || lpad(n::text, 4, '0'), u, CASE WHEN n % 10 = 0 THEN 'r1' END, n
+        FROM generate_series(1, 250) n, (VALUES ('user-1'), ('user-2')) users(u)
+        """)
+    migrated_db.commit()
+    handler = load_lambda("RetrieveReceiptsWithNoReport").lambda_handler
+
+    receipts, pages = collect_pages(handler, lambda token: user_event(
+        query={"limit": "100", **({"next_token": token} if token else {})}))
+
+    ids = [r["receipt_id"] for r in receipts]
+    assert pages == 3
+    assert len(ids) == 225 and ids == sorted(set(ids))
+    assert {r["user_id"] for r in receipts} == {"user-1"}
+
+
+def test_requests_that_dont_page_get_every_receipt(migrated_db, load_lambda):
+    # The Android app doesn't follow next_token, so it must not be cut off at a page.
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, act_amount)
+        SELECT 'receipt-' || lpad(n::text, 4, '0'), 'user-1', n
+        FROM generate_series(1, %s) n
+        """, (pagination.DEFAULT_PAGE_SIZE + 20,))
+    migrated_db.commit()
+
+    response = load_lambda("RetrieveReceiptsWithNoReport").lambda_handler(user_event(), None)
+    body = json.loads(response["body"])
+    assert len(body["receipts"]) == pagination.DEFAULT_PAGE_SIZE + 20
+    assert body["next_token"] is None
+
+
+def test_report_expense_tokens_are_tied_to_the_report(migrated_db, load_lambda):
+    handler = load_lambda("RetreiveReportExpenseInformation").lambda_handler
+    token = pagination.encode_token("report-expenses:r1", ["receipt-0001", "user-1"])
+
+    response = handler(user_event(body={"report_number": "r2", "next_token": token}), None)
+    assert response["statusCode"] == 400
+
+
+def test_submitted_reports_pages_through_every_report(migrated_db, load_lambda):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO report_data (report_number, user_id, name, current, submitted, comment)
+        SELECT 'report-' || lpad(n::text, 3, '0'), 'user-1', 'Trip ' || n, false, true, 'c'
+        FROM generate_series(1, 31) n
+        """)
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, name, act_amount)
+        SELECT 'receipt-' || n || '-' || k, 'user-1', 'report-' || lpad(n::text, 3, '0'), 'name-' || (k % 2), 1.25
+        FROM generate_series(1, 30) n, generate_series(1, 4) k
+        """)
+    migrated_db.commit()
+    handler = load_lambda("RetrieveSubmittedReports-Approver").lambda_handler
+
+    rows, pages = collect_pages(handler, lambda token: user_event(
+        role="Admin", query={"limit": "7", **({"next_token": token} if token else {})}))
+
+    # Report 31 has no receipts and is left out, as it was with the old JOIN.
+    assert pages == 5
+    assert len(rows) == 30
+    assert all(row["total"] == 5.0 for row in rows)
+    assert len({row["report_number"] for row in rows}) == 30
+
+    response = handler(user_event(role="Admin"), None)
+    assert len(json.loads(response["body"])) == 30
+    assert pagination.NEXT_TOKEN_HEADER not in response["headers"]
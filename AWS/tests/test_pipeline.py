@@ -0,0 +1,171 @@
+import json
+import os
+
+import pytest
+
+import pineapple_pipeline
+from pineapple_pipeline import amount_and_date, condense_expense
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def field(kind, text):
+    return {"Type": {"Text": kind}, "ValueDetection": {"Text": text}}
+
+
+TEXTRACT_RESPONSE = {"ExpenseDocuments": [{
+    "SummaryFields": [field("VENDOR_NAME", "Blue Bottle"), field("ADDRESS", "1 Main St"),
+                      field("ADDRESS", "Oakland CA"), field("INVOICE_RECEIPT_DATE", "Oct 30, 2024"),
+                      field("SUBTOTAL", "$10.00"), field("TAX", "$0.95")],
+    "LineItemGroups": [{"LineItems": [{"LineItemExpenseFields": [field("ITEM", "Latte\nlarge"),
+                                                                 field("PRICE", "10.00")]}]}]
+}]}
+
+RECEIPT = {"key": "r1.jpg", "user_id": "user-1", "name": "coffee", "bucket": "receipts", "content_hash": "md5:abc"}
+
+
+@pytest.fixture
+def models(fake_aws):
+    fake_aws["textract"].response = TEXTRACT_RESPONSE
+    fake_aws["bedrock-runtime"].generation = " Category: Meals"
+    return fake_aws
+
+
+def run_per_step(load_lambda, event, generation):
+    """The old state machine path: one handler per state, JSON in between."""
+    def step(name, payload):
+        return json.loads(json.dumps(load_lambda(name).lambda_handler(json.loads(json.dumps(payload)), None)))
+
+    condensed = step("ParseTextractOutput", {**event, "textract_response": TEXTRACT_RESPONSE})
+    prompted = step("AttachPrompt", step("GetAmountAndDate", condensed))
+    return step("ParseBedrockOutput", {**prompted, "bedrock_response": {"Body": {"generation": generation}}})
+
+
+def test_condense_joins_repeated_fields_and_describes_each_line_item():
+    assert condense_expense(TEXTRACT_RESPONSE) == {
+        "VENDOR_NAME": "Blue Bottle", "ADDRESS": "1 Main St Oakland CA", "INVOICE_RECEIPT_DATE": "Oct 30, 2024",
+        "SUBTOTAL": "$10.00", "TAX": "$0.95", "items": {"item0": "Latte\nlarge 10.00"}}
+    assert condense_expense({"ExpenseDocuments": [{"SummaryFields": [], "LineItemGroups": []}]}) == {}
+    assert condense_expense({"ExpenseDocuments": []}) == {}
+
+
+def test_condense_walks_every_document_group_and_line_item():
+    def scored(kind, text, confidence):
+        return {"Type": {"Text": kind, "Confidence": 99.0}, "ValueDetection": {"Text": text, "Confidence": confidence}}
+
+    def item(*fields):
+        return {"LineItemExpenseFields": list(fields)}
+
+    response = {"ExpenseDocuments": [
+        {"SummaryFields": [scored("VENDOR_NAME", "Fresh Mart", 97.0), scored("TOTAL", "$12.00", 95.0)],
+         "LineItemGroups": [{"LineItems": [item(scored("ITEM", "Bananas", 90.0), scored("PRICE", "1.20", 99.0))]},
+                            {"LineItems": [item(scored("EXPENSE_ROW", "BAG FEE .10", 80.0))]}]},
+        {"SummaryFields": [scored("TOTAL", "$12.10", 60.0)],
+         "LineItemGroups": [{"LineItems": [item(scored("OTHER", "2 @", 99.0), scored("OTHER", "0.99", 99.0))]}]},
+    ]}
+
+    condensed = pineapple_pipeline.condense(response)
+
+    assert condensed.fields == {"VENDOR_NAME": "Fresh Mart", "TOTAL": "$12.00 $12.10"}
+    assert condensed.confidences == {"VENDOR_NAME": 97.0, "TOTAL": 60.0}
+    assert [(item.describe(), item.confidence) for item in condensed.items] == [
+        ("Bananas 1.20", 90.0), ("BAG FEE .10", 80.0), ("2 @ 0.99", 99.0)]
+    assert condensed.as_extract(max_items=1)["items"] == {"item0": "Bananas 1.20"}
+    assert amount_and_date(condensed.as_extract())[1] == "12.10"
+
+
+@pytest.mark.parametrize("fields,amount", [
+    ({"TOTAL": "Total $12.40 USD"}, "12.40"),
+    ({"TOTAL": "0.00", "AMOUNT_PAID": "9.99"}, "9.99"),
+    ({"SUBTOTAL": "$10.00", "TAX": "$0.95"}, "10.95"),
+    ({"SUBTOTAL": "$10.00"}, "10.00"),
+    ({"VENDOR_NAME": "Shell"}, "0.00"),
+])
+def test_amount_falls_back_from_total_to_paid_to_subtotal_plus_tax(fields, amount):
+    assert amount_and_date(fields)[1] == amount
+
+
+def test_date_comes_from_the_invoice_field_then_the_full_text():
+    assert amount_and_date({"INVOICE_RECEIPT_DATE": "Oct 30, 2024"})[0] == {
+        "full_date": "10/30/2024", "month": "10", "year": "2024", "day": "30"}
+    assert amount_and_date({"OTHER": "paid 3/4/2023 thanks"})[0]["full_date"] == "03/04/2023"
+    assert amount_and_date({"OTHER": "no date"})[0] == pineapple_pipeline.DEFAULT_DATE
+
+
+def test_fused_and_per_step_predictions_match(models, load_lambda):
+    fused = load_lambda("PredictReceipt").lambda_handler({**RECEIPT, "textract_response": TEXTRACT_RESPONSE}, None)
+
+    # The per-step path predates the merchant index and the classifier.
+    assert fused == {**run_per_step(load_lambda, RECEIPT, " Category: Meals"),
+                     "merchant": "BLUE BOTTLE", "category_source": "model",
+                     "condensed_extract": condense_expense(TEXTRACT_RESPONSE)}
+    assert fused["predicted_amount"] == "10.95" and fused["content_hash"] == "md5:abc"
+    assert models["textract"].documents == []
+    [prompt] = models["bedrock-runtime"].prompts
+    assert prompt == load_lambda("AttachPrompt").lambda_handler(
+        {"condensed_extract": condense_expense(TEXTRACT_RESPONSE)}, None)["prompt"]
+
+
+def test_fused_runs_textract_itself_when_the_state_machine_could_not(models, load_lambda):
+    models["bedrock-runtime"].generation = "Category:Travel"
+
+    prediction = load_lambda("PredictReceipt").lambda_handler({**RECEIPT, "errorInfo": {}}, None)
+
+    assert models["textract"].documents == [{"S3Object": {"Bucket": "receipts", "Name": "r1.jpg"}}]
+    assert prediction["predicted_category"] == "Travel"
+
+
+def test_nothing_found_saves_the_default_prediction_without_calling_the_model(models, load_lambda):
+    models["textract"].response = {"ExpenseDocuments": [{"SummaryFields": [], "LineItemGroups": []}]}
+
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    assert prediction == {"key": "r1.jpg", "user_id": "user-1", "predicted_category": "Meals", "name": "coffee",
+                          "predicted_date": {"full_date": "01/01/1899", "month": "01", "year": "1899", "day": "01"},
+                          "predicted_amount": "0.00"}
+    assert models["bedrock-runtime"].prompts == []
+
+
+def test_raw_responses_are_kept_in_s3_and_readable_by_reference(models, load_lambda, monkeypatch):
+    monkeypatch.setenv("PIPELINE_BUCKET", "artifacts")
+
+    prediction = load_lambda("PredictReceipt").lambda_handler({**RECEIPT, "execution": "exec-1"}, None)
+
+    refs = prediction["artifacts"]
+    assert refs["textract"] == {"bucket": "artifacts", "key": "executions/exec-1/textract.json",
+                                "bytes": len(models["s3"].bodies["executions/exec-1/textract.json"])}
+    assert "textract_response" not in prediction and "bedrock_response" not in prediction
+    condensed = load_lambda("ParseTextractOutput").lambda_handler({**RECEIPT, "textract_ref": refs["textract"]}, None)
+    assert condensed["condensed_extract"] == condense_expense(TEXTRACT_RESPONSE)
+    amounts = {"predicted_date": prediction["predicted_date"], "predicted_amount": prediction["predicted_amount"]}
+    parsed = load_lambda("ParseBedrockOutput").lambda_handler(
+        {**RECEIPT, **amounts, "bedrock_ref": refs["bedrock"]}, None)
+    assert parsed["predicted_category"] == "Meals"
+
+
+def test_nothing_is_stored_without_a_bucket_or_an_execution(models, load_lambda, monkeypatch):
+    assert "artifacts" not in load_lambda("PredictReceipt").lambda_handler({**RECEIPT, "execution": "exec-1"}, None)
+    monkeypatch.setenv("PIPELINE_BUCKET", "artifacts")
+    assert "artifacts" not in load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+    assert models["s3"].bodies == {}
+
+
+def test_each_step_reports_its_payload_size(models, load_lambda, capsys):
+    prediction = load_lambda("PredictReceipt").lambda_handler(RECEIPT, None)
+
+    [line] = [json.loads(line) for line in capsys.readouterr().out.splitlines() if '"StatePayloadBytes"' in line]
+    assert line["State"] == "PredictReceipt" and line["StatePayloadBytes"] == len(json.dumps(prediction))
+    assert line["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [{"Name": "StatePayloadBytes", "Unit": "Bytes"}]
+
+
+def test_state_machine_runs_the_fused_step():
+    with open(os.path.join(AWS_DIR, "MyStateMachine-sj5krp1uk-definition.asl.json")) as f:
+        states = json.load(f)["States"]
+
+    assert states["CheckPredictionCache"]["Default"] == "PredictReceipt"
+    assert states["PredictReceipt"]["Next"] == "PutReceiptToRDS"
+    # Textract runs inside PredictReceipt; its response never enters the state payload.
+    assert states["PredictReceipt"]["Parameters"]["Payload"]["execution.$"] == "$$.Execution.Name"
+    assert "TryAnalyzeExpense" not in states
+    assert not [name for name, state in states.items() if state.get("Resource", "").endswith("bedrock:invokeModel")
+                or "ParseTextractOutput" in state.get("Parameters", {}).get("FunctionName", "")]
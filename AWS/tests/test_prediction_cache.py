@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from pineapple_db import prediction_cache
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREDICTION = {"predicted_amount": 11.49, "predicted_category": "Meals",
+              "predicted_date": {"full_date": "10/30/2024", "month": "10", "year": "2024", "day": "30"}}
+
+
+@pytest.fixture
+def pipeline(migrated_db, fake_aws, monkeypatch):
+    monkeypatch.setenv("BUCKET", "receipts")
+    return fake_aws["s3"]
+
+
+def retrieve(load_lambda, key, user_id="user-1"):
+    return load_lambda("RetrieveObjectFromS3").lambda_handler({"key": key, "user_id": user_id, "name": "n"}, None)
+
+
+def emitted_metrics(capsys):
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if '"PredictionCacheHit"' in line]
+    return [(line["PredictionCacheHit"], line["PredictionCacheMiss"]) for line in lines]
+
+
+def test_lookup_touches_and_versions_entries(migrated_db, monkeypatch):
+    with migrated_db.cursor() as cursor:
+        assert prediction_cache.lookup(cursor, "md5:abc") is None
+        prediction_cache.store(cursor, "md5:abc", {**PREDICTION, "key": "ignored"})
+
+        assert prediction_cache.lookup(cursor, "md5:abc") == PREDICTION
+        assert prediction_cache.lookup(cursor, "md5:abc") == PREDICTION
+        cursor.execute("SELECT hit_count FROM prediction_cache")
+        assert cursor.fetchone() == (2,)
+
+        monkeypatch.setattr(prediction_cache, "CACHE_VERSION", prediction_cache.CACHE_VERSION + "-next")
+        assert prediction_cache.lookup(cursor, "md5:abc") is None
+
+
+def test_entries_unused_past_retention_expire_and_are_purged(migrated_db):
+    with migrated_db.cursor() as cursor:
+        prediction_cache.store(cursor, "md5:old", PREDICTION)
+        prediction_cache.store(cursor, "md5:new", PREDICTION)
+        cursor.execute("UPDATE prediction_cache SET last_used_at = now() - interval '91 days' "
+                       "WHERE cache_key LIKE '%%old'")
+
+        assert prediction_cache.lookup(cursor, "md5:old", retention_days=90) is None
+        assert prediction_cache.purge(cursor, retention_days=90) == 1
+        assert prediction_cache.lookup(cursor, "md5:new", retention_days=90) == PREDICTION
+
+
+def test_second_upload_of_the_same_photo_hits_the_cache(pipeline, load_lambda, capsys):
+    pipeline.objects["first.jpg"] = ("0cc175b9c0f1b6a831c399e269772661", {})
+    pipeline.objects["again.jpg"] = ("0cc175b9c0f1b6a831c399e269772661", {})
+
+    miss = retrieve(load_lambda, "first.jpg")
+    assert "cached_prediction" not in miss
+    assert miss["content_hash"] == "md5:0cc175b9c0f1b6a831c399e269772661"
+    load_lambda("PutReceiptToRDS").lambda_handler({**miss, **PREDICTION}, None)
+
+    hit = retrieve(load_lambda, "again.jpg", user_id="user-2")
+    assert hit["cached_prediction"] == PREDICTION
+    assert emitted_metrics(capsys) == [(0, 1), (1, 0)]
+
+
+def test_cache_hits_are_not_stored_again(pipeline, load_lambda, migrated_db):
+    load_lambda("PutReceiptToRDS").lambda_handler(
+        {"key": "r1", "user_id": "user-1", "name": "n", "content_hash": "md5:x", "cache_hit": True, **PREDICTION}, None)
+
+    with migrated_db.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM prediction_cache")
+        assert cursor.fetchone() == (0,)
+
+
+def test_multipart_uploads_are_hashed_from_their_bytes(pipeline, load_lambda):
+    pipeline.objects["big.jpg"] = ("9b2cf535f27731c974343645a3985328-3", {})
+    pipeline.bodies["big.jpg"] = b"x" * (3 * 1024 * 1024 + 5)
+
+    content = retrieve(load_lambda, "big.jpg")
+
+    assert content["content_hash"] == "sha256:" + hashlib.sha256(pipeline.bodies["big.jpg"]).hexdigest()
+
+
+def test_cache_failures_fall_back_to_a_miss(pipeline, load_lambda, capsys):
+    content = retrieve(load_lambda, "missing.jpg")
+
+    assert "cached_prediction" not in content
+    assert emitted_metrics(capsys) == [(0, 1)]
+
+
+def test_state_machine_short_circuits_on_a_hit():
+    with open(os.path.join(AWS_DIR, "MyStateMachine-sj5krp1uk-definition.asl.json")) as f:
+        states = json.load(f)["States"]
+
+    assert states["RetrieveObjectFromS3"]["Next"] == "CheckPredictionCache"
+    [choice] = states["CheckPredictionCache"]["Choices"]
+    assert choice["Variable"] == "$.cached_prediction" and choice["Next"] == "UseCachedPrediction"
+    assert states["CheckPredictionCache"]["Default"] == "PredictReceipt"
+    assert states["UseCachedPrediction"]["Next"] == "PutReceiptToRDS"
+    assert states["UseCachedPrediction"]["Parameters"]["cache_hit"] is True
@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+
+import pytest
+
+from pineapple_aws import stepfunctions
+
+STATE_MACHINE_ARN = "arn:aws:states:us-east-1:123456789012:stateMachine:predict"
+
+
+def user_event(user_id="user-1", body=None, params=None, headers=None):
+    return {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": user_id}}}},
+        "headers": headers or {},
+        "body": json.dumps(body) if body is not None else None,
+        "queryStringParameters": params
+    }
+
+
+@pytest.fixture
+def sfn(fake_aws, monkeypatch):
+    monkeypatch.setenv("STEP_FUNCTION_ARN", STATE_MACHINE_ARN)
+    monkeypatch.setenv("ASYNC_STEP_FUNCTION_ARN", STATE_MACHINE_ARN)
+    return fake_aws["stepfunctions"]
+
+
+def write_prediction(load_lambda, receipt_id, user_id="user-1"):
+    load_lambda("PutReceiptToRDS").lambda_handler({
+        "key": receipt_id, "user_id": user_id, "name": "n", "predicted_amount": "11.49",
+        "predicted_date": {"full_date": "10/30/2024"}, "predicted_category": "Meals"}, None)
+
+
+def status(load_lambda, **params):
+    response = load_lambda("RetrievePredictionStatus").lambda_handler(user_event(params=params), None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+@pytest.mark.parametrize("body,headers", [({"receipt_id": "r1", "async": True}, None),
+                                          ({"receipt_id": "r1"}, {"prefer": "respond-async"})])
+def test_async_predictions_return_a_job_straight_away(sfn, load_lambda, body, headers):
+    response = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(
+        user_event(body=body, headers=headers), None)
+
+    assert response["statusCode"] == 202
+    job = json.loads(response["body"])
+    assert job["receipt_id"] == "r1" and job["status"] == "RUNNING"
+    execution = sfn.describe_execution(stepfunctions.execution_arn(STATE_MACHINE_ARN, job["job_id"]))
+    assert json.loads(execution["input"])["user_id"] == "user-1"
+
+
+def test_status_reads_finished_predictions_from_receipt_pred(migrated_db, load_lambda):
+    write_prediction(load_lambda, "r1")
+    write_prediction(load_lambda, "r2", user_id="user-2")
+
+    code, body = status(load_lambda, receipt_ids="r1,r2")
+
+    assert code == 200 and body["pending"] == 1
+    assert body["predictions"] == [
+        {"receipt_id": "r1", "status": "SUCCEEDED", "predicted_category": "Meals",
+         "predicted_date": {"full_date": "10/30/2024", "month": "10", "year": "2024", "day": "30"},
+         "predicted_amount": "11.49"},
+        {"receipt_id": "r2", "status": "RUNNING"}]
+
+
+def test_failed_job_is_reported(sfn, migrated_db, load_lambda):
+    response = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(
+        user_event(body={"receipt_id": "r1", "async": True}), None)
+    job_id = json.loads(response["body"])["job_id"]
+    execution = sfn.executions[stepfunctions.execution_arn(STATE_MACHINE_ARN, job_id)]
+
+    assert status(load_lambda, job_id=job_id)[1]["predictions"] == [{"receipt_id": "r1", "status": "RUNNING"}]
+
+    execution.update(status="FAILED", error="States.TaskFailed")
+    assert status(load_lambda, job_id=job_id)[1]["predictions"] == [
+        {"receipt_id": "r1", "status": "FAILED", "error": "States.TaskFailed"}]
+
+
+def test_other_users_jobs_are_not_found(sfn, load_lambda):
+    response = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(
+        user_event("user-2", body={"receipt_id": "r1", "async": True}), None)
+    job_id = json.loads(response["body"])["job_id"]
+
+    assert status(load_lambda, job_id=job_id)[0] == 404
+    assert status(load_lambda, job_id="no-such-job")[0] == 404
+
+
+def test_long_poll_returns_once_the_prediction_lands(migrated_db, load_lambda):
+    writer = threading.Timer(0.3, write_prediction, (load_lambda, "r1"))
+    writer.start()
+    start = time.monotonic()
+
+    code, body = status(load_lambda, receipt_ids="r1", wait="5")
+    writer.join()
+
+    assert body["predictions"][0]["status"] == "SUCCEEDED"
+    assert time.monotonic() - start < 2
+
+
+def test_a_negative_wait_does_not_poll(migrated_db, load_lambda):
+    start = time.monotonic()
+
+    code, body = status(load_lambda, receipt_ids="r1", wait="-5")
+
+    assert code == 200 and body["predictions"] == [{"receipt_id": "r1", "status": "RUNNING"}]
+    assert time.monotonic() - start < 0.2
+
+
+@pytest.mark.parametrize("params", [None, {"wait": "soon", "receipt_ids": "r1"},
+                                    {"wait": "nan", "receipt_ids": "r1"}, {"wait": "inf", "receipt_ids": "r1"},
+                                    {"receipt_ids": ",".join(f"r{n}" for n in range(101))}])
+def test_bad_status_requests_are_rejected(params, load_lambda):
+    response = load_lambda("RetrievePredictionStatus").lambda_handler(user_event(params=params), None)
+
+    assert response["statusCode"] == 400
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def prediction(receipt_id="r1", **fields):
+    return {"key": receipt_id, "user_id": "user-1", "name": "lunch.jpg", "predicted_amount": "12.50",
+            "predicted_date": {"full_date": "03/04/2024"}, "predicted_category": "Meals", **fields}
+
+
+def rows(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT receipt_id, pred_amount::text, pred_date::text, pred_category FROM receipt_pred")
+        pred = cursor.fetchall()
+        cursor.execute("SELECT receipt_id, name, act_amount::text, act_date::text, act_category FROM receipt_data")
+        data = cursor.fetchall()
+    return pred, data
+
+
+def test_writes_both_rows_and_passes_the_event_through(migrated_db, load_lambda):
+    event = prediction()
+
+    assert load_lambda("PutReceiptToRDS").lambda_handler(event, None) == event
+    assert rows(migrated_db) == ([("r1", "12.50", "2024-03-04", "Meals")],
+                                 [("r1", "lunch.jpg", "12.50", "2024-03-04", "Meals")])
+
+
+def test_retry_does_not_overwrite_the_users_edits(migrated_db, load_lambda):
+    handler = load_lambda("PutReceiptToRDS").lambda_handler
+    handler(prediction(), None)
+    with migrated_db.cursor() as cursor:
+        cursor.execute("UPDATE receipt_data SET act_amount = 99")
+    migrated_db.commit()
+
+    handler(prediction(), None)
+
+    assert rows(migrated_db)[1] == [("r1", "lunch.jpg", "99.00", "2024-03-04", "Meals")]
+
+
+def test_a_failed_write_leaves_neither_row(migrated_db, load_lambda):
+    # Make the second insert fail after the first has gone through.
+    with migrated_db.cursor() as cursor:
+        cursor.execute("ALTER TABLE receipt_data ADD CONSTRAINT reject_r1 CHECK (receipt_id <> 'r1')")
+    migrated_db.commit()
+
+    with pytest.raises(Exception):
+        load_lambda("PutReceiptToRDS").lambda_handler(prediction(), None)
+
+    assert rows(migrated_db) == ([], [])
+
+
+def test_state_machine_writes_through_the_single_writer():
+    with open(os.path.join(AWS_DIR, "MyStateMachine-sj5krp1uk-definition.asl.json")) as f:
+        states = json.load(f)["States"]
+
+    assert not [name for name, state in states.items() if state["Type"] == "Parallel"]
+    writers = [name for name, state in states.items()
+               if "PutReceiptToRDS" in state.get("Parameters", {}).get("FunctionName", "")]
+    assert writers == ["PutReceiptToRDS"] and states["PutReceiptToRDS"].get("End")
+    assert {states["UseCachedPrediction"]["Next"], states["PredictReceipt"]["Next"]} == {"PutReceiptToRDS"}
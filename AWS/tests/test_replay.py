@@ -0,0 +1,100 @@
+import json
+import os
+import random
+import statistics
+import sys
+
+import pytest
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AWS_DIR, "local"))
+
+import replay
+from pineapple_pipeline import predict
+
+SYNTHETIC = os.path.join(AWS_DIR, "tests", "fixtures", "replay", "synthetic")
+RECEIPT = {"bucket": "pineapple-receipts", "key": "synthetic-coffee.jpg", "user_id": "user-1", "name": "coffee"}
+
+
+@pytest.fixture
+def replayed(monkeypatch):
+    """install() into a private client cache; returns a function taking install() options."""
+    import pineapple_aws
+    monkeypatch.setattr(pineapple_aws, "_clients", {})
+    sleeps = []
+
+    def install(**options):
+        options.setdefault("sleep", sleeps.append)
+        options.setdefault("rng", random.Random(1))
+        clients = replay.install(SYNTHETIC, **options)
+        return clients, sleeps
+    return install
+
+
+def test_recorded_calls_replay_with_readable_bodies(fake_aws, tmp_path):
+    fake_aws["textract"].response = {"ExpenseDocuments": [{"SummaryFields": [
+        {"Type": {"Text": "TOTAL"}, "ValueDetection": {"Text": "$4.50"}}], "LineItemGroups": []}]}
+    fake_aws["bedrock-runtime"].generation = "Category: Supplies"
+    import pineapple_aws
+    recorders = {name: replay.Recorder(fake_aws[name], name) for name in ("textract", "bedrock-runtime")}
+    for name, recorder in recorders.items():
+        pineapple_aws._clients[(name, ())] = recorder
+
+    live = predict(RECEIPT)
+    for recorder in recorders.values():
+        recorder.save(str(tmp_path))
+    replay.install(str(tmp_path), latency="none", strict=True)
+
+    assert predict(RECEIPT) == live
+    saved = json.loads((tmp_path / "bedrock-runtime.json").read_text())
+    assert saved["format_version"] == replay.FORMAT_VERSION and saved["synthetic"] is False
+    assert json.loads(saved["calls"][0]["response"]["body"]["__text__"])["generation"] == "Category: Supplies"
+
+
+def test_synthetic_fixtures_drive_the_pipeline_offline(replayed):
+    clients, sleeps = replayed()
+
+    prediction = predict(RECEIPT)
+
+    assert (prediction["predicted_category"], prediction["predicted_amount"]) == ("Meals", "11.49")
+    assert sleeps == [call["latency_ms"] / 1000 for call in (clients["textract"].served[0],
+                                                              clients["bedrock-runtime"].served[0])]
+
+
+def test_unrecorded_requests_cycle_unless_strict(replayed):
+    replayed(latency="none")
+    keys = [predict({**RECEIPT, "key": f"new-{n}.jpg"})["predicted_amount"] for n in range(5)]
+    assert keys == ["11.49", "44.60", "389.00", "23.80", "11.49"]
+
+    replayed(latency="none", strict=True)
+    with pytest.raises(replay.ReplayError):
+        predict({**RECEIPT, "key": "new.jpg"})
+
+
+def test_lognormal_latency_hits_its_median_and_tail():
+    model = replay.latency_model("lognormal:800:3000", random.Random(7))
+    samples = sorted(model(None) for _ in range(20000))
+
+    assert statistics.median(samples) == pytest.approx(800, rel=0.05)
+    assert samples[int(0.99 * len(samples))] == pytest.approx(3000, rel=0.1)
+    with pytest.raises(ValueError):
+        replay.latency_model("lognormal:3000:800", random.Random())
+
+
+@pytest.mark.parametrize("options,code", [({"throttle": 1.0}, "ThrottlingException"),
+                                          ({"error_rate": 1.0}, "InternalServerException")])
+def test_injected_faults_look_like_service_errors(replayed, options, code):
+    clients, _ = replayed(latency="fixed:100", overrides={"bedrock-runtime": options})
+    bedrock = clients["bedrock-runtime"]
+
+    with pytest.raises(bedrock.exceptions.ClientError) as raised:
+        predict(RECEIPT)
+    assert raised.value.response["Error"]["Code"] == code
+    assert isinstance(raised.value, getattr(bedrock.exceptions, code))
+
+
+def test_fixtures_from_another_format_are_refused(tmp_path):
+    (tmp_path / "textract.json").write_text(json.dumps({"format_version": 99, "service": "textract", "calls": []}))
+
+    with pytest.raises(replay.ReplayError):
+        replay.ReplayClient.from_dir(str(tmp_path), "textract")
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+
+def event(body, user_id="user-1"):
+    return {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": user_id}}}},
+        "body": json.dumps(body)
+    }
+
+
+@pytest.fixture
+def reports(migrated_db):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO report_data (report_number, user_id, current, submitted)
+        VALUES ('current', 'user-1', true, false), ('other', 'user-1', false, false),
+               ('sent', 'user-1', false, true), ('current', 'user-2', true, false)
+        """)
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount)
+        SELECT 'r' || n, 'user-1', NULL, n FROM generate_series(1, 40) n
+        """)
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount)
+        VALUES ('on-sent', 'user-1', 'sent', 100), ('r1', 'user-2', NULL, 1000)
+        """)
+    migrated_db.commit()
+    return migrated_db
+
+
+def test_bulk_attach_to_current_report(reports, load_lambda):
+    handler = load_lambda("UpdateReportNumber").lambda_handler
+    ids = [f"r{n}" for n in range(1, 41)]
+
+    response = handler(event({"receipt_ids": ids + ["on-sent", "missing"]}), None)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["attached"] == ids
+    assert body["not_attached"] == ["on-sent", "missing"]
+    assert body["report"]["report_number"] == "current"
+    assert body["report"]["receipt_count"] == 40
+    assert body["report"]["total"] == sum(range(1, 41))
+    assert sorted(body["report"]["receipt_ids"]) == sorted(ids)
+
+
+def test_attach_to_named_report_moves_receipts(reports, load_lambda):
+    handler = load_lambda("UpdateReportNumber").lambda_handler
+    handler(event({"receipt_ids": ["r1", "r2"]}), None)
+
+    body = json.loads(handler(event({"receipt_ids": ["r2"], "report_number": "other"}), None)["body"])
+
+    assert body["report"] == {"report_number": "other", "total": 2.0, "receipt_count": 1, "receipt_ids": ["r2"]}
+    with reports.cursor() as cursor:
+        cursor.execute("SELECT total, receipt_count FROM report_data WHERE report_number = 'current' AND user_id = 'user-1'")
+        assert cursor.fetchone() == (1, 1)
+
+
+def test_attach_to_a_submitted_report_is_refused(reports, load_lambda):
+    response = load_lambda("UpdateReportNumber").lambda_handler(
+        event({"receipt_ids": ["r1"], "report_number": "sent"}), None)
+
+    assert response["statusCode"] == 404
+
+
+def test_single_attach_only_touches_the_callers_receipt(reports, load_lambda):
+    response = load_lambda("UpdateReportNumber").lambda_handler(event({"receipt_id": "r1"}), None)
+
+    assert response["statusCode"] == 200
+    assert "Successfully updated receipt r1" in json.loads(response["body"])["message"]
+    with reports.cursor() as cursor:
+        cursor.execute("SELECT user_id, report_number FROM receipt_data WHERE receipt_id = 'r1' ORDER BY user_id")
+        assert cursor.fetchall() == [("user-1", "current"), ("user-2", None)]
+
+
+def test_bulk_detach_returns_new_totals(reports, load_lambda):
+    load_lambda("UpdateReportNumber").lambda_handler(event({"receipt_ids": ["r1", "r2", "r3"]}), None)
+    handler = load_lambda("DetachReceiptsFromReport-user").lambda_handler
+
+    response = handler(event({"receipt_ids": ["r1", "r3", "on-sent", "r9"]}), None)
+
+    body = json.loads(response["body"])
+    assert body["detached"] == ["r1", "r3"]
+    assert body["not_detached"] == ["on-sent", "r9"]
+    assert body["reports"] == [{"report_number": "current", "total": 2.0, "receipt_count": 1, "receipt_ids": ["r2"]}]
+
+
+def test_detach_can_be_limited_to_one_report(reports, load_lambda):
+    load_lambda("UpdateReportNumber").lambda_handler(event({"receipt_ids": ["r1"]}), None)
+    handler = load_lambda("DetachReceiptsFromReport-user").lambda_handler
+
+    body = json.loads(handler(event({"receipt_ids": ["r1"], "report_number": "other"}), None)["body"])
+
+    assert body["detached"] == [] and body["reports"] == []
+
+
+@pytest.mark.parametrize("receipt_ids", [None, [], "r1", [""], ["r"] * 501])
+def test_bad_receipt_id_lists_are_rejected(receipt_ids, load_lambda):
+    for name in ("UpdateReportNumber", "DetachReceiptsFromReport-user"):
+        response = load_lambda(name).lambda_handler(event({"receipt_ids": receipt_ids}), None)
+        assert response["statusCode"] == 400
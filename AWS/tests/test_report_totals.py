@@ -0,0 +1,120 @@
+import json
+from decimal import Decimal
+
+import psycopg2.extras
+
+from pineapple_db import report_totals
+
+
+def stored(connection, report_number="r1", user_id="user-1"):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT total, receipt_count FROM report_data WHERE report_number = %s AND user_id = %s",
+                       (report_number, user_id))
+        return cursor.fetchone()
+
+
+def drift(connection):
+    with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        return report_totals.find_drift(cursor)
+
+
+def test_totals_follow_every_receipt_write(migrated_db):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO report_data (report_number, user_id) VALUES ('r1', 'user-1'), ('r2', 'user-1')")
+        # PutToRDS-receipt_data / InsertMissingReceipt-User
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, act_amount)
+        VALUES ('a', 'user-1', 10.00), ('b', 'user-1', 2.50), ('c', 'user-1', NULL), ('d', 'user-2', 99)
+        """)
+        assert stored(migrated_db) == (Decimal("0"), 0)
+
+        # UpdateReportNumber attaches to the current report.
+        cursor.execute("UPDATE receipt_data SET report_number = 'r1' WHERE user_id = 'user-1'")
+        assert stored(migrated_db) == (Decimal("12.50"), 3)
+
+        # UpdateReceipt-user changes the amount; a comment-only edit changes nothing.
+        cursor.execute("UPDATE receipt_data SET act_amount = 4.25 WHERE receipt_id = 'c'")
+        cursor.execute("UPDATE receipt_data SET comment = 'lunch' WHERE receipt_id = 'a'")
+        assert stored(migrated_db) == (Decimal("16.75"), 3)
+
+        # Moving a receipt between reports.
+        cursor.execute("UPDATE receipt_data SET report_number = 'r2' WHERE receipt_id = 'b'")
+        assert stored(migrated_db) == (Decimal("14.25"), 2)
+        assert stored(migrated_db, "r2") == (Decimal("2.50"), 1)
+
+        # DeleteReceiptFromReceiptData
+        cursor.execute("DELETE FROM receipt_data WHERE receipt_id = 'a' AND user_id = 'user-1'")
+        assert stored(migrated_db) == (Decimal("4.25"), 1)
+
+        # DeleteReport-user detaches the receipts before deleting the report.
+        cursor.execute("UPDATE receipt_data SET report_number = NULL WHERE report_number = 'r2'")
+        assert stored(migrated_db, "r2") == (Decimal("0"), 0)
+
+        # Another user's report with the same number is untouched.
+        cursor.execute("INSERT INTO report_data (report_number, user_id) VALUES ('r1', 'user-2')")
+        assert stored(migrated_db, "r1", "user-2") == (Decimal("0"), 0)
+    migrated_db.commit()
+    assert drift(migrated_db) == []
+
+
+def test_report_created_after_its_receipts_starts_from_their_sum(migrated_db):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount) "
+                       "VALUES ('a', 'user-1', 'r1', 3), ('b', 'user-1', 'r1', 4)")
+        cursor.execute("INSERT INTO report_data (report_number, user_id) VALUES ('r1', 'user-1')")
+    assert stored(migrated_db) == (Decimal("7.00"), 2)
+
+
+def test_checker_finds_and_rebuilds_drift(migrated_db, load_lambda):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO report_data (report_number, user_id) VALUES ('r1', 'user-1'), ('r2', 'user-1')")
+        cursor.execute("INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount) "
+                       "VALUES ('a', 'user-1', 'r1', 3), ('b', 'user-1', 'r2', 4)")
+        cursor.execute("UPDATE report_data SET total = 100 WHERE report_number = 'r1'")
+    migrated_db.commit()
+
+    handler = load_lambda("ReconcileReportTotals").lambda_handler
+    report = handler({}, None)
+    assert report["drifted"] == 1 and not report["repaired"]
+    assert stored(migrated_db) == (Decimal("100.00"), 1)
+    migrated_db.commit()
+
+    report = handler({"repair": True}, None)
+    assert report == {"drifted": 1, "repaired": True, "reports": [{"report_number": "r1", "user_id": "user-1"}]}
+    assert stored(migrated_db) == (Decimal("3.00"), 1)
+    assert drift(migrated_db) == []
+
+
+def test_list_endpoints_read_stored_totals(migrated_db, load_lambda):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO report_data (report_number, user_id, comment) VALUES ('r1', 'user-1', 'c')")
+        cursor.execute("INSERT INTO report_data (report_number, user_id) VALUES ('empty', 'user-1')")
+        cursor.execute("INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount) "
+                       "VALUES ('a', 'user-1', 'r1', 10.00), ('b', 'user-1', 'r1', 11.49)")
+    migrated_db.commit()
+
+    event = {"requestContext": {"authorizer": {"jwt": {"claims": {"sub": "user-1"}}}}}
+    results = load_lambda("RetreiveCurrentReport").lambda_handler(event, None)
+
+    assert results == [{"report_number": "r1", "comment": "c", "total": 21.49}]
+
+
+def test_approver_lists_serialise_stored_totals(migrated_db, load_lambda):
+    # SELECT * would bring back total as a Decimal, which json.dumps refuses.
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO report_data (report_number, user_id, current, submitted, approved, returned) "
+                       "VALUES ('ok', 'user-1', false, true, true, false), "
+                       "('back', 'user-1', false, false, false, true)")
+        cursor.execute("INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount) "
+                       "VALUES ('a', 'user-1', 'ok', 10.00), ('b', 'user-1', 'ok', 11.49), "
+                       "('c', 'user-1', 'back', 3.25)")
+    migrated_db.commit()
+
+    event = {"requestContext": {"authorizer": {"jwt": {"claims": {"sub": "admin", "roleType": "Admin"}}}},
+             "queryStringParameters": None}
+    for handler, report_number, total in [("RetrieveApprovedReports-Approver", "ok", 21.49),
+                                          ("RetrieveReturnedReports-Approver", "back", 3.25)]:
+        response = load_lambda(handler).lambda_handler(event, None)
+        assert response["statusCode"] == 200
+        [report] = json.loads(response["body"])
+        assert (report["report_number"], report["total"]) == (report_number, total)
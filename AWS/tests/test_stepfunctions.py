@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from pineapple_aws import stepfunctions
+
+
+class FakeStepFunctions:
+    """Local stand-in for the Step Functions client.
+
+    Executions report RUNNING for `polls_until_done` DescribeExecution calls.
+    """
+
+    def __init__(self, status="SUCCEEDED", polls_until_done=0):
+        self.status = status
+        self.polls_until_done = polls_until_done
+        self.calls = []
+
+    def _result(self, payload):
+        if self.status == "SUCCEEDED":
+            return {"status": "SUCCEEDED", "output": json.dumps({"echo": payload})}
+        return {"status": self.status, "error": "States.TaskFailed", "cause": "boom"}
+
+    def start_sync_execution(self, stateMachineArn, input):
+        self.calls.append("start_sync_execution")
+        return self._result(json.loads(input))
+
+    def start_execution(self, stateMachineArn, input):
+        self.calls.append("start_execution")
+        self.input = json.loads(input)
+        return {"executionArn": "arn:execution"}
+
+    def describe_execution(self, executionArn):
+        self.calls.append("describe_execution")
+        if self.calls.count("describe_execution") <= self.polls_until_done:
+            return {"status": "RUNNING"}
+        return self._result(self.input)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeStepFunctions()
+    monkeypatch.setattr(stepfunctions, "get_client", lambda service_name: fake)
+    return fake
+
+
+def test_express_returns_the_output_from_one_call(client, monkeypatch):
+    monkeypatch.setenv("STEP_FUNCTION_TYPE", "EXPRESS")
+
+    assert stepfunctions.run_execution("arn:sm", {"key": "r1"}) == {"echo": {"key": "r1"}}
+    assert client.calls == ["start_sync_execution"]
+
+
+def test_standard_polls_with_growing_delays(client):
+    client.polls_until_done = 6
+    clock = FakeClock()
+    client.start_execution("arn:sm", json.dumps({"key": "r1"}))
+
+    assert stepfunctions.wait_for_execution("arn:execution", sleep=clock.sleep, clock=clock) == {"echo": {"key": "r1"}}
+    assert client.calls.count("describe_execution") == 7
+    assert clock.sleeps == sorted(clock.sleeps)
+    assert clock.sleeps[0] == stepfunctions.POLL_INITIAL_SECONDS
+    assert max(clock.sleeps) == stepfunctions.POLL_MAX_SECONDS
+    assert sum(clock.sleeps) < 2
+
+
+def test_polling_gives_up_at_the_timeout(client):
+    client.polls_until_done = 1000
+    clock = FakeClock()
+    client.start_execution("arn:sm", "{}")
+
+    with pytest.raises(TimeoutError):
+        stepfunctions.wait_for_execution("arn:execution", timeout=5, sleep=clock.sleep, clock=clock)
+    assert clock.now <= 5
+
+
+@pytest.mark.parametrize("express", [True, False])
+@pytest.mark.parametrize("status", ["FAILED", "TIMED_OUT"])
+def test_failed_executions_raise(client, express, status):
+    client.status = status
+
+    with pytest.raises(stepfunctions.ExecutionFailed) as raised:
+        stepfunctions.run_execution("arn:sm", {}, express=express)
+    assert raised.value.status == status and raised.value.cause == "boom"
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+
+def edit_event(body, user_id="user-1"):
+    return {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": user_id}}}},
+        "body": json.dumps(body)
+    }
+
+
+def edit(receipt_id, **fields):
+    return {"receipt_id": receipt_id, "amount": 5, "date": "03/04/2024", "category": "Meals",
+            "title": "t", "comment": "c", **fields}
+
+
+@pytest.fixture
+def receipts(migrated_db):
+    with migrated_db.cursor() as cursor:
+        cursor.execute("""
+        INSERT INTO report_data (report_number, user_id, current, submitted)
+        VALUES ('open', 'user-1', true, false), ('sent', 'user-1', false, true)
+        """)
+        cursor.execute("""
+        INSERT INTO receipt_data (receipt_id, user_id, report_number, act_amount)
+        VALUES ('loose', 'user-1', null, 1), ('in-open', 'user-1', 'open', 2),
+               ('in-sent', 'user-1', 'sent', 3), ('theirs', 'user-2', null, 4)
+        """)
+    migrated_db.commit()
+    return migrated_db
+
+
+def test_batch_reports_each_item(receipts, load_lambda):
+    handler = load_lambda("UpdateReceipt-user").lambda_handler
+    response = handler(edit_event([
+        edit("loose", category="Travel"),
+        edit("in-open", amount="12.50"),
+        edit("in-sent"),
+        edit("theirs"),
+        edit("loose"),
+        edit("bad-date", date="2024-03-04"),
+    ]), None)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert [r["status"] for r in body["results"]] == ["updated", "updated", "locked", "not_found", "invalid", "invalid"]
+    assert body["updated"] == 2 and body["failed"] == 4
+    assert body["results"][0]["receipt"]["act_category"] == "Travel"
+    assert body["results"][0]["receipt"]["act_date"] == "2024-03-04"
+    assert body["results"][1]["receipt"]["act_amount"] == 12.5
+
+    with receipts.cursor() as cursor:
+        cursor.execute("SELECT receipt_id, act_amount FROM receipt_data ORDER BY receipt_id")
+        amounts = {receipt_id: float(amount) for receipt_id, amount in cursor.fetchall()}
+        cursor.execute("SELECT total FROM report_data WHERE report_number = 'open'")
+        open_total = float(cursor.fetchone()[0])
+    assert amounts == {"loose": 5, "in-open": 12.5, "in-sent": 3, "theirs": 4}
+    assert open_total == 12.5
+
+
+def test_receipts_wrapper_is_accepted(receipts, load_lambda):
+    response = load_lambda("UpdateReceipt-user").lambda_handler(edit_event({"receipts": [edit("loose")]}), None)
+
+    assert json.loads(response["body"])["updated"] == 1
+
+
+def test_single_edit_keeps_the_original_response(receipts, load_lambda):
+    handler = load_lambda("UpdateReceipt-user").lambda_handler
+
+    response = handler(edit_event(edit("in-open", report_number="open")), None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["message"] == "Receipt updated successfully."
+
+    for receipt_id, status in [("in-sent", "locked"), ("missing", "not_found")]:
+        response = handler(edit_event(edit(receipt_id)), None)
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"]) == {"message": "Receipt updated successfully.", "status": status,
+                                                "receipt": None}
+
+
+def test_receipts_without_any_reports_can_be_edited(migrated_db, load_lambda):
+    # The old UPDATE ... FROM report_data matched nothing while report_data was empty.
+    with migrated_db.cursor() as cursor:
+        cursor.execute("INSERT INTO receipt_data (receipt_id, user_id) VALUES ('first', 'user-1')")
+    migrated_db.commit()
+
+    response = load_lambda("UpdateReceipt-user").lambda_handler(edit_event(edit("first")), None)
+    assert response["statusCode"] == 200
+
+
+@pytest.mark.parametrize("body", [[], {"receipts": "nope"}, [edit("x")] * 501])
+def test_malformed_batches_are_rejected(body, load_lambda):
+    assert load_lambda("UpdateReceipt-user").lambda_handler(edit_event(body), None)["statusCode"] == 400
@@ -0,0 +1,128 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from pineapple_aws import stepfunctions
+
+STATE_MACHINE_ARN = "arn:aws:states:us-east-1:123456789012:stateMachine:predict"
+
+
+def s3_event(key, etag):
+    return {"Records": [{"s3": {"bucket": {"name": "receipts"}, "object": {"key": key, "eTag": etag}}}]}
+
+
+def user_event(body, user_id="user-1"):
+    return {
+        "requestContext": {"authorizer": {"jwt": {"claims": {"sub": user_id}}}},
+        "body": json.dumps(body)
+    }
+
+
+@pytest.fixture
+def aws(fake_aws, monkeypatch):
+    monkeypatch.setenv("STEP_FUNCTION_ARN", STATE_MACHINE_ARN)
+    monkeypatch.setenv("ASYNC_STEP_FUNCTION_ARN", STATE_MACHINE_ARN)
+    monkeypatch.setenv("STEP_FUNCTION_TYPE", "EXPRESS")
+    monkeypatch.setenv("BUCKET", "receipts")
+    return fake_aws
+
+
+def test_upload_starts_one_prediction_per_object(aws, load_lambda):
+    aws["s3"].objects["my receipt.jpg"] = ("etag-1", {"user-id": "user-1", "name": "Ana%20B"})
+    handler = load_lambda("StartPredictionOnUpload").lambda_handler
+
+    assert handler(s3_event("my+receipt.jpg", "etag-1"), None) == {"started": ["my receipt.jpg"]}
+    assert handler(s3_event("my+receipt.jpg", "etag-1"), None) == {"started": []}
+
+    [execution] = aws["stepfunctions"].executions.values()
+    assert json.loads(execution["input"]) == {"bucket": "receipts", "key": "my receipt.jpg",
+                                              "user_id": "user-1", "name": "Ana B"}
+
+
+def test_uploads_without_metadata_are_left_to_the_client(aws, load_lambda):
+    aws["s3"].objects["old.jpg"] = ("etag-1", {})
+
+    assert load_lambda("StartPredictionOnUpload").lambda_handler(s3_event("old.jpg", "etag-1"), None) == {"started": []}
+    assert aws["stepfunctions"].executions == {}
+
+
+def test_predictions_returns_the_upload_triggered_result(aws, load_lambda):
+    aws["s3"].objects["r1.jpg"] = ("etag-1", {"user-id": "user-1"})
+    load_lambda("StartPredictionOnUpload").lambda_handler(s3_event("r1.jpg", "etag-1"), None)
+    [execution] = aws["stepfunctions"].executions.values()
+    execution.update(status="SUCCEEDED", output=json.dumps({"key": "r1.jpg", "predicted_category": "Travel"}))
+
+    output = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(user_event({"receipt_id": "r1.jpg"}), None)
+
+    assert output == {"key": "r1.jpg", "predicted_category": "Travel"}
+    assert aws["stepfunctions"].sync_outputs == []
+
+
+@pytest.mark.parametrize("status", ["FAILED", "RUNNING-then-reupload"])
+def test_predictions_runs_again_for_failed_or_replaced_uploads(aws, load_lambda, status):
+    aws["s3"].objects["r1.jpg"] = ("etag-1", {"user-id": "user-1"})
+    load_lambda("StartPredictionOnUpload").lambda_handler(s3_event("r1.jpg", "etag-1"), None)
+    [execution] = aws["stepfunctions"].executions.values()
+    if status == "FAILED":
+        execution.update(status="FAILED")
+    else:
+        aws["s3"].objects["r1.jpg"] = ("etag-2", {"user-id": "user-1"})
+
+    output = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(user_event({"receipt_id": "r1.jpg"}), None)
+
+    assert output == {"sync": True}
+
+
+def test_reupload_of_a_deleted_receipt_gets_its_own_prediction(aws, load_lambda):
+    start = load_lambda("StartPredictionOnUpload").lambda_handler
+    aws["s3"].objects["r1.jpg"] = ("etag-1", {"user-id": "user-1", "upload-id": "a1"})
+    start(s3_event("r1.jpg", "etag-1"), None)
+    [first] = aws["stepfunctions"].executions.values()
+    first.update(status="SUCCEEDED", output=json.dumps({"key": "r1.jpg", "predicted_category": "Travel"}))
+
+    # The receipt is deleted, then the same photo is uploaded under the same name.
+    aws["s3"].delete_object(Bucket="receipts", Key="r1.jpg")
+    aws["s3"].objects["r1.jpg"] = ("etag-1", {"user-id": "user-1", "upload-id": "b2"})
+    assert start(s3_event("r1.jpg", "etag-1"), None) == {"started": ["r1.jpg"]}
+
+    second = [e for e in aws["stepfunctions"].executions.values() if e is not first]
+    assert len(second) == 1
+    second[0].update(status="SUCCEEDED", output=json.dumps({"key": "r1.jpg", "predicted_category": "Meals"}))
+    output = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(user_event({"receipt_id": "r1.jpg"}), None)
+    assert output == {"key": "r1.jpg", "predicted_category": "Meals"}
+
+
+def test_async_request_reuses_the_upload_job(aws, load_lambda):
+    aws["s3"].objects["r1.jpg"] = ("etag-1", {"user-id": "user-1"})
+    load_lambda("StartPredictionOnUpload").lambda_handler(s3_event("r1.jpg", "etag-1"), None)
+
+    response = load_lambda("GetObjectNameTriggerStepFunction").lambda_handler(
+        user_event({"receipt_id": "r1.jpg", "async": True}), None)
+
+    assert response["statusCode"] == 202
+    assert json.loads(response["body"])["job_id"] == stepfunctions.execution_name("user-1", "r1.jpg", "etag-1")
+    assert len(aws["stepfunctions"].executions) == 1
+
+
+def test_presigned_upload_signs_the_uploader_into_the_metadata(load_lambda, monkeypatch):
+    pytest.importorskip("boto3")
+    import pineapple_aws
+    monkeypatch.setattr(pineapple_aws, "_clients", {})
+    monkeypatch.setenv("BUCKET", "receipts")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    handler = load_lambda("ReturnPreSignedURL").lambda_handler
+
+    body = json.loads(handler(user_event({"fileName": "r1.jpg", "predict": True, "name": "Ana B"}), None)["body"])
+
+    upload_id = body["headers"].pop("x-amz-meta-upload-id")
+    assert body["headers"] == {"x-amz-meta-user-id": "user-1", "x-amz-meta-name": "Ana%20B"}
+    signed = parse_qs(urlparse(body["presignedUrl"]).query)["X-Amz-SignedHeaders"][0].split(";")
+    assert {"x-amz-meta-user-id", "x-amz-meta-name", "x-amz-meta-upload-id"} <= set(signed)
+    again = json.loads(handler(user_event({"fileName": "r1.jpg", "predict": True}), None)["body"])
+    assert len(upload_id) == 16 and again["headers"]["x-amz-meta-upload-id"] != upload_id
+
+    plain = json.loads(handler(user_event({"fileName": "r1.jpg"}), None)["body"])
+    assert "headers" not in plain and "x-amz-meta" not in plain["presignedUrl"]
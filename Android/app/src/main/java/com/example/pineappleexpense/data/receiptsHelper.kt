@@ -22,11 +22,12 @@ import java.io.FileOutputStream
 fun getReceiptUploadURL(
     viewModel: AccessViewModel,
     fileName: String,
-    onSuccess: (String) -> Unit,
+    onSuccess: (String, Map<String, String>) -> Unit,
     onFailure: (String) -> Unit)
 {
     val url = "https://mrmtdao1qh.execute-api.us-east-1.amazonaws.com/s3-presigned-url"
     val token = viewModel.getAccessToken()
+    val name = viewModel.getUserName() ?: "Unknown"
 
     makeApiRequest(
         url = url,
@@ -35,11 +36,17 @@ fun getReceiptUploadURL(
             "Authorization" to "Bearer $token",
             "Content-Type" to "application/json"
         ),
-        body = mapOf("fileName" to fileName),
+        // "predict" has the server start the prediction as soon as the upload
+        // lands; the returned headers must be sent with the PUT.
+        body = mapOf<String, Any>("fileName" to fileName, "predict" to true, "name" to name),
         onSuccess = { responseBody ->
             try {
                 val jsonObject = JSONObject(responseBody)
-                onSuccess(jsonObject.getString("presignedUrl"))
+                val uploadHeaders = mutableMapOf<String, String>()
+                jsonObject.optJSONObject("headers")?.let { headers ->
+                    headers.keys().forEach { key -> uploadHeaders[key] = headers.getString(key) }
+                }
+                onSuccess(jsonObject.getString("presignedUrl"), uploadHeaders)
             } catch (e: Exception) {
                 onFailure("Invalid response format: ${e.message}")
             }
@@ -150,7 +157,8 @@ fun uploadFileToS3(
     fileUri: Uri,
     contentResolver: ContentResolver,
     onSuccess: () -> Unit,
-    onFailure: (String) -> Unit)
+    onFailure: (String) -> Unit,
+    uploadHeaders: Map<String, String> = emptyMap())
 {
     try {
         val file = File(fileUri.path ?: throw IOException("Invalid file"))
@@ -178,10 +186,11 @@ fun uploadFileToS3(
             }
             .build()
 
-        val request = Request.Builder()
+        val requestBuilder = Request.Builder()
             .url(presignedUrl)
             .put(requestBody)
-            .build()
+        uploadHeaders.forEach { (key, value) -> requestBuilder.addHeader(key, value) }
+        val request = requestBuilder.build()
 
         client.newCall(request).enqueue(object : okhttp3Callback {
             override fun onFailure(call: Call, e: IOException) {
@@ -210,14 +219,14 @@ fun processImageAndGetPrediction(
     callback: (Prediction?) -> Unit
 ) {
     val fileName = imageUri.lastPathSegment ?: "image.jpg"
-    getReceiptUploadURL(viewModel, fileName, onSuccess = { presignedUrl ->
+    getReceiptUploadURL(viewModel, fileName, onSuccess = { presignedUrl, uploadHeaders ->
         uploadFileToS3(presignedUrl, imageUri, contentResolver, onSuccess = {
             getPrediction(viewModel, fileName) { prediction ->
                 callback(prediction)
             }
         }, onFailure = { error ->
             Log.e("UPLOAD", "Upload failed: $error")
-        })
+        }, uploadHeaders = uploadHeaders)
     }, onFailure = { error -> Log.e("PRESIGNED", "Presigned URL failed: $error") })
 }
 